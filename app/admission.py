@@ -0,0 +1,119 @@
+# app/admission.py
+import os
+from typing import Optional
+
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+from app import models
+from workers.capacity import cluster_capacity
+
+# Monitors held in "queued" beyond this are rejected outright
+MONITOR_QUEUE_LIMIT = int(os.getenv("MONITOR_QUEUE_LIMIT", "100"))
+ADMISSION_INTERVAL = int(os.getenv("ADMISSION_INTERVAL", "15"))
+# pg_advisory_xact_lock key that serializes admission across API processes
+ADMISSION_LOCK_ID = 4_907_316
+
+# Statuses that hold (or are waiting for) a browser slot
+LIVE_STATUSES = ("active", "queued")
+
+
+def lock(db: Session):
+    """Held until the transaction ends, so count-then-insert can't overbook"""
+    db.execute(select(func.pg_advisory_xact_lock(ADMISSION_LOCK_ID)))
+
+
+def live_counts(db: Session) -> dict:
+    rows = db.execute(
+        select(models.Monitor.status, func.count())
+        .where(models.Monitor.status.in_(LIVE_STATUSES))
+        .group_by(models.Monitor.status)
+    ).all()
+    counts = {status: 0 for status in LIVE_STATUSES}
+    counts.update({status: count for status, count in rows})
+    return counts
+
+
+def in_use(capacity: dict, active: int) -> int:
+    """
+    Slots taken: the DB's active monitors, or the browsers workers actually
+    report running if that's more (a stopped monitor holds its browser until
+    it notices the stop request).
+    """
+    return max(active, capacity["running"])
+
+
+def free_slots(capacity: dict, active: int) -> int:
+    return max(capacity["capacity"] - in_use(capacity, active), 0)
+
+
+def plan(requested: int, free: int, queued: int, queue_limit: int = MONITOR_QUEUE_LIMIT) -> dict:
+    """How many of ``requested`` start now, how many queue, and whether they don't all fit"""
+    start = min(requested, free)
+    queue = requested - start
+    return {"start": start, "queue": queue, "rejected": queue > max(queue_limit - queued, 0)}
+
+
+def admit(db: Session, requested: int) -> dict:
+    """
+    Decide how many of ``requested`` new monitors start now and how many wait
+    in "queued". Takes the admission lock; the caller inserts and commits in
+    the same transaction. ``rejected`` means they don't all fit, even queued.
+    Without any advertised capacity everything starts, as before.
+    """
+    lock(db)
+    capacity = cluster_capacity()
+    if capacity is None:
+        return {"start": requested, "queue": 0, "rejected": False, "capacity": None}
+    counts = live_counts(db)
+    return {**plan(requested, free_slots(capacity, counts["active"]), counts["queued"]), "capacity": capacity}
+
+
+def promote(db: Session) -> list:
+    """Move the oldest queued monitors into free capacity; caller commits and enqueues them"""
+    lock(db)
+    capacity = cluster_capacity()
+    if capacity is None:
+        return []
+    free = free_slots(capacity, live_counts(db)["active"])
+    if free <= 0:
+        return []
+    oldest = (
+        select(models.Monitor.id)
+        .where(models.Monitor.status == "queued")
+        .order_by(models.Monitor.id)
+        .limit(free)
+        .scalar_subquery()
+    )
+    return db.execute(
+        update(models.Monitor)
+        .where(models.Monitor.id.in_(oldest))
+        .values(status="active")
+        .returning(models.Monitor.id, models.Monitor.run_id, models.Monitor.flow)
+        .execution_options(synchronize_session=False)
+    ).mappings().all()
+
+
+def utilization(db: Session) -> dict:
+    capacity: Optional[dict] = cluster_capacity()
+    counts = live_counts(db)
+    if capacity is None:
+        return {"admission": "off", **counts, "capacity": None, "utilization": None}
+    return {
+        "admission": "on",
+        **counts,
+        "capacity": capacity["capacity"],
+        "free": free_slots(capacity, counts["active"]),
+        "utilization": (
+            round(in_use(capacity, counts["active"]) / capacity["capacity"], 3) if capacity["capacity"] else None
+        ),
+        "running_browsers": capacity["running"],
+        "memory_used_mb": capacity["memory_used_mb"],
+        "memory_budget_mb": capacity["memory_budget_mb"] or None,
+        "memory_utilization": (
+            round(capacity["memory_used_mb"] / capacity["memory_budget_mb"], 3)
+            if capacity["memory_budget_mb"] else None
+        ),
+        "queue_limit": MONITOR_QUEUE_LIMIT,
+        "workers": capacity["workers"],
+    }
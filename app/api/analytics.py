@@ -0,0 +1,36 @@
+# app/api/analytics.py
+from fastapi import APIRouter, HTTPException
+
+from app.database import SessionLocal
+from app.slot_analytics import release_heatmap, release_trend, MAX_DAYS, TREND_INTERVALS
+
+router = APIRouter(prefix="/analytics", tags=["analytics"])
+
+
+def check_days(days: int):
+    if not 1 <= days <= MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"days must be between 1 and {MAX_DAYS}")
+
+
+@router.get("/slots/{flow}/heatmap")
+def get_release_heatmap(flow: str, days: int = 90):
+    """When slots are released for a flow: counts per weekday x UTC hour, from the hourly rollups"""
+    check_days(days)
+    db = SessionLocal()
+    try:
+        return release_heatmap(db, flow, days)
+    finally:
+        db.close()
+
+
+@router.get("/slots/{flow}/trend")
+def get_release_trend(flow: str, days: int = 90, interval: str = "week"):
+    """Releases, removals and how long slots stayed visible, per day/week/month"""
+    check_days(days)
+    if interval not in TREND_INTERVALS:
+        raise HTTPException(status_code=400, detail=f"interval must be one of: {', '.join(sorted(TREND_INTERVALS))}")
+    db = SessionLocal()
+    try:
+        return release_trend(db, flow, days, interval)
+    finally:
+        db.close()
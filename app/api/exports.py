@@ -0,0 +1,99 @@
+# app/api/exports.py
+import csv
+import io
+from datetime import datetime
+from typing import Optional
+
+import orjson
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+
+from app import models
+from app.database import SessionLocal
+
+router = APIRouter(prefix="/export", tags=["export"])
+
+# Rows fetched per round trip from the server-side cursor
+EXPORT_CHUNK_SIZE = 1000
+
+EXPORTS = {
+    "monitors": (models.Monitor, ["id", "flow", "applicant_id", "run_id", "status", "config", "created_at"]),
+    "bookings": (models.Booking, ["id", "applicant_id", "run_id", "status", "form_data", "pdf_url", "created_at"]),
+    "events": (models.Event, ["id", "run_id", "event", "message", "timestamp", "created_at"]),
+}
+
+FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def iter_chunks(model, columns, run_id: Optional[str] = None, since: Optional[datetime] = None):
+    """
+    Yield lists of row mappings, EXPORT_CHUNK_SIZE at a time, from a
+    server-side cursor so memory stays flat however large the table is.
+    """
+    db = SessionLocal()
+    try:
+        stmt = select(*[getattr(model, column) for column in columns]).order_by(model.id)
+        if run_id and hasattr(model, "run_id"):
+            stmt = stmt.where(model.run_id == run_id)
+        if since:
+            stmt = stmt.where(model.created_at >= since)
+        result = db.execute(stmt.execution_options(stream_results=True, yield_per=EXPORT_CHUNK_SIZE))
+        try:
+            for partition in result.mappings().partitions():
+                yield partition
+        finally:
+            result.close()
+    finally:
+        db.close()
+
+
+def ndjson_lines(chunks):
+    try:
+        for chunk in chunks:
+            yield b"".join(orjson.dumps(dict(row)) + b"\n" for row in chunk)
+    finally:
+        # A client that disconnects mid-stream closes this generator; release the cursor now
+        chunks.close()
+
+
+def csv_lines(chunks, columns):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    try:
+        for chunk in chunks:
+            for row in chunk:
+                writer.writerow([
+                    orjson.dumps(value).decode() if isinstance(value, (dict, list)) else value
+                    for value in (row[column] for column in columns)
+                ])
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode()
+    finally:
+        chunks.close()
+
+
+@router.get("/{kind}")
+def export(kind: str, format: str = "ndjson", run_id: Optional[str] = None, since: Optional[datetime] = None):
+    """Stream monitors, bookings or events as NDJSON or CSV"""
+    if kind not in EXPORTS:
+        raise HTTPException(status_code=404, detail=f"Unknown export '{kind}'")
+    if format not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"Format must be one of: {', '.join(FORMATS)}")
+
+    model, columns = EXPORTS[kind]
+    chunks = iter_chunks(model, columns, run_id=run_id, since=since)
+    body = csv_lines(chunks, columns) if format == "csv" else ndjson_lines(chunks)
+    filename = f"{kind}_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.{format}"
+    return StreamingResponse(
+        body,
+        media_type=FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
@@ -0,0 +1,22 @@
+# app/api/traces.py
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import FileResponse
+
+from automation.tracing import list_traces, trace_path
+
+router = APIRouter(prefix="/traces", tags=["traces"])
+
+
+@router.get("/{run_id}")
+def get_traces(run_id: str):
+    """Traces kept for a monitor's slow or failed checks, newest first"""
+    return {"run_id": run_id, "traces": list_traces(run_id)}
+
+
+@router.get("/{run_id}/{name}")
+def download_trace(run_id: str, name: str):
+    """Open the zip with `playwright show-trace <file>` or trace.playwright.dev"""
+    path = trace_path(run_id, name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Trace not found")
+    return FileResponse(path, media_type="application/zip", filename=name)
@@ -0,0 +1,73 @@
+# app/booking_agents.py
+import logging
+import secrets
+from typing import List, Optional
+from fastapi import WebSocket
+
+from config.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Statuses a host agent may report for a booking
+AGENT_STATUSES = {
+    "accepted",
+    "browser_open",
+    "captcha_detected",
+    "form_filled",
+    "submitted",
+    "completed",
+    "timeout",
+    "failed",
+}
+
+
+def bearer_token(authorization: Optional[str]) -> Optional[str]:
+    """The token from an ``Authorization: Bearer <token>`` header"""
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer":
+        return None
+    return token.strip() or None
+
+
+def agent_token_valid(token: Optional[str]) -> bool:
+    """Agents are disabled unless HOST_AGENT_TOKEN is configured."""
+    expected = get_settings().host_agent_token
+    if not expected or not token:
+        return False
+    return secrets.compare_digest(token, expected)
+
+
+class BookingAgentHub:
+    """Host agents connected over WebSocket, waiting for booking jobs."""
+    def __init__(self):
+        self.agents: List[WebSocket] = []
+
+    def connect(self, websocket: WebSocket):
+        self.agents.append(websocket)
+        logger.info(f"🖥️ Booking agent connected. Total agents: {len(self.agents)}")
+
+    def disconnect(self, websocket: WebSocket):
+        if websocket in self.agents:
+            self.agents.remove(websocket)
+        logger.info(f"🖥️ Booking agent removed. Total agents: {len(self.agents)}")
+
+    async def dispatch(self, job: dict) -> bool:
+        """
+        Push a booking job to the first agent that takes it.
+        Returns False when no agent is connected (caller falls back to Celery).
+        """
+        for agent in list(self.agents):
+            try:
+                await agent.send_json({"type": "booking_job", **job})
+                logger.info("🖥️ Booking job sent to host agent", extra={
+                    "booking_id": job.get("booking_id"),
+                    "run_id": job.get("run_id"),
+                })
+                return True
+            except Exception as e:
+                logger.warning(f"⚠️ Booking agent unreachable, dropping it: {e}")
+                self.disconnect(agent)
+        return False
+
+
+booking_agents = BookingAgentHub()
@@ -0,0 +1,124 @@
+# app/event_log.py
+import asyncio
+import logging
+import os
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy import insert
+
+from app import models
+from app.database import SessionLocal
+from app.slot_analytics import OBSERVED_EVENTS, record_observation
+
+logger = logging.getLogger(__name__)
+
+# Webhook events are written in one transaction per batch instead of one per event
+EVENT_FLUSH_INTERVAL = float(os.getenv("EVENT_FLUSH_INTERVAL", "1"))
+EVENT_FLUSH_BATCH = int(os.getenv("EVENT_FLUSH_BATCH", "500"))
+# Events held while the database is unreachable; beyond this the oldest are dropped
+EVENT_QUEUE_LIMIT = int(os.getenv("EVENT_QUEUE_LIMIT", "20000"))
+# A batch that fails this many flushes in a row is dropped, so one bad row can't wedge the log
+EVENT_FLUSH_ATTEMPTS = 3
+
+
+def write_events(rows: List[dict]):
+    """Insert a batch of events and fold slot releases/removals into the rollups, in order"""
+    db = SessionLocal()
+    try:
+        db.execute(insert(models.Event), [
+            {key: row[key] for key in ("run_id", "event", "message", "timestamp", "created_at")}
+            for row in rows
+        ])
+        for row in rows:
+            if row["event"] in OBSERVED_EVENTS:
+                record_observation(db, row["event"], row["run_id"], row["flow"], observed_at=row["created_at"])
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+class EventLog:
+    """
+    Buffers webhook events and writes them every EVENT_FLUSH_INTERVAL
+    seconds (sooner once EVENT_FLUSH_BATCH are waiting) with a single
+    executemany, so a burst of slot checks costs one transaction rather
+    than one each. A failed batch is retried on the next flushes, up to
+    EVENT_FLUSH_ATTEMPTS times.
+    """
+    def __init__(self, interval: float = EVENT_FLUSH_INTERVAL, batch: int = EVENT_FLUSH_BATCH,
+                 limit: int = EVENT_QUEUE_LIMIT, writer=write_events):
+        self.interval = interval
+        self.batch = batch
+        self.limit = limit
+        self.writer = writer
+        self.pending: List[dict] = []
+        self.dropped = 0
+        self.failures = 0
+        self._full = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def add(self, payload: dict):
+        self.pending.append({
+            "run_id": payload.get("run_id"),
+            "flow": payload.get("flow"),
+            "event": payload["event"],
+            "message": payload.get("message"),
+            "timestamp": payload.get("timestamp"),
+            "created_at": datetime.utcnow(),
+        })
+        if len(self.pending) > self.limit:
+            overflow = len(self.pending) - self.limit
+            del self.pending[:overflow]
+            self.dropped += overflow
+        if len(self.pending) >= self.batch:
+            self._full.set()
+
+    async def flush(self) -> int:
+        """Write what's pending now; returns how many events were written"""
+        if not self.pending:
+            return 0
+        rows, self.pending = self.pending, []
+        try:
+            await asyncio.to_thread(self.writer, rows)
+        except Exception as e:
+            self.failures += 1
+            if self.failures >= EVENT_FLUSH_ATTEMPTS:
+                logger.error(f"❌ Failed to record {len(rows)} events, dropping them: {e}")
+                self.failures = 0
+                return 0
+            logger.warning(f"⚠️ Failed to record {len(rows)} events, retrying: {e}")
+            # Keep them ahead of anything that arrived meanwhile
+            self.pending = rows + self.pending
+            return 0
+        self.failures = 0
+        if self.dropped:
+            logger.warning(f"⚠️ Dropped {self.dropped} events while the database was unreachable")
+            self.dropped = 0
+        return len(rows)
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._full.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._full.clear()
+            await self.flush()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        """Stop the flusher and write what's left (on shutdown)"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
+
+
+event_log = EventLog()
@@ -0,0 +1,291 @@
+# app/events.py
+import asyncio
+import json
+import logging
+import os
+from collections import defaultdict, deque
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Union
+
+from config.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+# Recent events kept in memory for clients that reconnect with last_seq
+EVENT_BUFFER_SIZE = int(os.getenv("EVENT_BUFFER_SIZE", "1000"))
+# Events queued per client before it is treated as too slow and dropped
+EVENT_CLIENT_QUEUE = int(os.getenv("EVENT_CLIENT_QUEUE", "1000"))
+
+# ✅ Optional Redis stream mirror: seqs shared by all API processes and replay survives restarts
+EVENT_STREAM_REDIS = os.getenv("EVENT_STREAM_REDIS", "0") == "1"
+EVENT_STREAM_KEY = os.getenv("EVENT_STREAM_KEY", "events:stream")
+EVENT_SEQ_KEY = f"{EVENT_STREAM_KEY}:seq"
+EVENT_STREAM_MAXLEN = int(os.getenv("EVENT_STREAM_MAXLEN", "10000"))
+REPLAY_PAGE_SIZE = 500
+
+# ✅ Batching window for clients that opt in (?batch=1); 0 disables batching
+EVENT_BATCH_WINDOW_MS = int(os.getenv("EVENT_BATCH_WINDOW_MS", "250"))
+# Sent on their own frame straight away, never held back by a batch
+PRIORITY_EVENTS = {
+    "slots_found",
+    "captcha_detected",
+    "monitor_failed",
+    "critical_error",
+    "monitors_dead",
+    "resync",
+}
+
+# Message fields a client can subscribe on, with the plural field used by summary events
+TOPIC_FIELDS = {
+    "run_id": "run_ids",
+    "flow": "flows",
+    "event": "events",
+}
+
+
+def message_topics(message: dict, field: str) -> Set[str]:
+    values = set(message.get(TOPIC_FIELDS[field]) or ())
+    if message.get(field) is not None:
+        values.add(message[field])
+    return values
+
+
+def parse_filters(raw: dict) -> Dict[str, Set[str]]:
+    """
+    Subscription filters from a subscribe message or query params, e.g.
+    {"run_ids": ["run_1"], "events": "slots_found,captcha_detected"}
+    """
+    filters = {}
+    for field, plural in TOPIC_FIELDS.items():
+        values = raw.get(plural)
+        if isinstance(values, str):
+            values = values.split(",")
+        if values:
+            filters[field] = {str(value).strip() for value in values if str(value).strip()}
+    return filters
+
+
+class Subscriber:
+    """
+    One dashboard client. Messages are queued and written by the client's own task.
+    ``filters`` maps a topic field to the values the client wants; a message
+    must match every field given (any value within one field). No filters
+    means everything.
+    """
+    def __init__(self, filters: Optional[Dict[str, Set[str]]] = None):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=EVENT_CLIENT_QUEUE)
+        self.overflowed = False
+        self.filters: Dict[str, Set[str]] = filters or {}
+        self._held: Optional[dict] = None
+
+    def matches(self, message: dict) -> bool:
+        return all(message_topics(message, field) & values for field, values in self.filters.items())
+
+    def put(self, message: dict) -> bool:
+        try:
+            self.queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            self.overflowed = True
+            return False
+
+    async def get(self) -> Optional[dict]:
+        """Next message, or None once the client has fallen too far behind"""
+        if self._held is not None:
+            message, self._held = self._held, None
+            return message
+        if self.overflowed:
+            return None
+        return await self.queue.get()
+
+    async def next_frame(self, window_ms: int = 0) -> Union[dict, List[dict], None]:
+        """
+        Next thing to send: a single message, or with a batching window, a
+        list of the low-priority messages that arrived within it. A priority
+        message ends the batch and goes out as its own frame right after it.
+        """
+        message = await self.get()
+        if message is None or window_ms <= 0 or message.get("event") in PRIORITY_EVENTS:
+            return message
+
+        batch = [message]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + window_ms / 1000
+        while (remaining := deadline - loop.time()) > 0:
+            try:
+                message = await asyncio.wait_for(self.get(), remaining)
+            except asyncio.TimeoutError:
+                break
+            if message is None or message.get("event") in PRIORITY_EVENTS:
+                # Keep seq order: flush the batch now, the held message goes next
+                self._held = message
+                break
+            batch.append(message)
+        return batch if len(batch) > 1 else batch[0]
+
+
+class EventBus:
+    """
+    Every broadcast gets a monotonically increasing ``seq`` and goes into a
+    bounded ring buffer (and, with EVENT_STREAM_REDIS=1, a capped Redis
+    stream). Clients that reconnect with the last seq they saw get only what
+    they missed; if that is no longer available they get a ``resync`` event
+    and reload over REST.
+    """
+    def __init__(self, maxlen: int = EVENT_BUFFER_SIZE):
+        self.seq = 0
+        self.buffer: deque = deque(maxlen=maxlen)
+        self.subscribers: Set[Subscriber] = set()
+        # ✅ Subscribers indexed by their first filter field, so fan-out only visits interested clients
+        self.wildcard: Set[Subscriber] = set()
+        self.index: Dict[str, Dict[str, Set[Subscriber]]] = {field: defaultdict(set) for field in TOPIC_FIELDS}
+        self.redis = get_redis() if EVENT_STREAM_REDIS else None
+
+    def connection_count(self) -> int:
+        return len(self.subscribers)
+
+    async def _next_seq(self) -> int:
+        if self.redis is not None:
+            try:
+                self.seq = await asyncio.to_thread(self.redis.incr, EVENT_SEQ_KEY)
+                return self.seq
+            except Exception as e:
+                logger.warning(f"⚠️ Redis event seq unavailable, using local counter: {e}")
+        self.seq += 1
+        return self.seq
+
+    async def _mirror(self, message: dict):
+        try:
+            await asyncio.to_thread(
+                self.redis.xadd, EVENT_STREAM_KEY,
+                {"seq": message["seq"], "data": json.dumps(message, default=str)},
+                maxlen=EVENT_STREAM_MAXLEN, approximate=True,
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ Could not mirror event to Redis stream: {e}")
+
+    async def publish(self, message: dict) -> dict:
+        message = {**message, "seq": await self._next_seq()}
+        self.buffer.append(message)
+        if self.redis is not None:
+            await self._mirror(message)
+
+        for subscriber in self._candidates(message):
+            if subscriber.matches(message) and not subscriber.put(message):
+                logger.warning("🐢 Dropping a client that fell too far behind; it will resume with last_seq")
+                self.unsubscribe(subscriber)
+        return message
+
+    def _candidates(self, message: dict) -> Set[Subscriber]:
+        candidates = set(self.wildcard)
+        for field, by_value in self.index.items():
+            for value in message_topics(message, field):
+                candidates |= by_value.get(value, set())
+        return candidates
+
+    def _index_key(self, subscriber: Subscriber) -> Optional[Tuple[str, Iterable[str]]]:
+        for field in TOPIC_FIELDS:
+            if subscriber.filters.get(field):
+                return field, subscriber.filters[field]
+        return None
+
+    def _add_to_index(self, subscriber: Subscriber):
+        key = self._index_key(subscriber)
+        if key is None:
+            self.wildcard.add(subscriber)
+            return
+        field, values = key
+        for value in values:
+            self.index[field][value].add(subscriber)
+
+    def _remove_from_index(self, subscriber: Subscriber):
+        self.wildcard.discard(subscriber)
+        key = self._index_key(subscriber)
+        if key is None:
+            return
+        field, values = key
+        for value in values:
+            bucket = self.index[field].get(value)
+            if bucket is not None:
+                bucket.discard(subscriber)
+                if not bucket:
+                    del self.index[field][value]
+
+    def set_filters(self, subscriber: Subscriber, filters: Dict[str, Set[str]]):
+        """Replace a connected client's subscription"""
+        self._remove_from_index(subscriber)
+        subscriber.filters = {field: set(values) for field, values in filters.items() if values}
+        if subscriber in self.subscribers:
+            self._add_to_index(subscriber)
+
+    def _from_buffer(self, last_seq: int) -> Tuple[List[dict], bool]:
+        """Buffered events after last_seq, and whether the buffer reaches back that far"""
+        if not self.buffer:
+            return [], last_seq == self.seq
+        covered = self.buffer[0]["seq"] <= last_seq + 1
+        return [message for message in self.buffer if message["seq"] > last_seq], covered
+
+    async def _from_stream(self, last_seq: int) -> Tuple[List[dict], bool]:
+        events: List[dict] = []
+        end = "+"
+        try:
+            while True:
+                page = await asyncio.to_thread(self.redis.xrevrange, EVENT_STREAM_KEY, end, "-", REPLAY_PAGE_SIZE)
+                if end == "+" and page and int(page[0][1]["seq"]) < last_seq:
+                    return [], False
+                for entry_id, fields in page:
+                    if int(fields["seq"]) <= last_seq:
+                        events.sort(key=lambda message: message["seq"])
+                        return events, True
+                    events.append(json.loads(fields["data"]))
+                if len(page) < REPLAY_PAGE_SIZE:
+                    break
+                end = f"({page[-1][0]}"
+        except Exception as e:
+            logger.warning(f"⚠️ Redis event replay failed: {e}")
+            return [], False
+        events.sort(key=lambda message: message["seq"])
+        # Ran off the start of the stream; complete only if it began right after last_seq
+        return events, bool(events) and events[0]["seq"] == last_seq + 1
+
+    async def subscribe(self, last_seq: Optional[int] = None,
+                        filters: Optional[Dict[str, Set[str]]] = None) -> Subscriber:
+        """Register a client, queueing anything it missed since ``last_seq`` first"""
+        subscriber = Subscriber({field: set(values) for field, values in (filters or {}).items() if values})
+        missed: List[dict] = []
+        covered = True
+
+        if last_seq is not None:
+            if self.redis is not None:
+                # The stream holds every process's events; this process's buffer doesn't
+                missed, covered = await self._from_stream(last_seq)
+                newest = missed[-1]["seq"] if missed else last_seq
+                # ✅ No await from here on, so nothing published can slip between replay and live events
+                missed += [message for message in self.buffer if message["seq"] > newest]
+            else:
+                missed, covered = self._from_buffer(last_seq)
+                # A last_seq ahead of ours means the API restarted and the counter reset
+                covered = covered and last_seq <= self.seq
+
+        if not covered:
+            subscriber.put({
+                "event": "resync",
+                "seq": self.seq,
+                "timestamp": datetime.utcnow().isoformat(),
+                "message": "⚠️ Missed events are no longer available; reloading"
+            })
+        else:
+            for message in missed:
+                if subscriber.matches(message):
+                    subscriber.put(message)
+
+        self.subscribers.add(subscriber)
+        self._add_to_index(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        self.subscribers.discard(subscriber)
+        self._remove_from_index(subscriber)
+
+
+event_bus = EventBus()
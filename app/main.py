@@ -3,12 +3,17 @@ import sys
 import json
 import uuid
 import asyncio
+import logging
 from pathlib import Path
-from typing import List
+from typing import Any, Dict, List, Optional
 from datetime import datetime
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Depends, HTTPException
+import orjson
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Depends, Header, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
+from sqlalchemy import insert, select, update
 from sqlalchemy.orm import Session
 
 # Add project root
@@ -17,12 +22,30 @@ sys.path.append(str(Path(__file__).parent.parent))
 # Import modules
 from app import models, schemas
 from app.database import init_db, engine, SessionLocal
-from workers.tasks import start_monitor, trigger_booking
+from app.api import analytics, exports, traces
+from app.booking_agents import booking_agents, agent_token_valid, bearer_token, AGENT_STATUSES
+from app.snapshot import snapshots, conditional_response, cache_key
+from app.events import event_bus, parse_filters, Subscriber, EVENT_BATCH_WINDOW_MS
+from app.stats import dashboard_stats, BOOKING_OUTCOMES
+from app.event_log import event_log
+from app import admission
+from app.retention import prune_events, EVENT_PRUNE_INTERVAL
+from config.logging_setup import setup_logging
+from config.redis_client import get_redis
+from automation.selector_cache import selector_stats
+from automation import diagnostics
+from automation.heartbeat import read_heartbeats, expired_runs, forget, request_stop, HEARTBEAT_INTERVAL
+from workers.celery_client import enqueue_start_monitor, enqueue_start_monitors, enqueue_trigger_booking
 
-app = FastAPI(title="VFS Appointment Orchestrator")
+setup_logging("api")
+logger = logging.getLogger(__name__)
+diagnostics.start()
+diagnostics.start_periodic_snapshots("api")
 
-# WebSocket connections
-active_connections: List[WebSocket] = []
+app = FastAPI(title="VFS Appointment Orchestrator", default_response_class=ORJSONResponse)
+app.include_router(analytics.router)
+app.include_router(exports.router)
+app.include_router(traces.router)
 
 app.add_middleware(
     CORSMiddleware,
@@ -32,8 +55,16 @@ app.add_middleware(
 )
 
 @app.on_event("startup")
-def startup():
+async def startup():
     init_db()
+    asyncio.create_task(reap_dead_monitors_forever())
+    asyncio.create_task(promote_queued_monitors_forever())
+    asyncio.create_task(prune_events_forever())
+    event_log.start()
+
+@app.on_event("shutdown")
+async def shutdown():
+    await event_log.close()
 
 @app.get("/status/")
 def get_status():
@@ -52,92 +83,107 @@ def get_db():
 
 # ✅ Broadcast helper function
 async def broadcast_to_websockets(message: dict):
-    """Broadcast message to all active WebSocket connections"""
-    disconnected = []
-    for connection in active_connections:
-        try:
-            await connection.send_json(message)
-        except Exception:
-            disconnected.append(connection)
-    
-    # Remove disconnected connections
-    for conn in disconnected:
-        if conn in active_connections:
-            active_connections.remove(conn)
+    """Broadcast message to all dashboard clients (WebSocket and SSE) with a seq number"""
+    return await event_bus.publish(message)
 
 @app.post("/monitors/", response_model=schemas.Monitor)
 async def create_monitor(monitor: schemas.MonitorCreate, db: Session = Depends(get_db)):
-    # ✅ Stop existing active monitors
-    existing = db.query(models.Monitor).filter(
-        models.Monitor.flow == monitor.flow,
-        models.Monitor.status == "active"
-    ).first()
-    
-    if existing:
-        print(f"⚠️ Stopping existing active monitor ID: {existing.id}")
-        existing.status = "stopped"
-        db.commit()
-    
     # ✅ Generate unique run_id and applicant_id
     run_id = f"run_{uuid.uuid4().hex[:16]}"
     applicant_id = monitor.applicant_id or f"user_{uuid.uuid4().hex[:8]}"
     
-    # ✅ Convert config to JSON string
-    config_str = json.dumps(monitor.config) if monitor.config else None
-    
-    db_monitor = models.Monitor(
-        flow=monitor.flow,
-        applicant_id=applicant_id,
-        run_id=run_id,
-        status="active",
-        config=config_str
-    )
-    db.add(db_monitor)
-    
     try:
+        # ✅ Stop existing active (or queued) monitors; committed only with the new one,
+        # so a rejected request leaves them running
+        existing = db.query(models.Monitor).filter(
+            models.Monitor.flow == monitor.flow,
+            models.Monitor.status.in_(admission.LIVE_STATUSES)
+        ).first()
+        
+        if existing:
+            logger.info(f"⚠️ Stopping existing active monitor ID: {existing.id}",
+                        extra={"monitor_id": existing.id, "run_id": existing.run_id})
+            existing.status = "stopped"
+            db.flush()
+        
+        # ✅ Admission control: start now, wait in "queued" for a free browser slot, or reject
+        decision = admission.admit(db, 1)
+        if decision["rejected"]:
+            db.rollback()
+            raise HTTPException(status_code=503, detail="No monitor capacity and the queue is full",
+                                headers={"Retry-After": str(admission.ADMISSION_INTERVAL)})
+        queued = not decision["start"]
+        
+        db_monitor = models.Monitor(
+            flow=monitor.flow,
+            applicant_id=applicant_id,
+            run_id=run_id,
+            status="queued" if queued else "active",
+            config=monitor.config
+        )
+        db.add(db_monitor)
         db.commit()
         db.refresh(db_monitor)
+        snapshots.invalidate()
+        run_flows[run_id] = db_monitor.flow
+        if existing:
+            request_stop([existing.run_id])
         
-        # ✅ Start monitoring task
-        start_monitor.delay(run_id)
+        # ✅ Start monitoring task; queued monitors are started by the promoter
+        if not queued:
+            enqueue_start_monitor(run_id)
         
         # ✅ Send notification to WebSocket clients (await since we're in async context)
         await broadcast_to_websockets({
-            "event": "monitor_created",
+            "event": "monitor_queued" if queued else "monitor_created",
             "monitor_id": db_monitor.id,
             "run_id": run_id,
+            "flow": db_monitor.flow,
             "timestamp": datetime.utcnow().isoformat(),
-            "message": f"🚀 Monitor {db_monitor.id} started successfully"
+            "message": (f"⏳ Monitor {db_monitor.id} queued until a worker has capacity" if queued
+                        else f"🚀 Monitor {db_monitor.id} started successfully")
         })
         
         return db_monitor
+    except HTTPException:
+        raise
     except Exception as e:
         db.rollback()
-        print(f"❌ Monitor creation failed: {e}")
+        logger.exception(f"❌ Monitor creation failed: {e}", extra={"run_id": run_id})
         raise HTTPException(status_code=500, detail=f"Failed to create monitor: {str(e)}")
 
 @app.post("/bookings/", response_model=schemas.Booking)
 async def create_booking(booking: schemas.BookingCreate, db: Session = Depends(get_db)):
-    # ✅ Convert form_data to JSON string
-    form_data_str = json.dumps(booking.form_data) if booking.form_data else None
-    
     db_booking = models.Booking(
         applicant_id=booking.applicant_id,
         run_id=booking.run_id,
         status="queued",
-        form_data=form_data_str
+        form_data=booking.form_data
     )
     db.add(db_booking)
     db.commit()
     db.refresh(db_booking)
+    snapshots.invalidate()
     
-    # ✅ Trigger booking task with form data
-    trigger_booking.delay(booking.applicant_id, booking.run_id, booking.form_data)
+    # ✅ Hand the job straight to a connected host agent; fall back to the worker
+    dispatched = await booking_agents.dispatch({
+        "booking_id": db_booking.id,
+        "applicant_id": booking.applicant_id,
+        "run_id": booking.run_id,
+        "form_data": booking.form_data,
+    })
+    if dispatched:
+        db_booking.status = "dispatched"
+        db.commit()
+        db.refresh(db_booking)
+    else:
+        enqueue_trigger_booking(booking.applicant_id, booking.run_id, booking.form_data)
     
     # ✅ Send notification to WebSocket clients
     await broadcast_to_websockets({
         "event": "booking_started",
         "booking_id": db_booking.id,
+        "run_id": booking.run_id,
         "applicant_id": booking.applicant_id,
         "timestamp": datetime.utcnow().isoformat(),
         "message": f"🚀 Booking session started for {booking.applicant_id}"
@@ -145,10 +191,82 @@ async def create_booking(booking: schemas.BookingCreate, db: Session = Depends(g
     
     return db_booking
 
-@app.get("/monitors/")
-def get_monitors(db: Session = Depends(get_db)):
-    monitors = db.query(models.Monitor).order_by(models.Monitor.created_at.desc()).all()
-    return monitors
+MONITOR_COLUMNS = [
+    models.Monitor.id, models.Monitor.flow, models.Monitor.applicant_id, models.Monitor.run_id,
+    models.Monitor.status, models.Monitor.config, models.Monitor.created_at,
+]
+
+BOOKING_COLUMNS = [
+    models.Booking.id, models.Booking.applicant_id, models.Booking.run_id, models.Booking.status,
+    models.Booking.form_data, models.Booking.pdf_url, models.Booking.created_at,
+]
+
+def parse_json_filter(raw: Optional[str], name: str) -> Optional[dict]:
+    """Parse a JSON object query parameter used for JSONB containment filters"""
+    if not raw:
+        return None
+    try:
+        value = json.loads(raw)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"'{name}' must be a JSON object")
+    if not isinstance(value, dict):
+        raise HTTPException(status_code=400, detail=f"'{name}' must be a JSON object")
+    return value
+
+@app.get("/monitors/", response_model=List[schemas.Monitor])
+def get_monitors(
+    request: Request,
+    flow: Optional[str] = None,
+    status: Optional[str] = None,
+    applicant_id: Optional[str] = None,
+    config: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    List monitors, newest first. ``config`` is a JSON object matched with
+    JSONB containment (@>), e.g. ?config={"check_interval": 60}, so it is
+    served by the GIN index. Responses come from the snapshot cache and
+    honour If-None-Match / If-Modified-Since.
+    """
+    stmt = select(*MONITOR_COLUMNS)
+    if flow:
+        stmt = stmt.where(models.Monitor.flow == flow)
+    if status:
+        stmt = stmt.where(models.Monitor.status == status)
+    if applicant_id:
+        stmt = stmt.where(models.Monitor.applicant_id == applicant_id)
+    config_filter = parse_json_filter(config, "config")
+    if config_filter:
+        stmt = stmt.where(models.Monitor.config.contains(config_filter))
+
+    def build():
+        rows = db.execute(stmt.order_by(models.Monitor.created_at.desc())).mappings().all()
+        # ✅ Plain rows straight to orjson; skips ORM loading and per-row model validation
+        return [dict(row) for row in rows]
+
+    return conditional_response(request, snapshots.get(cache_key(request), build))
+
+@app.get("/bookings/", response_model=List[schemas.Booking])
+def get_bookings(
+    applicant_id: Optional[str] = None,
+    run_id: Optional[str] = None,
+    status: Optional[str] = None,
+    form_data: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """List bookings, newest first. ``form_data`` is a JSONB containment filter like ``config`` above."""
+    stmt = select(*BOOKING_COLUMNS)
+    if applicant_id:
+        stmt = stmt.where(models.Booking.applicant_id == applicant_id)
+    if run_id:
+        stmt = stmt.where(models.Booking.run_id == run_id)
+    if status:
+        stmt = stmt.where(models.Booking.status == status)
+    form_filter = parse_json_filter(form_data, "form_data")
+    if form_filter:
+        stmt = stmt.where(models.Booking.form_data.contains(form_filter))
+    rows = db.execute(stmt.order_by(models.Booking.created_at.desc())).mappings().all()
+    return ORJSONResponse([dict(row) for row in rows])
 
 @app.post("/monitors/{monitor_id}/stop")
 def stop_monitor(monitor_id: int, db: Session = Depends(get_db)):
@@ -158,71 +276,522 @@ def stop_monitor(monitor_id: int, db: Session = Depends(get_db)):
     
     monitor.status = "stopped"
     db.commit()
+    snapshots.invalidate()
+    # ✅ The monitor exits on its next heartbeat, freeing its browser slot
+    request_stop([monitor.run_id])
     return {"message": "Monitor stopped successfully", "monitor_id": monitor_id}
 
+@app.post("/monitors/bulk")
+async def create_monitors_bulk(request: schemas.MonitorBulkCreate, db: Session = Depends(get_db)):
+    """
+    Create many monitors in one transaction. Like POST /monitors/, active
+    monitors on the same flows are stopped first; that is a single UPDATE,
+    the new rows are a single multi-row INSERT, and the start_monitor tasks
+    are published over one broker connection. Monitors beyond the free
+    capacity are queued; if they don't all fit in the queue, none are created.
+    """
+    if not request.monitors:
+        raise HTTPException(status_code=400, detail="'monitors' must not be empty")
+
+    rows = [{
+        "flow": monitor.flow,
+        "applicant_id": monitor.applicant_id or f"user_{uuid.uuid4().hex[:8]}",
+        "run_id": f"run_{uuid.uuid4().hex[:16]}",
+        "status": "active",
+        "config": monitor.config,
+    } for monitor in request.monitors]
+    flows = {row["flow"] for row in rows}
+
+    try:
+        replaced = db.execute(
+            update(models.Monitor)
+            .where(models.Monitor.flow.in_(flows), models.Monitor.status.in_(admission.LIVE_STATUSES))
+            .values(status="stopped")
+            .returning(models.Monitor.id, models.Monitor.run_id)
+            .execution_options(synchronize_session=False)
+        ).all()
+        decision = admission.admit(db, len(rows))
+        if decision["rejected"]:
+            db.rollback()
+            raise HTTPException(status_code=503, detail=f"No capacity for {len(rows)} monitors and the queue is full",
+                                headers={"Retry-After": str(admission.ADMISSION_INTERVAL)})
+        for row in rows[decision["start"]:]:
+            row["status"] = "queued"
+        created = db.execute(insert(models.Monitor).returning(*MONITOR_COLUMNS), rows).mappings().all()
+        db.commit()
+        snapshots.invalidate()
+    except HTTPException:
+        raise
+    except Exception as e:
+        db.rollback()
+        logger.exception(f"❌ Bulk monitor creation failed: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to create monitors: {str(e)}")
+
+    request_stop([row.run_id for row in replaced])
+    replaced = [row.id for row in replaced]
+    run_flows.update({row["run_id"]: row["flow"] for row in created})
+    started = [row["run_id"] for row in created if row["status"] == "active"]
+    if started:
+        enqueue_start_monitors(started)
+    logger.info(f"🚀 Created {len(created)} monitors ({len(created) - len(started)} queued), replaced {len(replaced)}")
+
+    await broadcast_to_websockets({
+        "event": "monitors_created",
+        "count": len(created),
+        "monitor_ids": [row["id"] for row in created],
+        "run_ids": [row["run_id"] for row in created],
+        "flows": sorted(flows),
+        "replaced_ids": replaced,
+        "queued": len(created) - len(started),
+        "timestamp": datetime.utcnow().isoformat(),
+        "message": f"🚀 {len(started)} monitors started, {len(created) - len(started)} queued"
+    })
+
+    return ORJSONResponse({"created": [dict(row) for row in created], "replaced_ids": replaced})
+
+@app.post("/monitors/stop")
+async def stop_monitors(request: schemas.MonitorStop, db: Session = Depends(get_db)):
+    """Stop every active or queued monitor matching the filters with one UPDATE ... RETURNING"""
+    conditions = [models.Monitor.status.in_(admission.LIVE_STATUSES)]
+    if request.ids is not None:
+        conditions.append(models.Monitor.id.in_(request.ids))
+    if request.run_ids is not None:
+        conditions.append(models.Monitor.run_id.in_(request.run_ids))
+    if request.flow:
+        conditions.append(models.Monitor.flow == request.flow)
+    if request.applicant_id:
+        conditions.append(models.Monitor.applicant_id == request.applicant_id)
+    if request.config:
+        conditions.append(models.Monitor.config.contains(request.config))
+    if len(conditions) == 1 and not request.all:
+        raise HTTPException(status_code=400, detail="Pass at least one filter, or all=true to stop every active monitor")
+
+    stopped = db.execute(
+        update(models.Monitor)
+        .where(*conditions)
+        .values(status="stopped")
+        .returning(models.Monitor.id, models.Monitor.run_id, models.Monitor.flow)
+        .execution_options(synchronize_session=False)
+    ).mappings().all()
+    db.commit()
+    snapshots.invalidate()
+    request_stop([row["run_id"] for row in stopped])
+
+    if stopped:
+        logger.info(f"⏹️ Stopped {len(stopped)} monitors")
+        await broadcast_to_websockets({
+            "event": "monitors_stopped",
+            "count": len(stopped),
+            "monitor_ids": [row["id"] for row in stopped],
+            "run_ids": [row["run_id"] for row in stopped],
+            "flows": sorted({row["flow"] for row in stopped}),
+            "timestamp": datetime.utcnow().isoformat(),
+            "message": f"⏹️ {len(stopped)} monitors stopped"
+        })
+
+    return {"stopped": len(stopped), "monitor_ids": [row["id"] for row in stopped]}
+
 # ✅ Add endpoint to get real-time status
 @app.get("/monitors/status")
-def get_monitors_status(db: Session = Depends(get_db)):
-    """Get current monitor status and connection info"""
-    active_monitor = db.query(models.Monitor).filter(
-        models.Monitor.status == "active"
-    ).first()
-    
+def get_monitors_status(request: Request, db: Session = Depends(get_db)):
+    """
+    Every active monitor with its Redis heartbeat (read in one pipeline).
+    ``alive`` is false when the heartbeat is missing, i.e. the worker died or
+    the monitor hasn't started yet, and null when Redis isn't configured.
+    Served from the snapshot cache; the X-Snapshot-Time header says when it
+    was built (kept out of the body so unchanged content keeps its ETag).
+    """
+    def build():
+        active = db.query(models.Monitor).filter(
+            models.Monitor.status == "active"
+        ).order_by(models.Monitor.id).all()
+        heartbeats = read_heartbeats([monitor.run_id for monitor in active])
+        tracked = get_redis() is not None
+
+        monitors = [
+            {
+                "id": monitor.id,
+                "run_id": monitor.run_id,
+                "flow": monitor.flow,
+                "applicant_id": monitor.applicant_id,
+                "created_at": monitor.created_at.isoformat() if monitor.created_at else None,
+                "alive": heartbeats.get(monitor.run_id) is not None if tracked else None,
+                "heartbeat": heartbeats.get(monitor.run_id),
+            }
+            for monitor in active
+        ]
+        active_monitor = active[0] if active else None
+        
+        return {
+            "active_monitor": {
+                "id": active_monitor.id if active_monitor else None,
+                "run_id": active_monitor.run_id if active_monitor else None,
+                "applicant_id": active_monitor.applicant_id if active_monitor else None,
+                "created_at": active_monitor.created_at.isoformat() if active_monitor else None
+            },
+            "monitors": monitors,
+            "active_count": len(monitors),
+            "alive_count": sum(1 for monitor in monitors if monitor["alive"]),
+            "websocket_connections": event_bus.connection_count(),
+        }
+
+    return conditional_response(request, snapshots.get(cache_key(request), build))
+
+def reap_dead_monitors() -> list:
+    """
+    Mark active monitors whose heartbeat expired as "dead". Only runs that
+    have beaten before count, so queued monitors aren't reaped. The UPDATE is
+    conditional on status, so concurrent API processes can run this safely.
+    """
+    expired = expired_runs()
+    if not expired:
+        return []
+    db = SessionLocal()
+    try:
+        dead = db.execute(
+            update(models.Monitor)
+            .where(models.Monitor.run_id.in_(expired), models.Monitor.status == "active")
+            .values(status="dead")
+            .returning(models.Monitor.id, models.Monitor.run_id, models.Monitor.flow)
+            .execution_options(synchronize_session=False)
+        ).mappings().all()
+        db.commit()
+    finally:
+        db.close()
+    # Stopped runs are done with too; either way they leave the index
+    forget(expired)
+    return [dict(row) for row in dead]
+
+async def reap_dead_monitors_forever():
+    while True:
+        await asyncio.sleep(HEARTBEAT_INTERVAL)
+        try:
+            dead = await run_in_threadpool(reap_dead_monitors)
+        except Exception as e:
+            logger.warning(f"⚠️ Dead monitor reaper failed: {e}")
+            continue
+        if not dead:
+            continue
+        snapshots.invalidate()
+        logger.warning(f"💀 {len(dead)} monitors lost their heartbeat: {[row['run_id'] for row in dead]}")
+        await broadcast_to_websockets({
+            "event": "monitors_dead",
+            "count": len(dead),
+            "monitor_ids": [row["id"] for row in dead],
+            "run_ids": [row["run_id"] for row in dead],
+            "flows": sorted({row["flow"] for row in dead if row["flow"]}),
+            "timestamp": datetime.utcnow().isoformat(),
+            "message": f"💀 {len(dead)} monitors stopped sending heartbeats"
+        })
+
+def promote_queued_monitors() -> list:
+    """Start queued monitors that now fit; returns the promoted rows"""
+    db = SessionLocal()
+    try:
+        promoted = admission.promote(db)
+        if not promoted:
+            db.rollback()
+            return []
+        # Enqueue before committing: if publishing fails they stay queued for the next round
+        enqueue_start_monitors([row["run_id"] for row in promoted])
+        db.commit()
+        return [dict(row) for row in promoted]
+    finally:
+        db.close()
+
+async def promote_queued_monitors_forever():
+    while True:
+        await asyncio.sleep(admission.ADMISSION_INTERVAL)
+        try:
+            promoted = await run_in_threadpool(promote_queued_monitors)
+        except Exception as e:
+            logger.warning(f"⚠️ Queued monitor promotion failed: {e}")
+            continue
+        if not promoted:
+            continue
+        snapshots.invalidate()
+        logger.info(f"⏩ Started {len(promoted)} queued monitors")
+        await broadcast_to_websockets({
+            "event": "monitors_started",
+            "count": len(promoted),
+            "monitor_ids": [row["id"] for row in promoted],
+            "run_ids": [row["run_id"] for row in promoted],
+            "flows": sorted({row["flow"] for row in promoted if row["flow"]}),
+            "timestamp": datetime.utcnow().isoformat(),
+            "message": f"⏩ {len(promoted)} queued monitors started"
+        })
+
+@app.get("/monitors/capacity")
+def get_monitor_capacity(db: Session = Depends(get_db)):
+    """
+    Advertised worker capacity against active and queued monitors.
+    ``utilization`` is active / capacity; ``memory_utilization`` is browser
+    RSS against the workers' memory budgets, when they set one.
+    """
+    return {**admission.utilization(db), "timestamp": datetime.utcnow().isoformat()}
+
+@app.get("/stats")
+def get_stats():
+    """
+    Dashboard charts: checks per minute, check latency histogram, slot
+    detections per flow by hour/weekday (UTC), CAPTCHA rate and booking
+    outcomes. Counters and the set of flows are updated as events arrive,
+    so this never touches the database.
+    """
+    return dashboard_stats.snapshot()
+
+@app.get("/selectors/stats")
+def get_selector_stats():
+    """Selector hit rates per category; a drop in first-try hits means the site changed"""
     return {
-        "active_monitor": {
-            "id": active_monitor.id if active_monitor else None,
-            "run_id": active_monitor.run_id if active_monitor else None,
-            "applicant_id": active_monitor.applicant_id if active_monitor else None,
-            "created_at": active_monitor.created_at.isoformat() if active_monitor else None
-        },
-        "websocket_connections": len(active_connections),
+        "categories": selector_stats(),
         "timestamp": datetime.utcnow().isoformat()
     }
 
-# ✅ Enhanced WebSocket endpoint
+async def pump_events(websocket: WebSocket, subscriber: Subscriber, batch_window_ms: int = 0):
+    """Write a client's queued events in order; close it if it fell too far behind"""
+    while True:
+        frame = await subscriber.next_frame(batch_window_ms)
+        if frame is None:
+            await websocket.close(code=1013)
+            return
+        # A batch goes out as one frame holding a JSON array
+        await websocket.send_text(orjson.dumps(frame).decode())
+
+def subscription_summary(subscriber: Subscriber) -> dict:
+    return {
+        "event": "subscribed",
+        "filters": {field: sorted(values) for field, values in subscriber.filters.items()},
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+def require_diagnostics(x_diagnostics_token: Optional[str] = Header(None)):
+    """Diagnostics are off unless DIAGNOSTICS_ENABLED=1; DIAGNOSTICS_TOKEN, if set, must match"""
+    if not diagnostics.DIAGNOSTICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if diagnostics.DIAGNOSTICS_TOKEN and x_diagnostics_token != diagnostics.DIAGNOSTICS_TOKEN:
+        raise HTTPException(status_code=403, detail="Invalid diagnostics token")
+
+@app.get("/diagnostics/memory", dependencies=[Depends(require_diagnostics)])
+def get_memory_diagnostics(limit: int = 20):
+    """tracemalloc top allocations, live object counts and Chromium RSS per run_id for this API process"""
+    return diagnostics.memory_report(limit)
+
+@app.post("/diagnostics/snapshot", dependencies=[Depends(require_diagnostics)])
+def write_memory_snapshot():
+    path = diagnostics.write_snapshot("api")
+    return {"path": str(path), "timestamp": datetime.utcnow().isoformat()}
+
+# ✅ Enhanced WebSocket endpoint; reconnect with ?last_seq=N to receive only missed events.
+# Subscribe with ?run_ids=a,b&flows=x&events=slots_found or later by sending
+# {"action": "subscribe", "run_ids": [...], "flows": [...], "events": [...]};
+# an empty subscribe means every event again. With ?batch=1, low-priority events
+# within EVENT_BATCH_WINDOW_MS are sent together as one array frame.
 @app.websocket("/ws/monitor-updates")
-async def websocket_endpoint(websocket: WebSocket):
+async def websocket_endpoint(websocket: WebSocket, last_seq: Optional[int] = None, batch: bool = False):
     await websocket.accept()
-    active_connections.append(websocket)
-    print(f"🔌 WebSocket connected. Total connections: {len(active_connections)}")
+    # A fresh client starts from here, so nothing sent during the greeting is lost
+    if last_seq is None:
+        last_seq = event_bus.seq
     
     # ✅ Send connection confirmation
     try:
         await websocket.send_json({
             "event": "connected",
+            "seq": last_seq,
             "message": "✅ WebSocket connected successfully",
             "timestamp": datetime.utcnow().isoformat()
         })
-        
+    except Exception:
+        return
+
+    subscriber = await event_bus.subscribe(last_seq, parse_filters(websocket.query_params))
+    writer = asyncio.create_task(pump_events(websocket, subscriber, EVENT_BATCH_WINDOW_MS if batch else 0))
+    logger.info(f"🔌 WebSocket connected. Total connections: {event_bus.connection_count()}")
+    
+    try:
         while True:
             # ✅ Keep connection alive
             data = await websocket.receive_text()
             
             # ✅ Handle ping messages
             if data == "ping":
-                await websocket.send_json({"event": "pong"})
+                subscriber.put({"event": "pong"})
+                continue
+
+            try:
+                command = json.loads(data)
+            except ValueError:
+                continue
+            if isinstance(command, dict) and command.get("action") == "subscribe":
+                event_bus.set_filters(subscriber, parse_filters(command))
+                subscriber.put(subscription_summary(subscriber))
                 
     except WebSocketDisconnect:
-        print(f"🔌 WebSocket disconnected")
+        logger.info("🔌 WebSocket disconnected")
     except Exception as e:
-        print(f"❌ WebSocket error: {e}")
+        logger.warning(f"❌ WebSocket error: {e}")
     finally:
-        if websocket in active_connections:
-            active_connections.remove(websocket)
-        print(f"🔌 WebSocket removed. Total connections: {len(active_connections)}")
+        writer.cancel()
+        event_bus.unsubscribe(subscriber)
+        logger.info(f"🔌 WebSocket removed. Total connections: {event_bus.connection_count()}")
+
+SSE_KEEPALIVE = 15
+
+# ✅ Same stream over Server-Sent Events for networks that block WebSockets
+@app.get("/events/stream")
+async def event_stream(request: Request, last_seq: Optional[int] = None):
+    """
+    EventSource resends the last ``id:`` it saw as Last-Event-ID on reconnect.
+    Takes the same run_ids/flows/events query filters as the WebSocket.
+    """
+    last_event_id = request.headers.get("last-event-id")
+    if last_event_id and last_event_id.isdigit():
+        last_seq = int(last_event_id)
+
+    subscriber = await event_bus.subscribe(last_seq, parse_filters(request.query_params))
+
+    async def stream():
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    message = await asyncio.wait_for(subscriber.get(), SSE_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if message is None:
+                    return
+                event_id = f"id: {message['seq']}\n" if "seq" in message else ""
+                yield f"{event_id}data: {json.dumps(message, default=str)}\n\n"
+        finally:
+            event_bus.unsubscribe(subscriber)
+
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+def update_booking_status(booking_id: int, status: str):
+    db = SessionLocal()
+    try:
+        booking = db.query(models.Booking).filter(models.Booking.id == booking_id).first()
+        if booking:
+            previous, booking.status = booking.status, status
+            db.commit()
+            snapshots.invalidate()
+            # ✅ Outcomes only: a booking is counted once, when it first reaches a terminal status
+            if previous not in BOOKING_OUTCOMES:
+                dashboard_stats.record_booking(status)
+        return booking is not None
+    finally:
+        db.close()
+
+# ✅ Host booking agents subscribe here for booking jobs
+@app.websocket("/ws/booking-agent")
+async def booking_agent_endpoint(websocket: WebSocket):
+    # ✅ Token in the Authorization header, so it stays out of URLs and access logs
+    if not agent_token_valid(bearer_token(websocket.headers.get("authorization"))):
+        await websocket.close(code=1008)
+        return
+
+    await websocket.accept()
+    booking_agents.connect(websocket)
+    try:
+        while True:
+            data = await websocket.receive_text()
+            if data == "ping":
+                await websocket.send_json({"event": "pong"})
+                continue
+
+            try:
+                report = json.loads(data)
+            except ValueError:
+                continue
+            booking_id = report.get("booking_id")
+            status = report.get("status")
+            if report.get("type") != "status" or status not in AGENT_STATUSES or booking_id is None:
+                continue
+
+            await run_in_threadpool(update_booking_status, booking_id, status)
+            logger.info(f"🖥️ Booking {booking_id}: {status}", extra={"booking_id": booking_id, "run_id": report.get("run_id")})
+            await broadcast_to_websockets({
+                "event": "booking_status",
+                "booking_id": booking_id,
+                "run_id": report.get("run_id"),
+                "status": status,
+                "timestamp": datetime.utcnow().isoformat(),
+                "message": report.get("message") or f"🖥️ Booking {booking_id}: {status}"
+            })
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        logger.warning(f"❌ Booking agent error: {e}")
+    finally:
+        booking_agents.disconnect(websocket)
 
 # ✅ Enhanced webhook endpoint
 class MonitorEvent(BaseModel):
     event: str
     timestamp: str
     message: str
+    run_id: Optional[str] = None
+    flow: Optional[str] = None
+    memory: Optional[Dict[str, Any]] = None  # ✅ Footprint reported by monitor_memory events
+    duration_ms: Optional[float] = None  # ✅ How long the check took, on check outcome events
+
+# run_id -> flow, so monitor events can be routed to flow subscribers
+run_flows: Dict[str, str] = {}
+
+def lookup_flow(run_id: str) -> Optional[str]:
+    db = SessionLocal()
+    try:
+        flow = db.execute(select(models.Monitor.flow).where(models.Monitor.run_id == run_id)).scalar()
+    finally:
+        db.close()
+    if flow is not None:
+        run_flows[run_id] = flow
+    return flow
+
+async def record_event(payload: dict) -> dict:
+    """Keep event history for export; returns the payload with its flow filled in"""
+    run_id = payload.get("run_id")
+    if run_id and not payload.get("flow"):
+        # Cached per run, so only a run's first event (after a restart) reads the DB
+        flow = run_flows.get(run_id)
+        if flow is None:
+            try:
+                flow = await run_in_threadpool(lookup_flow, run_id)
+            except Exception as e:
+                logger.warning(f"⚠️ Could not look up flow for {run_id}: {e}")
+        payload = {**payload, "flow": flow}
+    # ✅ Batched into one insert per EVENT_FLUSH_INTERVAL; slot releases/removals
+    # also feed the hourly release rollups in that transaction
+    event_log.add(payload)
+    await run_in_threadpool(dashboard_stats.record_event, payload)
+    return payload
+
+async def prune_events_forever():
+    # ✅ Keeps the event history (and full-table exports) bounded to EVENT_RETENTION_DAYS
+    while True:
+        try:
+            await run_in_threadpool(prune_events)
+        except Exception as e:
+            logger.warning(f"⚠️ Event pruning failed: {e}")
+        await asyncio.sleep(EVENT_PRUNE_INTERVAL)
+
+# Monitor events that change what /monitors/status reports (whether a run is alive)
+SNAPSHOT_EVENTS = {"monitor_started", "monitor_failed"}
 
 @app.post("/webhooks/monitor-event")
 async def receive_monitor_event(event: MonitorEvent):
     """Receive monitoring events and broadcast to WebSocket clients"""
-    print(f"📡 Webhook received: {event.event} - {event.message}")
+    logger.info(f"📡 Webhook received: {event.event} - {event.message}",
+                extra={"event": event.event, "run_id": event.run_id})
+    payload = await record_event(event.dict(exclude_none=True))
+    # ✅ Only lifecycle events change a cached listing; slot checks arrive constantly
+    if event.event in SNAPSHOT_EVENTS:
+        snapshots.invalidate()
     
-    # ✅ Broadcast to all WebSocket connections
-    await broadcast_to_websockets(event.dict())
+    # ✅ Broadcast to the clients subscribed to this run, flow or event type
+    await broadcast_to_websockets(payload)
     
-    return {"status": "received", "connections": len(active_connections)}
\ No newline at end of file
+    return {"status": "received", "connections": event_bus.connection_count()}
\ No newline at end of file
@@ -1,5 +1,6 @@
 # app/models.py
-from sqlalchemy import Column, Integer, String, DateTime, Text, func
+from sqlalchemy import Column, Integer, String, DateTime, Text, Index, func
+from sqlalchemy.dialects.postgresql import JSONB
 from app.database import Base
 
 class Monitor(Base):
@@ -9,15 +10,61 @@ class Monitor(Base):
     applicant_id = Column(String, index=True)  # ✅ Added missing field
     run_id = Column(String, unique=True)
     status = Column(String, default="active")
-    config = Column(Text, nullable=True)  # ✅ Store JSON config as text
+    config = Column(JSONB, nullable=True)  # ✅ Native JSONB, queryable with @>
     created_at = Column(DateTime, default=func.now())
 
+    __table_args__ = (
+        # jsonb_path_ops GIN index serves containment filters on any config key
+        Index("ix_monitors_config", "config", postgresql_using="gin", postgresql_ops={"config": "jsonb_path_ops"}),
+    )
+
 class Booking(Base):
     __tablename__ = "bookings"
     id = Column(Integer, primary_key=True, index=True)
     applicant_id = Column(String, index=True)
     run_id = Column(String)
     status = Column(String, default="queued")
-    form_data = Column(Text, nullable=True)  # ✅ Store form data as JSON
+    form_data = Column(JSONB, nullable=True)  # ✅ Native JSONB, queryable with @>
     pdf_url = Column(String, nullable=True)
-    created_at = Column(DateTime, default=func.now())
\ No newline at end of file
+    created_at = Column(DateTime, default=func.now())
+
+    __table_args__ = (
+        Index("ix_bookings_form_data", "form_data", postgresql_using="gin", postgresql_ops={"form_data": "jsonb_path_ops"}),
+    )
+class Event(Base):
+    __tablename__ = "events"
+    id = Column(Integer, primary_key=True, index=True)
+    run_id = Column(String, index=True, nullable=True)
+    event = Column(String, index=True)
+    message = Column(Text, nullable=True)
+    timestamp = Column(String, nullable=True)  # ✅ As emitted by the monitor
+    created_at = Column(DateTime, default=func.now(), index=True)
+
+class SlotObservation(Base):
+    """A slot release or removal seen by a monitor"""
+    __tablename__ = "slot_observations"
+    id = Column(Integer, primary_key=True, index=True)
+    run_id = Column(String, nullable=True)
+    flow = Column(String, nullable=False)
+    kind = Column(String, nullable=False)  # "released" | "removed"
+    observed_at = Column(DateTime, nullable=False, default=func.now())
+    removed_at = Column(DateTime, nullable=True)  # ✅ Set on a release once it disappears
+    visible_seconds = Column(Integer, nullable=True)
+
+    __table_args__ = (
+        Index("ix_slot_observations_flow_observed_at", "flow", "observed_at"),
+        # Open releases of a run, closed when the monitor sees them go
+        Index("ix_slot_observations_open", "run_id", postgresql_where=(kind == "released") & removed_at.is_(None)),
+    )
+
+class SlotRollup(Base):
+    """Per flow and UTC hour counters, kept current as observations arrive"""
+    __tablename__ = "slot_rollups"
+    flow = Column(String, primary_key=True)
+    bucket = Column(DateTime, primary_key=True)  # start of the UTC hour
+    weekday = Column(Integer, nullable=False)  # 0 = Monday
+    hour = Column(Integer, nullable=False)
+    releases = Column(Integer, nullable=False, default=0)
+    removals = Column(Integer, nullable=False, default=0)
+    visible_seconds = Column(Integer, nullable=False, default=0)  # summed over releases that started in this bucket
+    visible_count = Column(Integer, nullable=False, default=0)
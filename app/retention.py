@@ -0,0 +1,46 @@
+# app/retention.py
+import logging
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, select
+
+from app import models
+from app.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+# Event history older than this is deleted; 0 keeps everything
+EVENT_RETENTION_DAYS = int(os.getenv("EVENT_RETENTION_DAYS", "30"))
+EVENT_PRUNE_INTERVAL = int(os.getenv("EVENT_PRUNE_INTERVAL", "3600"))
+# Rows per DELETE, so pruning a large backlog never holds one long transaction
+EVENT_PRUNE_BATCH = 10000
+
+
+def prune_events(days: int = EVENT_RETENTION_DAYS) -> int:
+    """Delete events older than ``days`` in batches; returns how many were removed"""
+    if days <= 0:
+        return 0
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    removed = 0
+    db = SessionLocal()
+    try:
+        while True:
+            batch = (
+                select(models.Event.id)
+                .where(models.Event.created_at < cutoff)
+                .limit(EVENT_PRUNE_BATCH)
+                .scalar_subquery()
+            )
+            deleted = db.execute(
+                delete(models.Event).where(models.Event.id.in_(batch)).execution_options(synchronize_session=False)
+            ).rowcount
+            db.commit()
+            removed += deleted
+            if deleted < EVENT_PRUNE_BATCH:
+                break
+    finally:
+        db.close()
+    if removed:
+        logger.info(f"🧹 Pruned {removed} events older than {days} days")
+    return removed
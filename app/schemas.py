@@ -1,20 +1,32 @@
 # app/schemas.py
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 
 class MonitorCreate(BaseModel):
     flow: str
     applicant_id: Optional[str] = None  # ✅ Make optional with default
     config: Optional[Dict[str, Any]] = None  # ✅ Added config field
 
+class MonitorBulkCreate(BaseModel):
+    monitors: List[MonitorCreate]
+
+class MonitorStop(BaseModel):
+    # ✅ Filters are ANDed; with none set, all=True is required to stop every active monitor
+    ids: Optional[List[int]] = None
+    run_ids: Optional[List[str]] = None
+    flow: Optional[str] = None
+    applicant_id: Optional[str] = None
+    config: Optional[Dict[str, Any]] = None
+    all: bool = False
+
 class Monitor(BaseModel):
     id: int
     flow: str
     applicant_id: Optional[str] = None  # ✅ Added missing field
     run_id: str
     status: str
-    config: Optional[str] = None  # ✅ Added config field
+    config: Optional[Dict[str, Any]] = None  # ✅ Returned as a native object
     created_at: datetime
 
     class Config:
@@ -30,7 +42,7 @@ class Booking(BaseModel):
     applicant_id: str
     run_id: str
     status: str
-    form_data: Optional[str] = None  # ✅ Added form_data
+    form_data: Optional[Dict[str, Any]] = None  # ✅ Returned as a native object
     pdf_url: Optional[str] = None
     created_at: datetime
 
@@ -0,0 +1,143 @@
+# app/slot_analytics.py
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import Integer, cast, func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app import models
+
+# Monitor events recorded as slot observations
+OBSERVED_EVENTS = {"slots_found": "released", "slots_removed": "removed"}
+
+MAX_DAYS = 366
+TREND_INTERVALS = {"day", "week", "month"}
+
+
+def hour_bucket(moment: datetime) -> datetime:
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def bump_rollup(db: Session, flow: str, moment: datetime, **counts):
+    """Add to one (flow, hour) rollup row, creating it on first use"""
+    bucket = hour_bucket(moment)
+    stmt = insert(models.SlotRollup).values(
+        flow=flow, bucket=bucket, weekday=bucket.weekday(), hour=bucket.hour,
+        releases=counts.get("releases", 0),
+        removals=counts.get("removals", 0),
+        visible_seconds=counts.get("visible_seconds", 0),
+        visible_count=counts.get("visible_count", 0),
+    )
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[models.SlotRollup.flow, models.SlotRollup.bucket],
+        set_={
+            column: getattr(models.SlotRollup, column) + getattr(stmt.excluded, column)
+            for column in ("releases", "removals", "visible_seconds", "visible_count")
+        },
+    ))
+
+
+def record_observation(db: Session, event: str, run_id: Optional[str], flow: Optional[str],
+                       observed_at: Optional[datetime] = None):
+    """
+    Store a release/removal and fold it into the rollups in the same
+    transaction. A removal closes the run's open releases; their visible
+    time is credited to the hour each release started in. Caller commits.
+    """
+    kind = OBSERVED_EVENTS.get(event)
+    if kind is None or not flow:
+        return
+    observed_at = observed_at or datetime.utcnow()
+
+    if kind == "released":
+        db.add(models.SlotObservation(run_id=run_id, flow=flow, kind=kind, observed_at=observed_at))
+        bump_rollup(db, flow, observed_at, releases=1)
+        return
+
+    closed = []
+    if run_id:
+        closed = db.execute(
+            update(models.SlotObservation)
+            .where(
+                models.SlotObservation.run_id == run_id,
+                models.SlotObservation.kind == "released",
+                models.SlotObservation.removed_at.is_(None),
+            )
+            .values(
+                removed_at=observed_at,
+                visible_seconds=cast(func.extract("epoch", observed_at - models.SlotObservation.observed_at), Integer),
+            )
+            .returning(models.SlotObservation.observed_at, models.SlotObservation.visible_seconds)
+            .execution_options(synchronize_session=False)
+        ).all()
+    visible = max((row.visible_seconds for row in closed), default=None)
+    db.add(models.SlotObservation(run_id=run_id, flow=flow, kind=kind, observed_at=observed_at,
+                                  visible_seconds=visible))
+    bump_rollup(db, flow, observed_at, removals=1)
+    for row in closed:
+        bump_rollup(db, flow, row.observed_at, visible_seconds=row.visible_seconds or 0, visible_count=1)
+
+
+def release_heatmap(db: Session, flow: str, days: int = 90) -> dict:
+    """Releases and average visible time per weekday x hour, read from the rollups only"""
+    since = hour_bucket(datetime.utcnow() - timedelta(days=days))
+    rows = db.execute(
+        select(
+            models.SlotRollup.weekday,
+            models.SlotRollup.hour,
+            func.sum(models.SlotRollup.releases).label("releases"),
+            func.sum(models.SlotRollup.visible_seconds).label("visible_seconds"),
+            func.sum(models.SlotRollup.visible_count).label("visible_count"),
+        )
+        .where(models.SlotRollup.flow == flow, models.SlotRollup.bucket >= since)
+        .group_by(models.SlotRollup.weekday, models.SlotRollup.hour)
+    ).all()
+
+    releases = [[0] * 24 for _ in range(7)]
+    avg_visible = [[None] * 24 for _ in range(7)]
+    for row in rows:
+        releases[row.weekday][row.hour] = int(row.releases)
+        if row.visible_count:
+            avg_visible[row.weekday][row.hour] = round(row.visible_seconds / row.visible_count)
+    return {
+        "flow": flow,
+        "days": days,
+        "since": since.isoformat(),
+        "weekdays": ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"],
+        "releases": releases,
+        "avg_visible_seconds": avg_visible,
+        "total_releases": sum(map(sum, releases)),
+    }
+
+
+def release_trend(db: Session, flow: str, days: int = 90, interval: str = "week") -> dict:
+    """Releases, removals and average visible time per day/week/month"""
+    since = hour_bucket(datetime.utcnow() - timedelta(days=days))
+    period = func.date_trunc(interval, models.SlotRollup.bucket).label("period")
+    rows = db.execute(
+        select(
+            period,
+            func.sum(models.SlotRollup.releases).label("releases"),
+            func.sum(models.SlotRollup.removals).label("removals"),
+            func.sum(models.SlotRollup.visible_seconds).label("visible_seconds"),
+            func.sum(models.SlotRollup.visible_count).label("visible_count"),
+        )
+        .where(models.SlotRollup.flow == flow, models.SlotRollup.bucket >= since)
+        .group_by(period)
+        .order_by(period)
+    ).all()
+    return {
+        "flow": flow,
+        "days": days,
+        "interval": interval,
+        "points": [
+            {
+                "period": row.period.isoformat(),
+                "releases": int(row.releases),
+                "removals": int(row.removals),
+                "avg_visible_seconds": round(row.visible_seconds / row.visible_count) if row.visible_count else None,
+            }
+            for row in rows
+        ],
+    }
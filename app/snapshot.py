@@ -0,0 +1,104 @@
+# app/snapshot.py
+import hashlib
+import os
+import threading
+import time
+from datetime import datetime
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Callable, Dict
+
+import orjson
+from fastapi import Request, Response
+
+# Safety net for writes the API doesn't see (workers, other API processes)
+SNAPSHOT_MAX_AGE = float(os.getenv("SNAPSHOT_MAX_AGE", "15"))
+SNAPSHOT_MAX_KEYS = 256
+
+
+class Snapshot:
+    __slots__ = ("version", "built_at", "taken_at", "body", "etag", "last_modified")
+
+    def __init__(self, version: int, body: bytes, etag: str, last_modified: float):
+        self.version = version
+        self.built_at = time.monotonic()
+        self.taken_at = time.time()
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+
+
+class SnapshotCache:
+    """
+    Serialized responses for the dashboard's polling endpoints, keyed by
+    path + query. Monitor and booking status changes call invalidate(),
+    which bumps the version; the next request rebuilds from the DB,
+    everything else is served from memory (heartbeats and connection counts
+    refresh within max_age). The ETag is a hash of the body, so a rebuild that
+    produces the same content still answers 304; builders must leave clock
+    values out of the body (the build time goes in X-Snapshot-Time).
+    """
+    def __init__(self, max_age: float = SNAPSHOT_MAX_AGE):
+        self.max_age = max_age
+        self.version = 0
+        self._entries: Dict[str, Snapshot] = {}
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        with self._lock:
+            self.version += 1
+
+    def get(self, key: str, build: Callable[[], object]) -> Snapshot:
+        with self._lock:
+            version = self.version
+            current = self._entries.get(key)
+        if current and current.version == version and time.monotonic() - current.built_at < self.max_age:
+            return current
+
+        body = orjson.dumps(build(), option=orjson.OPT_NON_STR_KEYS)
+        etag = f'"{hashlib.blake2b(body, digest_size=12).hexdigest()}"'
+        # ✅ Last-Modified only moves when the content actually changes
+        last_modified = current.last_modified if current and current.etag == etag else time.time()
+        snapshot = Snapshot(version, body, etag, last_modified)
+
+        with self._lock:
+            if len(self._entries) >= SNAPSHOT_MAX_KEYS and key not in self._entries:
+                self._entries.clear()
+            self._entries[key] = snapshot
+        return snapshot
+
+
+def _not_modified(request: Request, snapshot: Snapshot) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in tags or snapshot.etag in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return int(snapshot.last_modified) <= since
+    return False
+
+
+def conditional_response(request: Request, snapshot: Snapshot) -> Response:
+    """200 with the cached body, or 304 when the client's copy is current"""
+    headers = {
+        "ETag": snapshot.etag,
+        "Last-Modified": formatdate(snapshot.last_modified, usegmt=True),
+        # Browsers keep the body but revalidate on every poll
+        "Cache-Control": "no-cache",
+        "X-Snapshot-Time": datetime.utcfromtimestamp(snapshot.taken_at).isoformat(),
+    }
+    if _not_modified(request, snapshot):
+        return Response(status_code=304, headers=headers)
+    return Response(content=snapshot.body, media_type="application/json", headers=headers)
+
+
+def cache_key(request: Request) -> str:
+    return f"{request.url.path}?{request.url.query}"
+
+
+snapshots = SnapshotCache()
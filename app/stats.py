@@ -0,0 +1,242 @@
+# app/stats.py
+import logging
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional, Set
+
+from config.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+REDIS_KEY_PREFIX = "stats:"
+
+# Per-minute buckets kept for the checks-per-minute chart
+MINUTES = 60
+MINUTE_TTL = 2 * 60 * 60
+
+# Check latency histogram upper bounds in ms; the last bucket is everything slower
+LATENCY_BUCKETS = [250, 500, 1000, 2000, 5000, 10000, 20000, 30000, 60000]
+
+# Sent as each check starts; counted as one check. Latency comes from the
+# duration_ms on whichever event concludes the check.
+CHECK_EVENT = "slot_check"
+CAPTCHA_EVENT = "captcha_detected"
+SLOTS_EVENT = "slots_found"
+# Terminal booking statuses counted as outcomes; intermediate steps aren't
+BOOKING_OUTCOMES = {"submitted", "failed", "timeout"}
+
+
+def latency_bucket(duration_ms: float) -> str:
+    for bound in LATENCY_BUCKETS:
+        if duration_ms <= bound:
+            return str(bound)
+    return "inf"
+
+
+class MemoryStatsStore:
+    """Counters for a single API process, used when Redis isn't configured."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hashes: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+        self._expires: Dict[str, float] = {}
+        self._sets: Dict[str, Set[str]] = defaultdict(set)
+
+    def increment(self, updates: List[tuple], members: List[tuple] = ()):
+        now = time.time()
+        with self._lock:
+            for key, member in members:
+                self._sets[key].add(member)
+            for key, field, amount, ttl in updates:
+                self._hashes[key][field] += amount
+                if ttl:
+                    self._expires[key] = now + ttl
+            for key in [key for key, expires in self._expires.items() if expires < now]:
+                self._hashes.pop(key, None)
+                del self._expires[key]
+
+    def read(self, keys: List[str]) -> List[dict]:
+        with self._lock:
+            return [dict(self._hashes[key]) if key in self._hashes else {} for key in keys]
+
+    def members(self, key: str) -> Set[str]:
+        with self._lock:
+            return set(self._sets.get(key, ()))
+
+
+class RedisStatsStore:
+    """Counters shared by every API process through Redis hashes."""
+    def __init__(self, client):
+        self.client = client
+
+    def increment(self, updates: List[tuple], members: List[tuple] = ()):
+        pipe = self.client.pipeline(transaction=False)
+        for key, member in members:
+            pipe.sadd(key, member)
+        for key, field, amount, ttl in updates:
+            if isinstance(amount, float):
+                pipe.hincrbyfloat(key, field, amount)
+            else:
+                pipe.hincrby(key, field, amount)
+            if ttl:
+                pipe.expire(key, ttl)
+        pipe.execute()
+
+    def read(self, keys: List[str]) -> List[dict]:
+        pipe = self.client.pipeline(transaction=False)
+        for key in keys:
+            pipe.hgetall(key)
+        return pipe.execute()
+
+    def members(self, key: str) -> Set[str]:
+        return set(self.client.smembers(key))
+
+
+class DashboardStats:
+    """
+    Chart aggregates kept as counters and updated as each event arrives, so
+    reading them is a fixed number of hash reads however much history
+    there is:
+
+    - stats:minute:{epoch_minute}  checks / captchas / slots_found, 2h TTL
+    - stats:latency                check latency histogram + sum/count
+    - stats:slots:{flow}           slot detections by UTC hour and weekday
+    - stats:totals                 all-time checks, captchas, slots_found
+    - stats:bookings               booking outcomes (terminal statuses)
+    - stats:flows                  set of flows seen in events
+    """
+    def __init__(self, store=None):
+        self._store = store
+
+    @property
+    def store(self):
+        if self._store is None:
+            client = get_redis()
+            self._store = RedisStatsStore(client) if client is not None else MemoryStatsStore()
+        return self._store
+
+    def _key(self, *parts) -> str:
+        return REDIS_KEY_PREFIX + ":".join(str(part) for part in parts)
+
+    def _apply(self, updates: List[tuple], members: List[tuple] = ()):
+        if not updates and not members:
+            return
+        try:
+            self.store.increment(updates, members)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not update dashboard stats: {e}")
+
+    def record_event(self, payload: dict, now: Optional[datetime] = None):
+        """Fold one monitor event into the counters"""
+        now = now or datetime.utcnow()
+        event = payload.get("event")
+        minute = self._key("minute", int(now.timestamp() // 60))
+        updates = []
+        flow = payload.get("flow") or ("unknown" if event == SLOTS_EVENT else None)
+        members = [(self._key("flows"), flow)] if flow else []
+
+        if event == CHECK_EVENT:
+            updates += [(minute, "checks", 1, MINUTE_TTL), (self._key("totals"), "checks", 1, None)]
+        elif event == CAPTCHA_EVENT:
+            updates += [(minute, "captchas", 1, MINUTE_TTL), (self._key("totals"), "captchas", 1, None)]
+        elif event == SLOTS_EVENT:
+            updates += [
+                (minute, "slots_found", 1, MINUTE_TTL),
+                (self._key("totals"), "slots_found", 1, None),
+                (self._key("slots", flow), f"hour:{now.hour}", 1, None),
+                (self._key("slots", flow), f"weekday:{now.weekday()}", 1, None),
+                (self._key("slots", flow), "total", 1, None),
+            ]
+
+        duration_ms = payload.get("duration_ms")
+        if duration_ms is not None:
+            latency = self._key("latency")
+            updates += [
+                (latency, latency_bucket(duration_ms), 1, None),
+                (latency, "count", 1, None),
+                (latency, "sum_ms", float(duration_ms), None),
+            ]
+        self._apply(updates, members)
+
+    def record_booking(self, status: str):
+        if status not in BOOKING_OUTCOMES:
+            return
+        self._apply([(self._key("bookings"), status, 1, None)])
+
+    def flows(self) -> List[str]:
+        try:
+            return sorted(self.store.members(self._key("flows")))
+        except Exception as e:
+            logger.warning(f"⚠️ Could not read dashboard flows: {e}")
+            return []
+
+    def snapshot(self, flows: Optional[List[str]] = None, now: Optional[datetime] = None) -> dict:
+        """All chart data in one pipelined read (plus one for the flow set unless ``flows`` is given)"""
+        now = now or datetime.utcnow()
+        if flows is None:
+            flows = self.flows()
+        current = int(now.timestamp() // 60)
+        minutes = list(range(current - MINUTES + 1, current + 1))
+        keys = (
+            [self._key("minute", minute) for minute in minutes]
+            + [self._key("latency"), self._key("totals"), self._key("bookings")]
+            + [self._key("slots", flow) for flow in flows]
+        )
+        try:
+            rows = self.store.read(keys)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not read dashboard stats: {e}")
+            rows = [{} for _ in keys]
+
+        minute_rows, rows = rows[:MINUTES], rows[MINUTES:]
+        latency, totals, bookings, slot_rows = rows[0], rows[1], rows[2], rows[3:]
+
+        per_minute = [
+            {
+                "minute": datetime.utcfromtimestamp(minute * 60).isoformat(),
+                "checks": int(row.get("checks", 0)),
+                "captchas": int(row.get("captchas", 0)),
+                "slots_found": int(row.get("slots_found", 0)),
+            }
+            for minute, row in zip(minutes, minute_rows)
+        ]
+        hour_checks = sum(row["checks"] for row in per_minute)
+        hour_captchas = sum(row["captchas"] for row in per_minute)
+        total_checks = int(totals.get("checks", 0))
+        total_captchas = int(totals.get("captchas", 0))
+        latency_count = int(latency.get("count", 0))
+
+        return {
+            "checks_per_minute": per_minute,
+            "latency": {
+                "buckets": [
+                    {"le": bound, "count": int(latency.get(str(bound), 0))}
+                    for bound in LATENCY_BUCKETS + ["inf"]
+                ],
+                "count": latency_count,
+                "mean_ms": round(float(latency.get("sum_ms", 0)) / latency_count, 1) if latency_count else None,
+            },
+            "slots_by_flow": {
+                flow: {
+                    "total": int(row.get("total", 0)),
+                    "by_hour": [int(row.get(f"hour:{hour}", 0)) for hour in range(24)],
+                    "by_weekday": [int(row.get(f"weekday:{day}", 0)) for day in range(7)],
+                }
+                for flow, row in zip(flows, slot_rows)
+            },
+            "captcha_rate": {
+                "last_hour": round(hour_captchas / hour_checks, 3) if hour_checks else None,
+                "all_time": round(total_captchas / total_checks, 3) if total_checks else None,
+            },
+            "totals": {
+                "checks": total_checks,
+                "captchas": total_captchas,
+                "slots_found": int(totals.get("slots_found", 0)),
+            },
+            "bookings": {status: int(count) for status, count in bookings.items()},
+            "timestamp": now.isoformat(),
+        }
+
+
+dashboard_stats = DashboardStats()
@@ -1,29 +1,158 @@
-# playwright/autofill.py
+# automation/autofill.py
 from playwright.async_api import Page
 import logging
+from automation.screenshots import screenshots
+from automation.selector_cache import get_resolver
 
 logger = logging.getLogger(__name__)
 
-FIELD_MAPPING = {
-    "first_name": 'label:has-text("First Name")',
-    "last_name": 'label:has-text("Surname")',
-    "dob": 'label:has-text("Date of Birth")',
-    "passport_number": 'label:has-text("Passport Number")',
+# Canonical applicant fields. CSS selectors are tried in order (last-known-good
+# first); label texts are the fallback when no selector matches.
+FORM_FIELDS = {
+    "first_name": {
+        "selectors": ['input[name*="first"]', 'input[id*="first"]', 'input[placeholder*="First"]'],
+        "labels": ["First Name"],
+    },
+    "last_name": {
+        "selectors": ['input[name*="last"]', 'input[id*="last"]', 'input[placeholder*="Last"]'],
+        "labels": ["Surname", "Last Name"],
+    },
+    "dob": {
+        "selectors": ['input[name*="dob"]', 'input[id*="dob"]', 'input[type="date"]'],
+        "labels": ["Date of Birth"],
+    },
+    "passport": {
+        "selectors": ['input[name*="passport"]', 'input[id*="passport"]', 'input[placeholder*="Passport"]'],
+        "labels": ["Passport Number"],
+    },
 }
 
-async def autofill_applicant_data(page: Page, applicant_data: dict):
+# Older callers used these keys in applicant data
+FIELD_ALIASES = {
+    "passport": ["passport_number"],
+}
+
+# Runs in the page: resolve and fill every field in one round trip. The value
+# is set through the native setter so framework-controlled inputs (React,
+# Angular) see the change, then the events those frameworks listen for fire.
+# Selects take the option whose value or text matches; a value the page
+# reformats (case, spacing, a date as DD/MM/YYYY) still counts as filled.
+FILL_SCRIPT = """
+(fields) => {
+    const norm = (s) => String(s).trim().toLowerCase().replace(/\\s+/g, ' ');
+    const dateKey = (s) => {
+        const parts = String(s).match(/\\d+/g) || [];
+        return parts.length === 3 ? parts.map(Number).sort((a, b) => a - b).join('-') : null;
+    };
+    const sameValue = (actual, expected) => {
+        if (actual === expected || norm(actual) === norm(expected)) return true;
+        const key = dateKey(expected);
+        return key !== null && dateKey(actual) === key;
+    };
+    const optionValue = (select, value) => {
+        const options = Array.from(select.options);
+        const exact = options.find((option) => option.value === value);
+        if (exact) return exact.value;
+        const match = options.find((option) => sameValue(option.value, value) || sameValue(option.textContent, value));
+        return match ? match.value : value;
+    };
+    const setValue = (el, value) => {
+        const proto = el instanceof HTMLTextAreaElement ? HTMLTextAreaElement.prototype
+            : el instanceof HTMLSelectElement ? HTMLSelectElement.prototype
+            : HTMLInputElement.prototype;
+        const setter = Object.getOwnPropertyDescriptor(proto, 'value').set;
+        el.focus();
+        setter.call(el, value);
+        el.dispatchEvent(new Event('input', { bubbles: true }));
+        el.dispatchEvent(new Event('change', { bubbles: true }));
+        el.blur();
+    };
+    const byLabel = (text) => {
+        for (const label of document.querySelectorAll('label')) {
+            if (!label.textContent.includes(text)) continue;
+            const el = label.control
+                || (label.parentElement && label.parentElement.querySelector('input, textarea, select'));
+            if (el) return el;
+        }
+        return null;
+    };
+    return fields.map(({ field, value, selectors, labels }) => {
+        try {
+            let el = null;
+            let used = null;
+            for (const selector of selectors) {
+                el = document.querySelector(selector);
+                if (el) { used = selector; break; }
+            }
+            for (const text of labels) {
+                if (el) break;
+                el = byLabel(text);
+                if (el) used = `label:${text}`;
+            }
+            if (!el) return { field, status: 'not_found' };
+            const target = el instanceof HTMLSelectElement ? optionValue(el, value) : value;
+            setValue(el, target);
+            return { field, status: sameValue(el.value, target) ? 'filled' : 'mismatch', selector: used };
+        } catch (e) {
+            return { field, status: 'error', error: String(e) };
+        }
+    });
+}
+"""
+
+
+def _value_for(field: str, applicant_data: dict):
+    for key in [field] + FIELD_ALIASES.get(field, []):
+        value = applicant_data.get(key)
+        if value:
+            return str(value)
+    return None
+
+
+async def fill_form(page: Page, applicant_data: dict, run_id: str = "default", fields: dict = FORM_FIELDS) -> dict:
+    """
+    Fill all applicant fields in a single in-page pass.
+    Returns a per-field report: {field: {"status": ..., "selector": ...}}.
+    """
     await page.wait_for_load_state("domcontentloaded")
-    for field, selector in FIELD_MAPPING.items():
-        try:
-            input_field = await page.query_selector(f"{selector} + input, {selector} ~ input")
-            if input_field:
-                value = applicant_data.get(field)
-                if value:
-                    await input_field.fill(value)
-                    logger.info(f"Filled {field}")
-                    await page.screenshot(path=f"debug_{field}.png")
-            else:
-                logger.warning(f"Selector not found for {field}")
-        except Exception as e:
-            logger.error(f"Failed to fill {field}: {e}")
-            await page.screenshot(path=f"error_{field}.png")
\ No newline at end of file
+    resolver = get_resolver()
+
+    report = {}
+    payload = []
+    for field, spec in fields.items():
+        value = _value_for(field, applicant_data)
+        if value is None:
+            report[field] = {"status": "skipped"}
+            continue
+        selectors = await resolver.prioritize(f"form_fields.{field}", spec["selectors"])
+        payload.append({
+            "field": field,
+            "value": value,
+            "selectors": selectors,
+            "labels": spec.get("labels", []),
+        })
+
+    results = await page.evaluate(FILL_SCRIPT, payload) if payload else []
+
+    failed = False
+    for result in results:
+        field = result.pop("field")
+        report[field] = result
+        selector = result.get("selector")
+        if result["status"] == "filled":
+            logger.info(f"✅ Filled {field}", extra={"run_id": run_id})
+        else:
+            failed = True
+            logger.warning(f"⚠️ Could not fill {field}: {result['status']}", extra={"run_id": run_id})
+        if result["status"] != "filled" or (selector and selector.startswith("label:")):
+            # Only a selector that took the value counts as a hit; label-only
+            # matches and elements that rejected the value (mismatch) are misses
+            selector = None
+        await resolver.record_result(f"form_fields.{field}", selector)
+
+    await screenshots.capture(page, "autofill_error" if failed else "autofill", run_id=run_id, error=failed)
+    return report
+
+
+async def autofill_applicant_data(page: Page, applicant_data: dict, run_id: str = "default"):
+    return await fill_form(page, applicant_data, run_id=run_id)
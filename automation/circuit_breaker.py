@@ -0,0 +1,244 @@
+# automation/circuit_breaker.py
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Callable, Optional
+from urllib.parse import urlparse
+
+from config.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+REDIS_KEY_PREFIX = "breaker:"
+
+# Error rate over BREAKER_WINDOW seconds that opens the circuit, once there are enough checks
+BREAKER_WINDOW = int(os.getenv("BREAKER_WINDOW", "300"))
+BREAKER_MIN_CHECKS = int(os.getenv("BREAKER_MIN_CHECKS", "5"))
+BREAKER_ERROR_RATE = float(os.getenv("BREAKER_ERROR_RATE", "0.5"))
+
+# Cooldowns in seconds; repeated trips without a successful probe double the cooldown
+BREAKER_COOLDOWN = int(os.getenv("BREAKER_COOLDOWN", "120"))
+BREAKER_CAPTCHA_COOLDOWN = int(os.getenv("BREAKER_CAPTCHA_COOLDOWN", "300"))
+BREAKER_MAX_COOLDOWN = int(os.getenv("BREAKER_MAX_COOLDOWN", "1800"))
+
+# How long one monitor may hold the half-open probe before another may try
+BREAKER_PROBE_TIMEOUT = int(os.getenv("BREAKER_PROBE_TIMEOUT", "180"))
+PROBE_WAIT = 15
+
+# Upstream statuses that mean "back off now", whatever the recent error rate
+TRIP_STATUSES = {429, 503}
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After as seconds from now; it may be delta-seconds or an HTTP date"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+class MemoryBreakerStore:
+    """Breaker state for a single process, used when Redis isn't configured."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._state = {}
+        self._outcomes = {}
+        self._probes = {}
+
+    def get(self, host: str) -> dict:
+        with self._lock:
+            return dict(self._state.get(host, {}))
+
+    def open(self, host: str, delay_for: Callable[[int], float], reason: str) -> float:
+        with self._lock:
+            state = self._state.setdefault(host, {})
+            state["trips"] = int(state.get("trips", 0)) + 1
+            delay = delay_for(state["trips"])
+            state["open_until"] = time.time() + delay
+            state["reason"] = reason
+            self._outcomes.pop(host, None)
+            return delay
+
+    def close(self, host: str):
+        with self._lock:
+            self._state.pop(host, None)
+            self._outcomes.pop(host, None)
+            self._probes.pop(host, None)
+
+    def add_outcome(self, host: str, ok: bool) -> tuple:
+        bucket = int(time.time() // BREAKER_WINDOW)
+        with self._lock:
+            buckets = self._outcomes.setdefault(host, {})
+            for old in [b for b in buckets if b < bucket - 1]:
+                del buckets[old]
+            counts = buckets.setdefault(bucket, [0, 0])
+            counts[0 if ok else 1] += 1
+            return tuple(map(sum, zip(*buckets.values())))
+
+    def acquire_probe(self, host: str) -> bool:
+        now = time.time()
+        with self._lock:
+            if self._probes.get(host, 0) > now:
+                return False
+            self._probes[host] = now + BREAKER_PROBE_TIMEOUT
+            return True
+
+    def release_probe(self, host: str):
+        with self._lock:
+            self._probes.pop(host, None)
+
+
+class RedisBreakerStore:
+    """Breaker state shared by every monitor worker through Redis."""
+    def __init__(self, client):
+        self.client = client
+
+    def _key(self, host: str, suffix: str = "") -> str:
+        return f"{REDIS_KEY_PREFIX}{host}{suffix}"
+
+    def get(self, host: str) -> dict:
+        return self.client.hgetall(self._key(host))
+
+    def open(self, host: str, delay_for: Callable[[int], float], reason: str) -> float:
+        key = self._key(host)
+        trips = int(self.client.hincrby(key, "trips", 1))
+        delay = delay_for(trips)
+        pipe = self.client.pipeline()
+        pipe.hset(key, mapping={"open_until": time.time() + delay, "reason": reason})
+        # Forget trips once the host has been quiet for a while
+        pipe.expire(key, int(delay) + BREAKER_MAX_COOLDOWN * 4)
+        bucket = int(time.time() // BREAKER_WINDOW)
+        pipe.delete(self._key(host, f":outcomes:{bucket}"), self._key(host, f":outcomes:{bucket - 1}"))
+        pipe.execute()
+        return delay
+
+    def close(self, host: str):
+        self.client.delete(self._key(host), self._key(host, ":probe"))
+
+    def add_outcome(self, host: str, ok: bool) -> tuple:
+        bucket = int(time.time() // BREAKER_WINDOW)
+        current = self._key(host, f":outcomes:{bucket}")
+        pipe = self.client.pipeline()
+        pipe.hincrby(current, "ok" if ok else "err", 1)
+        pipe.expire(current, BREAKER_WINDOW * 2)
+        pipe.hgetall(current)
+        pipe.hgetall(self._key(host, f":outcomes:{bucket - 1}"))
+        _, _, now_counts, prev_counts = pipe.execute()
+        return (
+            int(now_counts.get("ok", 0)) + int(prev_counts.get("ok", 0)),
+            int(now_counts.get("err", 0)) + int(prev_counts.get("err", 0)),
+        )
+
+    def acquire_probe(self, host: str) -> bool:
+        return bool(self.client.set(self._key(host, ":probe"), "1", nx=True, ex=BREAKER_PROBE_TIMEOUT))
+
+    def release_probe(self, host: str):
+        self.client.delete(self._key(host, ":probe"))
+
+
+_store = None
+
+
+def get_store():
+    """Redis when available so all workers share one breaker, otherwise in-process."""
+    global _store
+    if _store is None:
+        client = get_redis()
+        _store = RedisBreakerStore(client) if client is not None else MemoryBreakerStore()
+    return _store
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker for one upstream host, shared by every monitor on it.
+
+    Closed: checks run and outcomes are counted. It opens when the error
+    rate over the window passes BREAKER_ERROR_RATE, or straight away on a
+    429/503 or a CAPTCHA wall, for Retry-After seconds when the site sends
+    one. While open every monitor on the host waits. When the cooldown
+    ends, a single monitor wins the probe lock and runs one check: success
+    closes the circuit, failure reopens it with a longer cooldown.
+    """
+    def __init__(self, host: str, store=None):
+        self.host = host
+        self.store = store or get_store()
+        self.probing = False
+
+    async def _call(self, method, *args):
+        try:
+            return await asyncio.to_thread(method, self.host, *args)
+        except Exception as e:
+            # A broken breaker store must never stop monitoring
+            logger.warning(f"⚠️ Circuit breaker store unavailable: {e}")
+            return None
+
+    async def before_check(self) -> float:
+        """Seconds to wait before checking this host; 0 means go ahead"""
+        state = await self._call(self.store.get) or {}
+        open_until = float(state.get("open_until", 0))
+        if not open_until:
+            return 0.0
+
+        remaining = open_until - time.time()
+        if remaining > 0:
+            # Spread the wake-ups so paused monitors don't all race for the probe
+            return remaining + random.uniform(0, 5)
+        if await self._call(self.store.acquire_probe):
+            self.probing = True
+            logger.info(f"🔎 Circuit half-open for {self.host}; probing with one check")
+            return 0.0
+        return PROBE_WAIT
+
+    async def record_success(self):
+        if self.probing:
+            self.probing = False
+            await self._call(self.store.close)
+            logger.info(f"✅ Circuit closed for {self.host}")
+            return
+        await self._call(self.store.add_outcome, True)
+
+    async def record_failure(self, reason: str, trip: bool = False, retry_after: Optional[float] = None,
+                             cooldown: int = BREAKER_COOLDOWN) -> bool:
+        """Count a failed check; returns True when this failure opened the circuit"""
+        if not trip and not self.probing:
+            counts = await self._call(self.store.add_outcome, False)
+            if not counts:
+                return False
+            ok, err = counts
+            if ok + err < BREAKER_MIN_CHECKS or err / (ok + err) < BREAKER_ERROR_RATE:
+                return False
+            reason = f"error rate {err}/{ok + err}: {reason}"
+
+        if not self.probing:
+            # Another monitor already opened it; tripping again would double the cooldown
+            state = await self._call(self.store.get) or {}
+            if float(state.get("open_until", 0)) > time.time():
+                return False
+
+        def delay_for(trips: int) -> float:
+            # ``trips`` counts this one, so the first trip waits the plain cooldown
+            if retry_after is not None:
+                return max(retry_after, 1.0)
+            return min(cooldown * (2 ** (trips - 1)), BREAKER_MAX_COOLDOWN)
+
+        delay = await self._call(self.store.open, delay_for, reason)
+        if delay is None:
+            return False
+        if self.probing:
+            self.probing = False
+            await self._call(self.store.release_probe)
+        logger.warning(f"⛔ Circuit open for {self.host} for {int(delay)}s: {reason}")
+        return True
+
+
+def breaker_for(url: str) -> CircuitBreaker:
+    return CircuitBreaker(urlparse(url).hostname or url)
@@ -0,0 +1,142 @@
+# automation/diagnostics.py
+# Opt-in memory diagnostics shared by the API and the Celery workers.
+import gc
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from automation.process_memory import process_cmdline, chromium_by_run, descendants, rss_bytes
+from automation.screenshots import ArtifactRing
+
+logger = logging.getLogger(__name__)
+
+DIAGNOSTICS_ENABLED = os.getenv("DIAGNOSTICS_ENABLED", "0") == "1"
+DIAGNOSTICS_TOKEN = os.getenv("DIAGNOSTICS_TOKEN")
+# Frames kept per allocation; more frames give better tracebacks but cost more memory
+TRACEMALLOC_FRAMES = int(os.getenv("TRACEMALLOC_FRAMES", "1"))
+DIAGNOSTICS_DIR = os.getenv("DIAGNOSTICS_DIR", "logs/diagnostics")
+DIAGNOSTICS_INTERVAL = int(os.getenv("DIAGNOSTICS_INTERVAL", "0"))  # seconds; 0 = no periodic snapshots
+DIAGNOSTICS_MAX_FILES = int(os.getenv("DIAGNOSTICS_MAX_FILES", "50"))
+DIAGNOSTICS_MAX_BYTES = int(os.getenv("DIAGNOSTICS_MAX_BYTES", str(200 * 1024 * 1024)))
+
+# Live instances worth counting; a count that only grows is a leak
+TRACKED_TYPES = {
+    "MonitorState",
+    "CircuitBreaker",
+    "SelectorResolver",
+    "BookingStandby",
+    "Subscriber",
+    "WebSocket",
+    "Page",
+    "BrowserContext",
+    "Browser",
+}
+
+
+def start():
+    """Start tracing allocations in this process (no-op unless DIAGNOSTICS_ENABLED)"""
+    if DIAGNOSTICS_ENABLED and not tracemalloc.is_tracing():
+        tracemalloc.start(TRACEMALLOC_FRAMES)
+        logger.info(f"🩺 tracemalloc started ({TRACEMALLOC_FRAMES} frames)")
+
+
+def top_allocations(limit: int = 20) -> dict:
+    if not tracemalloc.is_tracing():
+        return {"tracing": False, "top": []}
+    snapshot = tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    ))
+    current, peak = tracemalloc.get_traced_memory()
+    return {
+        "tracing": True,
+        "traced_bytes": current,
+        "peak_bytes": peak,
+        "top": [
+            {"where": str(stat.traceback), "size": stat.size, "count": stat.count}
+            for stat in snapshot.statistics("lineno")[:limit]
+        ],
+    }
+
+
+def object_counts(types=TRACKED_TYPES) -> dict:
+    counts = Counter(type(obj).__name__ for obj in gc.get_objects())
+    return {name: counts.get(name, 0) for name in sorted(types)}
+
+
+def playwright_driver_rss() -> list:
+    """The Node driver processes Playwright runs between Python and Chromium"""
+    drivers = []
+    for pid in descendants(os.getpid()):
+        cmdline = process_cmdline(pid)
+        if cmdline and cmdline[0].endswith("node") and "run-driver" in cmdline:
+            drivers.append({"pid": pid, "rss": rss_bytes(pid) or 0})
+    return drivers
+
+
+def memory_report(limit: int = 20) -> dict:
+    """Python allocations, tracked object counts, driver RSS and Chromium RSS per run_id"""
+    chromium = {
+        run_id: {
+            "rss": sum(proc["rss"] for proc in processes),
+            "processes": processes,
+        }
+        for run_id, processes in chromium_by_run().items()
+    }
+    return {
+        "pid": os.getpid(),
+        "timestamp": datetime.utcnow().isoformat(),
+        "rss": rss_bytes(os.getpid()),
+        "tracemalloc": top_allocations(limit),
+        "objects": object_counts(),
+        "playwright_drivers": playwright_driver_rss(),
+        "chromium": chromium,
+        "chromium_rss": sum(run["rss"] for run in chromium.values()),
+    }
+
+
+_ring = None
+
+
+def write_snapshot(label: str = "snapshot", limit: int = 50) -> Path:
+    """
+    Write a JSON report, plus the raw tracemalloc snapshot when tracing, for
+    later comparison (tracemalloc.Snapshot.load(a).compare_to(load(b), "lineno")).
+    """
+    global _ring
+    if _ring is None:
+        _ring = ArtifactRing(Path(DIAGNOSTICS_DIR), DIAGNOSTICS_MAX_FILES, DIAGNOSTICS_MAX_BYTES)
+    stem = f"{label}_{os.getpid()}_{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}"
+    path = _ring.write(f"{stem}.json", json.dumps(memory_report(limit), indent=2).encode())
+    if tracemalloc.is_tracing():
+        raw = Path(DIAGNOSTICS_DIR) / f"{stem}.tracemalloc"
+        tracemalloc.take_snapshot().dump(str(raw))
+        _ring.add(raw)
+    return path
+
+
+def start_periodic_snapshots(label: str, interval: Optional[int] = None) -> Optional[threading.Thread]:
+    """Snapshot every ``interval`` seconds from a daemon thread (DIAGNOSTICS_INTERVAL by default)"""
+    interval = interval or DIAGNOSTICS_INTERVAL
+    if not DIAGNOSTICS_ENABLED or interval <= 0:
+        return None
+
+    def run():
+        while True:
+            time.sleep(interval)
+            try:
+                write_snapshot(label)
+            except Exception as e:
+                logger.warning(f"⚠️ Diagnostics snapshot failed: {e}")
+
+    thread = threading.Thread(target=run, name="diagnostics-snapshots", daemon=True)
+    thread.start()
+    logger.info(f"🩺 Writing memory snapshots to {DIAGNOSTICS_DIR} every {interval}s")
+    return thread
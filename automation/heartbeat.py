@@ -0,0 +1,203 @@
+# automation/heartbeat.py
+# Per-monitor liveness in Redis: each running monitor refreshes a hash with a
+# TTL, so a monitor whose worker died simply stops having one.
+import asyncio
+import json
+import logging
+import os
+import socket
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from config.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+HEARTBEAT_INTERVAL = int(os.getenv("MONITOR_HEARTBEAT_INTERVAL", "15"))
+HEARTBEAT_TTL = int(os.getenv("MONITOR_HEARTBEAT_TTL", "60"))
+HEARTBEAT_KEY_PREFIX = "heartbeat:"
+# run_ids that have started beating; an expired key for a member means the monitor died
+HEARTBEAT_INDEX = "heartbeats"
+# Set by the API when a monitor is stopped; the monitor sees it on its next beat and exits
+STOP_KEY_PREFIX = "monitor_stop:"
+STOP_TTL = 24 * 60 * 60
+
+# Hash fields stored as JSON rather than plain strings
+JSON_FIELDS = {"phases"}
+INT_FIELDS = {"checks", "consecutive_errors"}
+
+
+def heartbeat_key(run_id: str) -> str:
+    return f"{HEARTBEAT_KEY_PREFIX}{run_id}"
+
+
+def worker_id() -> str:
+    return os.getenv("WORKER_ID") or f"{socket.gethostname()}:{os.getpid()}"
+
+
+def decode_heartbeat(fields: dict) -> Optional[dict]:
+    if not fields:
+        return None
+    heartbeat = dict(fields)
+    for field in JSON_FIELDS & heartbeat.keys():
+        try:
+            heartbeat[field] = json.loads(heartbeat[field])
+        except ValueError:
+            heartbeat[field] = None
+    for field in INT_FIELDS & heartbeat.keys():
+        heartbeat[field] = int(heartbeat[field])
+    if "captcha" in heartbeat:
+        heartbeat["captcha"] = heartbeat["captcha"] == "1"
+    return heartbeat
+
+
+def read_heartbeats(run_ids: List[str]) -> Dict[str, Optional[dict]]:
+    """Heartbeats for these runs in one pipelined round trip; {} without Redis"""
+    client = get_redis()
+    if client is None or not run_ids:
+        return {}
+    pipe = client.pipeline(transaction=False)
+    for run_id in run_ids:
+        pipe.hgetall(heartbeat_key(run_id))
+    return {run_id: decode_heartbeat(fields) for run_id, fields in zip(run_ids, pipe.execute())}
+
+
+def expired_runs() -> List[str]:
+    """Runs that have beaten (they're in the index) but no longer have a live heartbeat"""
+    client = get_redis()
+    if client is None:
+        return []
+    run_ids = sorted(client.smembers(HEARTBEAT_INDEX))
+    if not run_ids:
+        return []
+    pipe = client.pipeline(transaction=False)
+    for run_id in run_ids:
+        pipe.exists(heartbeat_key(run_id))
+    return [run_id for run_id, alive in zip(run_ids, pipe.execute()) if not alive]
+
+
+def stop_key(run_id: str) -> str:
+    return f"{STOP_KEY_PREFIX}{run_id}"
+
+
+def request_stop(run_ids: List[str]):
+    """Ask these monitors to exit, releasing their browser slots; no-op without Redis"""
+    client = get_redis()
+    if client is None or not run_ids:
+        return
+    pipe = client.pipeline(transaction=False)
+    for run_id in run_ids:
+        pipe.set(stop_key(run_id), "1", ex=STOP_TTL)
+    pipe.execute()
+
+
+def forget(run_ids: List[str]):
+    client = get_redis()
+    if client is not None and run_ids:
+        client.srem(HEARTBEAT_INDEX, *run_ids)
+
+
+class PhaseTimer:
+    """Milliseconds spent in each phase of one check"""
+    def __init__(self):
+        self.phases: Dict[str, int] = {}
+        self._mark = time.monotonic()
+
+    def lap(self, phase: str):
+        now = time.monotonic()
+        self.phases[phase] = round((now - self._mark) * 1000)
+        self._mark = now
+
+
+class MonitorHeartbeat:
+    """
+    The monitor updates fields as it goes; a background task writes them and
+    refreshes the TTL every HEARTBEAT_INTERVAL seconds, so the heartbeat keeps
+    going through long sleeps and backoffs and stops only if the worker does.
+    Each beat also picks up a stop request from the API (``stop_requested``).
+    No-op without Redis.
+    """
+    def __init__(self, run_id: str):
+        self.run_id = run_id
+        self.key = heartbeat_key(run_id)
+        self.fields = {
+            "run_id": run_id,
+            "worker_id": worker_id(),
+            "started_at": datetime.utcnow().isoformat(),
+            "state": "starting",
+            "checks": 0,
+            "consecutive_errors": 0,
+            "captcha": False,
+        }
+        self._client = get_redis()
+        self._task = None
+        self._stop = asyncio.Event()
+
+    @property
+    def stop_requested(self) -> bool:
+        return self._stop.is_set()
+
+    async def sleep(self, seconds: float):
+        """Sleep, waking early if a stop is requested meanwhile"""
+        try:
+            await asyncio.wait_for(self._stop.wait(), timeout=seconds)
+        except asyncio.TimeoutError:
+            pass
+
+    def update(self, **fields):
+        self.fields.update(fields)
+
+    def _encode(self) -> dict:
+        encoded = {}
+        for field, value in self.fields.items():
+            if value is None:
+                continue
+            if field in JSON_FIELDS:
+                value = json.dumps(value)
+            elif isinstance(value, bool):
+                value = "1" if value else "0"
+            encoded[field] = value
+        return {**encoded, "beat_at": datetime.utcnow().isoformat()}
+
+    def _write(self) -> bool:
+        pipe = self._client.pipeline(transaction=False)
+        pipe.hset(self.key, mapping=self._encode())
+        pipe.expire(self.key, HEARTBEAT_TTL)
+        pipe.sadd(HEARTBEAT_INDEX, self.run_id)
+        pipe.exists(stop_key(self.run_id))
+        return bool(pipe.execute()[-1])
+
+    async def beat(self):
+        if self._client is None:
+            return
+        try:
+            if await asyncio.to_thread(self._write):
+                self._stop.set()
+        except Exception as e:
+            logger.warning(f"⚠️ Heartbeat write failed: {e}", extra={"run_id": self.run_id})
+
+    async def _run(self):
+        while True:
+            await self.beat()
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+
+    def start(self):
+        if self._client is not None and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """
+        Drop the heartbeat when the monitor exits. The run stays in the index,
+        so if the DB still says it's active (it failed rather than being
+        stopped) the reaper marks it dead right away instead of after the TTL.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._client is None:
+            return
+        try:
+            await asyncio.to_thread(self._client.delete, self.key, stop_key(self.run_id))
+        except Exception as e:
+            logger.warning(f"⚠️ Could not clear heartbeat: {e}", extra={"run_id": self.run_id})
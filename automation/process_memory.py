@@ -0,0 +1,101 @@
+# automation/process_memory.py
+# Process memory from /proc (Linux only; elsewhere everything reports None/empty).
+import os
+from pathlib import Path
+from typing import Dict, List, Optional
+
+PROC = Path("/proc")
+
+# Chromium ignores switches it doesn't know, so this tags a monitor's browser
+# process with its run_id and lets us find its process tree again.
+RUN_ID_SWITCH = "--visa-bot-run-id"
+
+
+def run_id_arg(run_id: str) -> str:
+    return f"{RUN_ID_SWITCH}={run_id}"
+
+
+def rss_bytes(pid: int) -> Optional[int]:
+    try:
+        for line in (PROC / str(pid) / "status").read_text().splitlines():
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def process_cmdline(pid: int) -> List[str]:
+    try:
+        return (PROC / str(pid) / "cmdline").read_bytes().decode(errors="replace").split("\0")
+    except OSError:
+        return []
+
+
+def _parent_map() -> Dict[int, int]:
+    parents = {}
+    if not PROC.exists():
+        return parents
+    for entry in PROC.iterdir():
+        if not entry.name.isdigit():
+            continue
+        try:
+            # The command name may contain spaces/parens; ppid follows the last ')'
+            stat = (entry / "stat").read_text()
+            parents[int(entry.name)] = int(stat.rsplit(")", 1)[1].split()[1])
+        except (OSError, ValueError, IndexError):
+            continue
+    return parents
+
+
+def descendants(pid: int, parents: Optional[Dict[int, int]] = None) -> List[int]:
+    parents = parents if parents is not None else _parent_map()
+    children: Dict[int, List[int]] = {}
+    for child, parent in parents.items():
+        children.setdefault(parent, []).append(child)
+    found, stack = [], [pid]
+    while stack:
+        for child in children.get(stack.pop(), []):
+            found.append(child)
+            stack.append(child)
+    return found
+
+
+def process_type(cmdline: List[str]) -> str:
+    for arg in cmdline:
+        if arg.startswith("--type="):
+            return arg[len("--type="):]
+    return "browser"
+
+
+def chromium_by_run(root_pid: Optional[int] = None) -> Dict[str, List[dict]]:
+    """
+    Chromium processes under this process (through the Playwright driver),
+    grouped by the run_id their browser was launched with. Renderers, GPU and
+    utility processes are attributed to the browser process they descend from.
+    """
+    parents = _parent_map()
+    runs: Dict[str, List[dict]] = {}
+    for pid in descendants(root_pid or os.getpid(), parents):
+        cmdline = process_cmdline(pid)
+        tag = next((arg.split("=", 1)[1] for arg in cmdline if arg.startswith(RUN_ID_SWITCH + "=")), None)
+        if tag is None or process_type(cmdline) != "browser":
+            continue
+        tree = [pid] + descendants(pid, parents)
+        runs[tag] = [
+            {"pid": child, "type": process_type(process_cmdline(child)), "rss": rss_bytes(child) or 0}
+            for child in tree
+        ]
+    return runs
+
+
+def browser_memory(run_id: str) -> dict:
+    """RSS of one monitor's Chromium tree, plus this worker process"""
+    processes = chromium_by_run().get(run_id, [])
+    return {
+        "run_id": run_id,
+        "worker_rss": rss_bytes(os.getpid()),
+        "browser_rss": sum(proc["rss"] for proc in processes),
+        "renderer_rss": sum(proc["rss"] for proc in processes if proc["type"] == "renderer"),
+        "processes": len(processes),
+    }
@@ -0,0 +1,97 @@
+# automation/recording.py
+# Record real monitor/booking navigations and replay them offline.
+#
+#   MONITOR_MODE=live    normal operation (default)
+#   MONITOR_MODE=record  save a HAR (and DOM snapshots) of every navigation
+#   MONITOR_MODE=replay  serve every request from the HAR; nothing reaches the network
+import logging
+import os
+from pathlib import Path
+
+from automation.screenshots import _safe_name
+
+logger = logging.getLogger(__name__)
+
+MODE_LIVE = "live"
+MODE_RECORD = "record"
+MODE_REPLAY = "replay"
+
+MONITOR_MODE = os.getenv("MONITOR_MODE", MODE_LIVE)
+RECORDINGS_DIR = os.getenv("RECORDINGS_DIR", "recordings")
+RECORDING_NAME = os.getenv("RECORDING_NAME", "default")
+
+
+def recording() -> bool:
+    return MONITOR_MODE == MODE_RECORD
+
+
+def replaying() -> bool:
+    return MONITOR_MODE == MODE_REPLAY
+
+
+def recording_dir(name: str = None) -> Path:
+    return Path(RECORDINGS_DIR) / _safe_name(name or RECORDING_NAME)
+
+
+def har_path(flow: str, name: str = None) -> Path:
+    """One HAR per flow ("monitor", "booking"); attached bodies are kept inside the zip"""
+    return recording_dir(name) / f"{flow}.har.zip"
+
+
+def context_options(flow: str) -> dict:
+    """Extra new_context() options for the current mode"""
+    if not recording():
+        return {}
+    path = har_path(flow)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    logger.info(f"🎙️ Recording {flow} navigations to {path}")
+    # The HAR is written when the context closes
+    return {"record_har_path": str(path), "record_har_mode": "full"}
+
+
+async def prepare_context(context, flow: str):
+    """In replay mode, answer every request from the recording and abort anything it lacks"""
+    if not replaying():
+        return
+    path = har_path(flow)
+    if not path.exists():
+        raise FileNotFoundError(f"No {flow} recording at {path}; record one with MONITOR_MODE=record")
+    await context.route_from_har(str(path), not_found="abort")
+    logger.info(f"📼 Replaying {flow} navigations from {path}")
+
+
+async def snapshot_dom(page, flow: str, label: str):
+    """Save the rendered DOM while recording, for offline selector checks"""
+    if not recording():
+        return None
+    path = recording_dir() / f"{flow}_{_safe_name(label)}.html"
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(await page.content())
+    except Exception as e:
+        logger.warning(f"⚠️ Could not save DOM snapshot: {e}")
+        return None
+    return path
+
+
+def dom_snapshots(name: str = None) -> list:
+    return sorted(recording_dir(name).glob("*.html"))
+
+
+async def check_selectors(page, html: str, selectors: dict) -> dict:
+    """
+    Load a saved DOM and report, per category, which fallback selectors
+    still match. A category with no match means the site changed under it.
+    """
+    await page.set_content(html, wait_until="domcontentloaded")
+    results = {}
+    for category, candidates in selectors.items():
+        matched = []
+        for selector in candidates:
+            try:
+                if await page.locator(selector).count():
+                    matched.append(selector)
+            except Exception:
+                continue
+        results[category] = matched
+    return results
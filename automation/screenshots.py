@@ -0,0 +1,203 @@
+# automation/screenshots.py
+import asyncio
+import io
+import logging
+import os
+import re
+import threading
+from collections import defaultdict, deque
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Capture levels, from cheapest to most verbose
+LEVEL_OFF = "off"
+LEVEL_ON_ERROR = "on_error"
+LEVEL_DEBUG = "debug"
+LEVELS = (LEVEL_OFF, LEVEL_ON_ERROR, LEVEL_DEBUG)
+
+SCREENSHOT_LEVEL = os.getenv("SCREENSHOT_LEVEL", LEVEL_ON_ERROR)
+SCREENSHOT_FORMAT = os.getenv("SCREENSHOT_FORMAT", "jpeg")  # jpeg | png | webp
+SCREENSHOT_QUALITY = int(os.getenv("SCREENSHOT_QUALITY", "60"))
+SCREENSHOT_DIR = os.getenv("SCREENSHOT_DIR", "logs/screenshots")
+SCREENSHOT_MAX_FILES = int(os.getenv("SCREENSHOT_MAX_FILES", "20"))
+SCREENSHOT_MAX_BYTES = int(os.getenv("SCREENSHOT_MAX_BYTES", str(10 * 1024 * 1024)))
+
+
+def _safe_name(value: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", value) or "default"
+
+
+class ArtifactRing:
+    """
+    Size- and count-bounded set of files in one directory.
+    Oldest files are deleted first once either bound is exceeded.
+    """
+    def __init__(self, directory: Path, max_files: int, max_bytes: int):
+        self.directory = Path(directory)
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+        self._entries = deque()  # (path, size)
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+        # Pick up files left over from a previous process
+        if self.directory.exists():
+            existing = sorted(
+                (p for p in self.directory.iterdir() if p.is_file()),
+                key=lambda p: p.stat().st_mtime
+            )
+            for path in existing:
+                self._track(path, path.stat().st_size)
+            self._evict()
+
+    def _track(self, path: Path, size: int):
+        self._entries.append((path, size))
+        self._total_bytes += size
+
+    def _evict(self):
+        while self._entries and (
+            len(self._entries) > self.max_files or self._total_bytes > self.max_bytes
+        ):
+            path, size = self._entries.popleft()
+            self._total_bytes -= size
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+    def write(self, filename: str, data: bytes) -> Path:
+        """Blocking write; call from a worker thread."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / filename
+        path.write_bytes(data)
+        with self._lock:
+            self._track(path, len(data))
+            self._evict()
+        return path
+
+    def add(self, path: Path):
+        """Track a file that was written by someone else (e.g. Playwright)."""
+        with self._lock:
+            self._track(Path(path), Path(path).stat().st_size)
+            self._evict()
+
+    def files(self):
+        with self._lock:
+            return [path for path, _ in self._entries]
+
+
+class ScreenshotService:
+    """
+    Level-gated screenshot capture.
+
+    - off:      never capture
+    - on_error: capture only when ``error=True``
+    - debug:    capture everything
+
+    Images are encoded by the browser and written to disk in a worker
+    thread, so callers only pay for the capture itself. Each run_id gets
+    its own bounded ring of files.
+    """
+    def __init__(self, level: str = SCREENSHOT_LEVEL, image_format: str = SCREENSHOT_FORMAT,
+                 quality: int = SCREENSHOT_QUALITY, directory: str = SCREENSHOT_DIR,
+                 max_files: int = SCREENSHOT_MAX_FILES, max_bytes: int = SCREENSHOT_MAX_BYTES):
+        if level not in LEVELS:
+            logger.warning(f"Unknown screenshot level '{level}', using '{LEVEL_ON_ERROR}'")
+            level = LEVEL_ON_ERROR
+        self.level = level
+        self.image_format = image_format
+        self.quality = quality
+        self.directory = Path(directory)
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+        self._rings = {}
+        self._pending = set()
+        self._counters = defaultdict(int)
+
+    def enabled(self, error: bool = False) -> bool:
+        if self.level == LEVEL_DEBUG:
+            return True
+        return error and self.level == LEVEL_ON_ERROR
+
+    def _ring(self, run_id: str) -> ArtifactRing:
+        ring = self._rings.get(run_id)
+        if ring is None:
+            ring = ArtifactRing(self.directory / _safe_name(run_id), self.max_files, self.max_bytes)
+            self._rings[run_id] = ring
+        return ring
+
+    def _screenshot_kwargs(self, full_page: bool) -> dict:
+        # Playwright only encodes png/jpeg natively; webp is transcoded afterwards
+        kwargs = {"type": "png" if self.image_format == "png" else "jpeg"}
+        if kwargs["type"] == "jpeg":
+            kwargs["quality"] = self.quality
+        if full_page:
+            kwargs["full_page"] = True
+        return kwargs
+
+    def _encode(self, data: bytes):
+        """Return (bytes, extension). Runs in a worker thread."""
+        if self.image_format == "webp":
+            try:
+                from PIL import Image
+            except ImportError:
+                return data, "jpg"
+            buffer = io.BytesIO()
+            Image.open(io.BytesIO(data)).save(buffer, format="WEBP", quality=self.quality)
+            return buffer.getvalue(), "webp"
+        return data, "png" if self.image_format == "png" else "jpg"
+
+    def _write(self, ring: ArtifactRing, stem: str, data: bytes) -> str:
+        data, extension = self._encode(data)
+        path = ring.write(f"{stem}.{extension}", data)
+        logger.info(f"Screenshot saved: {path}")
+        return str(path)
+
+    async def capture(self, page, label: str, run_id: str = "default", element=None,
+                      error: bool = False, full_page: bool = False):
+        """
+        Capture the viewport (or a single element) if the level allows it.
+        Returns the asyncio task that writes the file, or None when skipped.
+        """
+        if not self.enabled(error):
+            return None
+
+        try:
+            target = element or page
+            kwargs = self._screenshot_kwargs(full_page and element is None)
+            data = await target.screenshot(**kwargs)
+        except Exception as e:
+            logger.error(f"Failed to take screenshot: {e}")
+            return None
+
+        self._counters[run_id] += 1
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        stem = f"{timestamp}_{self._counters[run_id]:05d}_{_safe_name(label)}"
+
+        # ✅ The ring is looked up here on the event loop, never from the writer threads,
+        # so a run can't end up with two rings and flush() can't race a write
+        task = asyncio.create_task(asyncio.to_thread(self._write, self._ring(run_id), stem, data))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+        return task
+
+    async def flush(self, run_id: Optional[str] = None):
+        """
+        Wait for all pending writes (e.g. before closing the browser). Given
+        the run_id of a run that is ending, also forget its ring and counter;
+        the files stay on disk and are picked up again if the run resumes.
+        """
+        if self._pending:
+            await asyncio.gather(*list(self._pending), return_exceptions=True)
+        if run_id is not None:
+            self._rings.pop(run_id, None)
+            self._counters.pop(run_id, None)
+
+    def files(self, run_id: str):
+        return [str(path) for path in self._ring(run_id).files()]
+
+
+screenshots = ScreenshotService()
@@ -0,0 +1,234 @@
+# automation/selector_cache.py
+import asyncio
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+
+from config.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+SELECTOR_STATS_FILE = os.getenv("SELECTOR_STATS_FILE", "logs/selector_stats.json")
+REDIS_KEY_PREFIX = "selectors:"
+
+# How long the last-known-good selector gets before we race the others
+FIRST_TRY_TIMEOUT = int(os.getenv("SELECTOR_FIRST_TRY_TIMEOUT", "1500"))
+
+
+class FileSelectorStore:
+    """Selector statistics kept in a local JSON file."""
+    def __init__(self, path: str = SELECTOR_STATS_FILE):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._data = None
+
+    def _load(self) -> dict:
+        if self._data is None:
+            try:
+                self._data = json.loads(self.path.read_text())
+            except (FileNotFoundError, ValueError):
+                self._data = {}
+        return self._data
+
+    def get(self, category: str) -> dict:
+        with self._lock:
+            return dict(self._load().get(category, {}))
+
+    def all(self) -> dict:
+        with self._lock:
+            return {category: dict(fields) for category, fields in self._load().items()}
+
+    def record(self, category: str, counters: dict, last_good: str = None):
+        with self._lock:
+            fields = self._load().setdefault(category, {})
+            for name, amount in counters.items():
+                fields[name] = fields.get(name, 0) + amount
+            if last_good:
+                fields["last_good"] = last_good
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(self._data, indent=2))
+            tmp.replace(self.path)
+
+
+class RedisSelectorStore:
+    """Selector statistics shared by all workers through Redis hashes."""
+    def __init__(self, client):
+        self.client = client
+
+    def _key(self, category: str) -> str:
+        return f"{REDIS_KEY_PREFIX}{category}"
+
+    def get(self, category: str) -> dict:
+        return self.client.hgetall(self._key(category))
+
+    def all(self) -> dict:
+        keys = list(self.client.scan_iter(f"{REDIS_KEY_PREFIX}*"))
+        pipe = self.client.pipeline()
+        for key in keys:
+            pipe.hgetall(key)
+        return {key[len(REDIS_KEY_PREFIX):]: fields for key, fields in zip(keys, pipe.execute())}
+
+    def record(self, category: str, counters: dict, last_good: str = None):
+        pipe = self.client.pipeline()
+        key = self._key(category)
+        for name, amount in counters.items():
+            pipe.hincrby(key, name, amount)
+        if last_good:
+            pipe.hset(key, "last_good", last_good)
+        pipe.execute()
+
+
+_store = None
+
+
+def get_store():
+    """Redis when available, otherwise a local file."""
+    global _store
+    if _store is None:
+        client = get_redis()
+        _store = RedisSelectorStore(client) if client is not None else FileSelectorStore()
+    return _store
+
+
+def summarize(fields: dict) -> dict:
+    """Turn raw counters into hit rates."""
+    lookups = int(fields.get("lookups", 0))
+    first_try_hits = int(fields.get("first_try_hits", 0))
+    failures = int(fields.get("failures", 0))
+    hits = {
+        name[len("hit:"):]: int(value)
+        for name, value in fields.items() if name.startswith("hit:")
+    }
+    return {
+        "last_good": fields.get("last_good"),
+        "lookups": lookups,
+        "first_try_hit_rate": round(first_try_hits / lookups, 3) if lookups else None,
+        "failure_rate": round(failures / lookups, 3) if lookups else None,
+        "hits": hits,
+    }
+
+
+def selector_stats() -> dict:
+    """Hit rates per selector category; a falling first-try rate means the site changed."""
+    try:
+        return {category: summarize(fields) for category, fields in get_store().all().items()}
+    except Exception as e:
+        logger.error(f"Failed to read selector stats: {e}")
+        return {}
+
+
+class SelectorResolver:
+    """
+    Resolve one of several fallback selectors for a page element.
+
+    The selector that worked last time is tried first with a short
+    timeout; if it misses, the remaining selectors are raced in parallel
+    and the winner becomes the new last-known-good.
+    """
+    def __init__(self, store=None, first_try_timeout: int = FIRST_TRY_TIMEOUT):
+        self.store = store or get_store()
+        self.first_try_timeout = first_try_timeout
+        self._last_good = {}
+        self._pending = set()
+
+    async def _preferred(self, category: str, selectors: list):
+        if category not in self._last_good:
+            try:
+                fields = await asyncio.to_thread(self.store.get, category)
+            except Exception as e:
+                logger.warning(f"Selector stats unavailable: {e}")
+                fields = {}
+            self._last_good[category] = fields.get("last_good")
+        preferred = self._last_good[category]
+        return preferred if preferred in selectors else None
+
+    def _write(self, category: str, counters: dict, last_good: str = None):
+        try:
+            self.store.record(category, counters, last_good)
+        except Exception as e:
+            logger.warning(f"Failed to record selector stats: {e}")
+
+    async def _record(self, category: str, counters: dict, last_good: str = None):
+        if last_good:
+            self._last_good[category] = last_good
+        # Stats are written off the hot path; the caller doesn't wait for them
+        task = asyncio.create_task(asyncio.to_thread(self._write, category, counters, last_good))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _race(self, page, selectors: list, state: str, timeout: int):
+        tasks = {
+            asyncio.create_task(page.wait_for_selector(selector, state=state, timeout=timeout)): selector
+            for selector in selectors
+        }
+        winner = None
+        pending = set(tasks)
+        try:
+            while pending and winner is None:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if not task.exception() and winner is None:
+                        winner = tasks[task]
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+        return winner
+
+    async def prioritize(self, category: str, selectors: list) -> list:
+        """Selectors in the order to try them, last-known-good first."""
+        preferred = await self._preferred(category, selectors)
+        if not preferred:
+            return list(selectors)
+        return [preferred] + [selector for selector in selectors if selector != preferred]
+
+    async def record_result(self, category: str, selector: str = None):
+        """Record the outcome of a lookup that was resolved elsewhere (e.g. in-page)."""
+        if not selector:
+            await self._record(category, {"lookups": 1, "failures": 1})
+        elif selector == self._last_good.get(category):
+            await self._record(category, {"lookups": 1, "first_try_hits": 1, f"hit:{selector}": 1})
+        else:
+            await self._record(category, {"lookups": 1, f"hit:{selector}": 1}, last_good=selector)
+
+    async def resolve(self, page, category: str, selectors: list, state: str = "visible", timeout: int = 5000):
+        """Return the first selector that matches, or None."""
+        preferred = await self._preferred(category, selectors)
+        if preferred:
+            try:
+                await page.wait_for_selector(preferred, state=state, timeout=self.first_try_timeout)
+                await self._record(category, {"lookups": 1, "first_try_hits": 1, f"hit:{preferred}": 1})
+                return preferred
+            except Exception:
+                pass
+
+        rest = [selector for selector in selectors if selector != preferred]
+        winner = await self._race(page, rest, state, timeout) if rest else None
+        if winner:
+            await self._record(category, {"lookups": 1, f"hit:{winner}": 1}, last_good=winner)
+        else:
+            await self._record(category, {"lookups": 1, "failures": 1})
+            logger.warning(f"No selector matched for '{category}'")
+        return winner
+
+    async def click(self, page, category: str, selectors: list, timeout: int = 5000) -> bool:
+        selector = await self.resolve(page, category, selectors, timeout=timeout)
+        if not selector:
+            return False
+        await page.click(selector, timeout=timeout)
+        return True
+
+
+_resolver = None
+
+
+def get_resolver() -> SelectorResolver:
+    """Process-wide resolver, created on first use so importing stays cheap."""
+    global _resolver
+    if _resolver is None:
+        _resolver = SelectorResolver()
+    return _resolver
@@ -1,13 +1,22 @@
 # playwright/slot_monitor.py
 import asyncio
 import logging
+import os
 import random
 import hashlib
+import time
 from datetime import datetime
 from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeout
+from automation.screenshots import screenshots
+from automation.selector_cache import get_resolver
+from automation.circuit_breaker import (
+    breaker_for, parse_retry_after, CircuitBreaker, MemoryBreakerStore, TRIP_STATUSES, BREAKER_CAPTCHA_COOLDOWN
+)
+from automation import recording
+from automation.process_memory import browser_memory, run_id_arg
+from automation.tracing import CheckTracer
+from automation.heartbeat import MonitorHeartbeat, PhaseTimer
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 TARGET_URL = "https://visa.vfsglobal.com/moz/en/prt/apply"
@@ -46,17 +55,55 @@ SELECTORS = {
     ]
 }
 
+# Empty disables event delivery (e.g. offline replay runs)
+MONITOR_WEBHOOK_URL = os.getenv("MONITOR_WEBHOOK_URL", "http://api:8000/webhooks/monitor-event")
+
 POLL_INTERVAL = 60
 JITTER_RANGE = (1, 10)
 MAX_RETRIES = 3
 
+# ✅ Recycling keeps days-long monitors at a flat RSS: a fresh page after this many
+# navigations, a fresh context (cookies carried over) when renderers pass the limit
+RECYCLE_NAVIGATIONS = int(os.getenv("MONITOR_RECYCLE_NAVIGATIONS", "200"))
+RENDERER_RSS_LIMIT_MB = int(os.getenv("MONITOR_RENDERER_RSS_MB", "512"))
+MEMORY_REPORT_EVERY = int(os.getenv("MONITOR_MEMORY_REPORT_EVERY", "10"))
+MB = 1024 * 1024
+
+# Events that conclude a check; the first one sent carries the check's duration_ms
+CHECK_OUTCOMES = {
+    "monitor_started", "no_slots", "slots_found", "slots_removed", "no_content", "captcha_detected", "rate_limited", "error"
+}
+
+BROWSER_ARGS = [
+    "--no-sandbox",
+    "--disable-dev-shm-usage",
+    "--disable-web-security",
+    "--disable-features=VizDisplayCompositor",
+    "--disable-blink-features=AutomationControlled"
+]
+
+CONTEXT_OPTIONS = {
+    "user_agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "viewport": {"width": 1366, "height": 768},
+    "extra_http_headers": {
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
+        "Accept-Language": "en-US,en;q=0.5",
+        "Accept-Encoding": "gzip, deflate",
+        "DNT": "1",
+        "Connection": "keep-alive",
+        "Upgrade-Insecure-Requests": "1"
+    }
+}
+
 async def http_notify(payload: dict):
     """Send event to FastAPI webhook"""
+    if not MONITOR_WEBHOOK_URL:
+        return
     import httpx
     try:
         async with httpx.AsyncClient() as client:
             await client.post(
-                "http://api:8000/webhooks/monitor-event",
+                MONITOR_WEBHOOK_URL,
                 json=payload,
                 timeout=5.0
             )
@@ -73,17 +120,26 @@ async def detect_captcha(page):
             continue
     return False
 
-async def get_page_content(page):
-    """Get slot container content with multiple selector fallbacks"""
-    for selector in SELECTORS['slot_container']:
+async def detect_no_slots(page):
+    """Check if the page says there are no dates (the slot container is already loaded)"""
+    for selector in SELECTORS['no_slots']:
         try:
-            await page.wait_for_selector(selector, timeout=5000)
-            content = await page.inner_html(selector)
-            if content and content.strip():
-                return content.strip()
-        except PlaywrightTimeout:
+            if await page.is_visible(selector):
+                return True
+        except:
             continue
-    return ""
+    return False
+
+async def get_page_content(page):
+    """Get slot container content with multiple selector fallbacks"""
+    selector = await get_resolver().resolve(page, "slot_container", SELECTORS['slot_container'], state="attached")
+    if not selector:
+        return ""
+    try:
+        content = await page.inner_html(selector)
+        return content.strip() if content else ""
+    except PlaywrightTimeout:
+        return ""
 
 def compute_hash(content: str) -> str:
     """Compute MD5 hash of content for change detection"""
@@ -97,6 +153,20 @@ async def wait_for_page_load(page, timeout=30000):
     except PlaywrightTimeout:
         logger.warning("Page load timeout, continuing anyway")
 
+async def recycle_context(browser, context):
+    """Swap in a fresh context and page, keeping cookies and localStorage"""
+    storage_state = await context.storage_state()
+    await context.close()
+    context = await browser.new_context(**CONTEXT_OPTIONS, **recording.context_options("monitor"),
+                                        storage_state=storage_state)
+    await recording.prepare_context(context, "monitor")
+    return context, await context.new_page()
+
+def format_memory(memory: dict) -> str:
+    return (f"browser {memory['browser_rss'] // MB} MB "
+            f"(renderers {memory['renderer_rss'] // MB} MB, {memory['processes']} processes), "
+            f"worker {(memory['worker_rss'] or 0) // MB} MB")
+
 class MonitorState:
     """Track monitoring state and retry logic"""
     def __init__(self):
@@ -118,80 +188,165 @@ class MonitorState:
         self.retry_count = 0
         self.consecutive_errors = 0
         self.last_successful_check = datetime.utcnow()
+        self.captcha_detected = False
 
-async def monitor_slots(run_id: str, notify_callback):
-    """Enhanced slot monitoring with CAPTCHA handling and retry logic"""
+async def monitor_slots(run_id: str, notify_callback, max_checks: int = None):
+    """
+    Enhanced slot monitoring with CAPTCHA handling and retry logic.
+    Runs until stopped, or for ``max_checks`` checks when given (benchmarks, replay runs).
+    """
     state = MonitorState()
     old_hash = None
     first_run = True
+    slots_open = False
+    # A replay must never pause live monitors, so it gets a private breaker
+    breaker = breaker_for(TARGET_URL)
+    if recording.replaying():
+        breaker = CircuitBreaker(breaker.host, MemoryBreakerStore())
+    paused = False
+    checks = 0
+    navigations = 0
+    tracer = CheckTracer(run_id)
+    heartbeat = MonitorHeartbeat(run_id)
     browser = None
     context = None
     page = None
+    check_started = None
+
+    async def emit(payload: dict):
+        nonlocal check_started
+        if check_started is not None and payload["event"] in CHECK_OUTCOMES:
+            payload = {**payload, "duration_ms": round((time.monotonic() - check_started) * 1000)}
+            check_started = None
+            heartbeat.update(last_outcome=payload["event"])
+        # ✅ Tag every event with its run so dashboard clients can subscribe per monitor
+        await http_notify({**payload, "run_id": run_id})
 
     try:
+        # ✅ Liveness for /monitors/status and the dead-monitor reaper
+        heartbeat.start()
         async with async_playwright() as p:
-            # Launch browser with better configuration
-            browser = await p.chromium.launch(
-                headless=True,
-                args=[
-                    "--no-sandbox",
-                    "--disable-dev-shm-usage",
-                    "--disable-web-security",
-                    "--disable-features=VizDisplayCompositor",
-                    "--disable-blink-features=AutomationControlled"
-                ]
-            )
+            # Launch browser with better configuration; the run_id switch lets us find its processes
+            browser = await p.chromium.launch(headless=True, args=BROWSER_ARGS + [run_id_arg(run_id)])
             
-            context = await browser.new_context(
-                user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-                viewport={"width": 1366, "height": 768},
-                extra_http_headers={
-                    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
-                    "Accept-Language": "en-US,en;q=0.5",
-                    "Accept-Encoding": "gzip, deflate",
-                    "DNT": "1",
-                    "Connection": "keep-alive",
-                    "Upgrade-Insecure-Requests": "1"
-                }
-            )
+            context = await browser.new_context(**CONTEXT_OPTIONS, **recording.context_options("monitor"))
+            await recording.prepare_context(context, "monitor")
             page = await context.new_page()
+            await tracer.attach(context)
 
             while True:
+                if max_checks and checks >= max_checks:
+                    break
+                if heartbeat.stop_requested:
+                    logger.info("⏹️ Stop requested, closing monitor", extra={"run_id": run_id})
+                    break
                 timestamp = datetime.utcnow().strftime("%H:%M:%S")
                 
+                # ✅ Shared per-host breaker: every monitor on the host waits out outages and rate limits together
+                wait = await breaker.before_check()
+                if wait:
+                    heartbeat.update(state="paused")
+                    if not paused:
+                        paused = True
+                        await emit({
+                            "event": "monitor_paused",
+                            "timestamp": timestamp,
+                            "message": f"[{timestamp}] ⏸️ {breaker.host} is backing off; next check in {int(wait)}s"
+                        })
+                    # Wakes early on a stop request; the top of the loop then exits
+                    await heartbeat.sleep(wait)
+                    continue
+                paused = False
+                
+                checks += 1
+                heartbeat.update(state="checking", checks=checks)
+                memory = await asyncio.to_thread(browser_memory, run_id)
+                recycle_reason = None
+                if RENDERER_RSS_LIMIT_MB and memory["renderer_rss"] > RENDERER_RSS_LIMIT_MB * MB:
+                    recycle_reason = f"renderers at {memory['renderer_rss'] // MB} MB"
+                    context, page = await recycle_context(browser, context)
+                    await tracer.attach(context)
+                elif RECYCLE_NAVIGATIONS and navigations >= RECYCLE_NAVIGATIONS:
+                    recycle_reason = f"{navigations} navigations"
+                    await page.close()
+                    page = await context.new_page()
+                if recycle_reason:
+                    navigations = 0
+                    logger.info(f"♻️ Recycled browser page ({recycle_reason})", extra={"run_id": run_id})
+                    await emit({
+                        "event": "monitor_recycled",
+                        "timestamp": timestamp,
+                        "message": f"[{timestamp}] ♻️ Fresh browser page after {recycle_reason}"
+                    })
+                if MEMORY_REPORT_EVERY and checks % MEMORY_REPORT_EVERY == 0:
+                    logger.info(f"🧠 Memory: {format_memory(memory)}", extra={"run_id": run_id})
+                    await emit({
+                        "event": "monitor_memory",
+                        "timestamp": timestamp,
+                        "message": f"[{timestamp}] 🧠 {format_memory(memory)}",
+                        "memory": memory
+                    })
+                
                 # Log checking status
-                await http_notify({
+                await emit({
                     "event": "slot_check",
                     "timestamp": timestamp,
                     "message": f"[{timestamp}] 🔍 Checking slots... (attempt {state.retry_count + 1})"
                 })
 
+                # ✅ Each check is its own trace chunk, kept only if it fails or is slow
+                await tracer.begin()
+                check_started = time.monotonic()
+                check_failed = False
+                timer = PhaseTimer()
                 try:
                     # Navigate to page
-                    await page.goto(TARGET_URL, wait_until="networkidle", timeout=60000)
+                    response = await page.goto(TARGET_URL, wait_until="networkidle", timeout=60000)
+                    timer.lap("navigate")
+                    navigations += 1
+                    if response is not None and response.status in TRIP_STATUSES:
+                        check_failed = True
+                        await breaker.record_failure(
+                            f"HTTP {response.status}", trip=True,
+                            retry_after=parse_retry_after(response.headers.get("retry-after"))
+                        )
+                        await emit({
+                            "event": "rate_limited",
+                            "timestamp": timestamp,
+                            "message": f"[{timestamp}] ⛔ HTTP {response.status} from {breaker.host} — pausing all monitors for this host"
+                        })
+                        continue
                     await wait_for_page_load(page)
+                    timer.lap("load")
                     
                     # Check for CAPTCHA first
-                    if await detect_captcha(page):
+                    captcha = await detect_captcha(page)
+                    timer.lap("captcha")
+                    if captcha:
                         state.captcha_detected = True
                         state.consecutive_errors += 1
+                        check_failed = True
                         
-                        await http_notify({
+                        await emit({
                             "event": "captcha_detected",
                             "timestamp": timestamp,
                             "message": f"[{timestamp}] ⚠️ CAPTCHA detected — monitoring paused. Manual intervention required."
                         })
                         
-                        # Wait longer when CAPTCHA is detected
-                        await asyncio.sleep(300)  # 5 minutes
+                        # Wait longer when CAPTCHA is detected; the breaker pauses every monitor on the host
+                        await breaker.record_failure("captcha", trip=True, cooldown=BREAKER_CAPTCHA_COOLDOWN)
                         continue
                     
                     # Get page content
                     content = await get_page_content(page)
+                    timer.lap("content")
                     
                     if not content:
                         state.consecutive_errors += 1
-                        await http_notify({
+                        check_failed = True
+                        await tracer.end(failed=True, label="no_content")
+                        await breaker.record_failure("no slot container")
+                        await emit({
                             "event": "no_content",
                             "timestamp": timestamp,
                             "message": f"[{timestamp}] ⚠️ No slot container found - page may have changed"
@@ -200,10 +355,10 @@ async def monitor_slots(run_id: str, notify_callback):
                         if state.should_retry():
                             state.retry_count += 1
                             delay = state.get_retry_delay()
-                            await asyncio.sleep(delay)
+                            await heartbeat.sleep(delay)
                             continue
                         else:
-                            await http_notify({
+                            await emit({
                                 "event": "monitor_failed",
                                 "timestamp": timestamp,
                                 "message": f"[{timestamp}] ❌ Max retries reached. Monitor stopping."
@@ -212,10 +367,12 @@ async def monitor_slots(run_id: str, notify_callback):
                     
                     # Reset retry count on successful content retrieval
                     state.reset_retry()
+                    await breaker.record_success()
                     current_hash = compute_hash(content)
+                    await recording.snapshot_dom(page, "monitor", current_hash[:12])
 
                     if first_run:
-                        await http_notify({
+                        await emit({
                             "event": "monitor_started",
                             "timestamp": timestamp,
                             "message": f"[{timestamp}] ✅ Monitoring started successfully"
@@ -223,14 +380,39 @@ async def monitor_slots(run_id: str, notify_callback):
                         old_hash = current_hash
                         first_run = False
                     elif current_hash != old_hash:
-                        await http_notify({
-                            "event": "slots_found",
-                            "timestamp": timestamp,
-                            "message": f"[{timestamp}] 🎉 SLOT AVAILABLE! Book now!"
-                        })
+                        # ✅ Once slots were seen, a change back to "no dates" is a removal, not a release
+                        if slots_open and await detect_no_slots(page):
+                            slots_open = False
+                            await emit({
+                                "event": "slots_removed",
+                                "timestamp": timestamp,
+                                "message": f"[{timestamp}] 📭 Slots are gone again"
+                            })
+                            await notify_callback({
+                                "event": "slots_removed",
+                                "run_id": run_id,
+                                "timestamp": timestamp,
+                                "url": TARGET_URL,
+                                "content_hash": current_hash,
+                                "urgent": False
+                            })
+                        else:
+                            slots_open = True
+                            await emit({
+                                "event": "slots_found",
+                                "timestamp": timestamp,
+                                "message": f"[{timestamp}] 🎉 SLOT AVAILABLE! Book now!"
+                            })
+                            await notify_callback({
+                                "event": "slots_found",
+                                "run_id": run_id,
+                                "timestamp": timestamp,
+                                "url": TARGET_URL,
+                                "content_hash": current_hash
+                            })
                         old_hash = current_hash
                     else:
-                        await http_notify({
+                        await emit({
                             "event": "no_slots",
                             "timestamp": timestamp,
                             "message": f"[{timestamp}] ❌ No slots available"
@@ -238,9 +420,13 @@ async def monitor_slots(run_id: str, notify_callback):
 
                 except Exception as e:
                     state.consecutive_errors += 1
-                    logger.error(f"Monitoring error: {e}")
+                    check_failed = True
+                    await tracer.end(failed=True, label="error")
+                    logger.error(f"Monitoring error: {e}", extra={"run_id": run_id})
+                    await breaker.record_failure(str(e))
+                    await screenshots.capture(page, "monitor_error", run_id=run_id, error=True)
                     
-                    await http_notify({
+                    await emit({
                         "event": "error",
                         "timestamp": timestamp,
                         "message": f"[{timestamp}] ❌ Error: {str(e)}"
@@ -249,27 +435,45 @@ async def monitor_slots(run_id: str, notify_callback):
                     if state.should_retry():
                         state.retry_count += 1
                         delay = state.get_retry_delay()
-                        await asyncio.sleep(delay)
+                        await heartbeat.sleep(delay)
                         continue
                     else:
-                        await http_notify({
+                        await emit({
                             "event": "monitor_failed",
                             "timestamp": timestamp,
                             "message": f"[{timestamp}] ❌ Max retries reached. Monitor stopping."
                         })
                         break
+                finally:
+                    await tracer.end(failed=check_failed)
+                    heartbeat.update(
+                        state="waiting",
+                        last_check_at=datetime.utcnow().isoformat(),
+                        phases=timer.phases,
+                        captcha=state.captcha_detected,
+                        consecutive_errors=state.consecutive_errors,
+                    )
+
+                if max_checks and checks >= max_checks:
+                    break
+                # Normal wait with jitter; replays run back to back
+                if not recording.replaying():
+                    jitter = random.randint(*JITTER_RANGE)
+                    await heartbeat.sleep(POLL_INTERVAL + jitter)
 
-                # Normal wait with jitter
-                jitter = random.randint(*JITTER_RANGE)
-                await asyncio.sleep(POLL_INTERVAL + jitter)
+            # ✅ A recording's HAR is only written when its context closes
+            if recording.recording():
+                await context.close()
 
     except Exception as e:
-        logger.error(f"Critical monitoring error: {e}")
-        await http_notify({
+        logger.error(f"Critical monitoring error: {e}", extra={"run_id": run_id})
+        await emit({
             "event": "critical_error",
             "timestamp": datetime.utcnow().strftime("%H:%M:%S"),
             "message": f"❌ Critical error: {str(e)}"
         })
     finally:
+        await heartbeat.stop()
+        await screenshots.flush(run_id)
         if browser:
             await browser.close()
\ No newline at end of file
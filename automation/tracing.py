@@ -0,0 +1,134 @@
+# automation/tracing.py
+import logging
+import math
+import os
+import re
+import time
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from automation.screenshots import ArtifactRing, _safe_name
+
+logger = logging.getLogger(__name__)
+
+# ✅ Off by default; MONITOR_TRACING=1 traces every check but keeps only slow or failed ones
+MONITOR_TRACING = os.getenv("MONITOR_TRACING", "0") == "1"
+TRACE_DIR = os.getenv("TRACE_DIR", "logs/traces")
+TRACE_PERCENTILE = float(os.getenv("TRACE_PERCENTILE", "95"))
+TRACE_MIN_SAMPLES = int(os.getenv("TRACE_MIN_SAMPLES", "20"))
+TRACE_MAX_PER_RUN = int(os.getenv("TRACE_MAX_PER_RUN", "10"))
+TRACE_MAX_BYTES = int(os.getenv("TRACE_MAX_BYTES", str(100 * 1024 * 1024)))
+# Screenshots make traces much larger; DOM snapshots are usually enough
+TRACE_SCREENSHOTS = os.getenv("TRACE_SCREENSHOTS", "0") == "1"
+DURATION_WINDOW = 200
+
+TRACE_NAME = re.compile(r"^[A-Za-z0-9_.-]+\.zip$")
+
+
+def trace_directory(run_id: str) -> Path:
+    return Path(TRACE_DIR) / _safe_name(run_id)
+
+
+def list_traces(run_id: str) -> list:
+    directory = trace_directory(run_id)
+    if not directory.exists():
+        return []
+    traces = sorted(directory.glob("*.zip"), key=lambda path: path.stat().st_mtime, reverse=True)
+    return [
+        {
+            "name": path.name,
+            "size": path.stat().st_size,
+            "created_at": datetime.utcfromtimestamp(path.stat().st_mtime).isoformat(),
+        }
+        for path in traces
+    ]
+
+
+def trace_path(run_id: str, name: str) -> Optional[Path]:
+    """Path of a stored trace, or None if the name is invalid or missing"""
+    if not TRACE_NAME.match(name):
+        return None
+    path = trace_directory(run_id) / name
+    return path if path.is_file() else None
+
+
+class CheckTracer:
+    """
+    Playwright tracing in ring-buffer mode for one monitor.
+
+    Tracing stays on for the context and every check is recorded as its own
+    chunk. When the check ends, the chunk is written only if the check failed
+    or took longer than TRACE_PERCENTILE of this run's recent checks;
+    otherwise it is discarded. Kept traces are bounded per run_id.
+    """
+    def __init__(self, run_id: str, enabled: bool = MONITOR_TRACING):
+        self.run_id = run_id
+        self.enabled = enabled
+        self.context = None
+        self.durations = deque(maxlen=DURATION_WINDOW)
+        self._started_at = None
+        self._ring = None
+
+    async def attach(self, context):
+        """Start tracing on a (new) browser context"""
+        if not self.enabled:
+            return
+        self.context = context
+        self._started_at = None
+        try:
+            await context.tracing.start(screenshots=TRACE_SCREENSHOTS, snapshots=True)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not start tracing, disabling it for this run: {e}",
+                           extra={"run_id": self.run_id})
+            self.enabled = False
+
+    async def begin(self):
+        if not self.enabled or self.context is None:
+            return
+        try:
+            await self.context.tracing.start_chunk()
+            self._started_at = time.monotonic()
+        except Exception as e:
+            logger.warning(f"⚠️ Could not start trace chunk: {e}", extra={"run_id": self.run_id})
+
+    def threshold(self) -> Optional[float]:
+        """Duration above which a check counts as slow, once there are enough samples"""
+        if len(self.durations) < TRACE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self.durations)
+        index = max(math.ceil(TRACE_PERCENTILE / 100 * len(ordered)) - 1, 0)
+        return ordered[index]
+
+    async def end(self, failed: bool = False, label: str = "check") -> Optional[Path]:
+        """Close the current chunk, keeping it if the check failed or was slow. Safe to call twice."""
+        if self._started_at is None:
+            return None
+        duration = time.monotonic() - self._started_at
+        self._started_at = None
+
+        threshold = self.threshold()
+        self.durations.append(duration)
+        slow = threshold is not None and duration > threshold
+        if not (failed or slow):
+            try:
+                await self.context.tracing.stop_chunk()
+            except Exception as e:
+                logger.warning(f"⚠️ Could not discard trace chunk: {e}", extra={"run_id": self.run_id})
+            return None
+
+        if self._ring is None:
+            self._ring = ArtifactRing(trace_directory(self.run_id), TRACE_MAX_PER_RUN, TRACE_MAX_BYTES)
+        reason = "failed" if failed else "slow"
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        path = self._ring.directory / f"{stamp}_{_safe_name(label)}_{reason}_{int(duration * 1000)}ms.zip"
+        try:
+            self._ring.directory.mkdir(parents=True, exist_ok=True)
+            await self.context.tracing.stop_chunk(path=str(path))
+            self._ring.add(path)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not save trace: {e}", extra={"run_id": self.run_id})
+            return None
+        logger.info(f"🧵 Kept {reason} check trace ({duration:.1f}s): {path}", extra={"run_id": self.run_id})
+        return path
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Monitor benchmark - measures per-check overhead of the monitor's
+bookkeeping without touching the network, and runs checks offline
+against recorded sessions.
+
+Usage:
+    python bench_monitor.py --checks 5000
+    python bench_monitor.py --record default --checks 1 [--booking]   # live site, saves a HAR
+    python bench_monitor.py --replay default --checks 50 [--booking]  # offline, from the HAR
+    python bench_monitor.py --selectors default                       # selectors vs saved DOMs
+"""
+
+import argparse
+import asyncio
+import contextlib
+import logging
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+
+
+def report(name, samples):
+    samples = sorted(samples)
+    p50 = statistics.median(samples)
+    p99 = samples[int(len(samples) * 0.99) - 1]
+    print(f"{name:<28} p50={p50 * 1e6:8.1f}µs  p99={p99 * 1e6:8.1f}µs  total={sum(samples):.3f}s")
+
+
+async def bench_logging(checks: int, log_dir: str):
+    """Per-check cost of the log records one check emits, as seen by the event loop."""
+    os.environ["LOG_DIR"] = log_dir
+    from config.logging_setup import setup_logging, shutdown_logging
+    from automation.utils import log_action
+
+    setup_logging("bench")
+    logger = logging.getLogger("automation.slot_monitor")
+
+    samples = []
+    for i in range(checks):
+        run_id = f"run_{i % 8}"
+        start = time.perf_counter()
+        await log_action(run_id, "slot_check", {"attempt": 1})
+        logger.info("❌ No slots available", extra={"run_id": run_id, "event": "no_slots"})
+        samples.append(time.perf_counter() - start)
+    shutdown_logging()
+    return samples
+
+
+async def bench_legacy_file_logging(checks: int, log_dir: str):
+    """The previous approach: open and append to logs/monitor_{run_id}.log per call."""
+    samples = []
+    logs = Path(log_dir)
+    for i in range(checks):
+        run_id = f"run_{i % 8}"
+        start = time.perf_counter()
+        for action in ("slot_check", "no_slots"):
+            with open(logs / f"monitor_{run_id}.log", "a") as f:
+                f.write(f"{time.time()} [{action}] {{'attempt': 1}}\n")
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def use_recording(mode: str, name: str):
+    """Set before the automation modules are imported; they read these at import time"""
+    os.environ["MONITOR_MODE"] = mode
+    os.environ["RECORDING_NAME"] = name
+    os.environ["MONITOR_WEBHOOK_URL"] = ""
+    os.environ.setdefault("SCREENSHOT_LEVEL", "off")
+
+
+async def ignore_alert(alert):
+    pass
+
+
+async def run_monitor(checks: int) -> float:
+    from automation.slot_monitor import monitor_slots
+
+    start = time.perf_counter()
+    await monitor_slots("bench_replay", ignore_alert, max_checks=checks)
+    return time.perf_counter() - start
+
+
+async def run_booking_navigation(runs: int) -> list:
+    """Time the cold path to the booking form: launch, load, click through"""
+    from playwright.async_api import async_playwright
+    from workers.booking_flow import open_booking_page
+
+    samples = []
+    async with async_playwright() as p:
+        for _ in range(runs):
+            start = time.perf_counter()
+            browser, context, page = await open_booking_page(p)
+            samples.append(time.perf_counter() - start)
+            await context.close()
+            await browser.close()
+    return samples
+
+
+async def record(name: str, checks: int, booking: bool):
+    use_recording("record", name)
+    print(f"🎙️ Recording {checks} live check(s) as '{name}'")
+    await run_monitor(checks)
+    if booking:
+        print("🎙️ Recording the booking navigation")
+        await run_booking_navigation(1)
+    from automation.recording import recording_dir
+    print(f"✅ Saved to {recording_dir(name)}")
+
+
+async def replay(name: str, checks: int, booking: bool):
+    use_recording("replay", name)
+    print(f"📼 Replaying '{name}' offline")
+    total = await run_monitor(checks)
+    print(f"{'monitor check (replay)':<28} mean={total / checks * 1e3:8.1f}ms  total={total:.3f}s")
+    if booking:
+        report("booking navigation (replay)", await run_booking_navigation(max(checks // 10, 3)))
+
+
+async def check_recorded_selectors(name: str):
+    use_recording("replay", name)
+    from playwright.async_api import async_playwright
+    from automation.autofill import FORM_FIELDS
+    from automation.recording import check_selectors, dom_snapshots
+    from automation.slot_monitor import SELECTORS
+    from workers.booking_flow import BOOKING_SELECTORS
+
+    booking_selectors = dict(BOOKING_SELECTORS)
+    booking_selectors.update({f"field:{field}": spec["selectors"] for field, spec in FORM_FIELDS.items()})
+
+    snapshots = dom_snapshots(name)
+    if not snapshots:
+        print(f"❌ No DOM snapshots for '{name}'; record with --record first")
+        return
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
+        page = await browser.new_page()
+        for path in snapshots:
+            selectors = SELECTORS if path.name.startswith("monitor_") else booking_selectors
+            print(f"\n📄 {path.name}")
+            for category, matched in (await check_selectors(page, path.read_text(), selectors)).items():
+                mark = "✅" if matched else "❌"
+                print(f"   {mark} {category:<22} {', '.join(matched) or 'no selector matches'}")
+        await browser.close()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Monitor benchmark")
+    parser.add_argument("--checks", type=int, default=2000)
+    parser.add_argument("--record", metavar="NAME", help="record live checks to recordings/NAME")
+    parser.add_argument("--replay", metavar="NAME", help="run checks offline against recordings/NAME")
+    parser.add_argument("--selectors", metavar="NAME", help="check selectors against recordings/NAME DOM snapshots")
+    parser.add_argument("--booking", action="store_true", help="include the booking navigation")
+    args = parser.parse_args()
+
+    if args.record:
+        return await record(args.record, args.checks, args.booking)
+    if args.replay:
+        return await replay(args.replay, args.checks, args.booking)
+    if args.selectors:
+        return await check_recorded_selectors(args.selectors)
+
+    log_dir = tempfile.mkdtemp(prefix="bench_monitor_")
+    try:
+        print(f"📊 {args.checks} simulated checks")
+        report("legacy per-run file logging", await bench_legacy_file_logging(args.checks, log_dir))
+        # Console output from the listener thread would interleave with the report
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            samples = await bench_logging(args.checks, log_dir)
+        report("queued structured logging", samples)
+    finally:
+        shutil.rmtree(log_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,66 +1,58 @@
 #!/usr/bin/env python3
 """
-Cleanup script to stop all active monitors
+Cleanup script to stop all active monitors (and, with --prune-events DAYS,
+delete event history older than DAYS)
 """
 
+import argparse
+import sys
+from pathlib import Path
+
 import requests
-import json
 
 API_BASE = "http://localhost:8000"
 
-def get_all_monitors():
-    """Get all monitors"""
+def stop_all_monitors():
+    """Stop every active monitor with a single bulk request"""
     try:
-        response = requests.get(f"{API_BASE}/monitors/")
+        response = requests.post(f"{API_BASE}/monitors/stop", json={"all": True})
         if response.status_code == 200:
             return response.json()
         else:
-            print(f"❌ Failed to get monitors: {response.status_code}")
-            return []
+            print(f"❌ Failed to stop monitors: {response.status_code}")
+            return None
     except Exception as e:
-        print(f"❌ Error getting monitors: {e}")
-        return []
+        print(f"❌ Error stopping monitors: {e}")
+        return None
 
-def stop_monitor(monitor_id):
-    """Stop a specific monitor"""
-    try:
-        response = requests.post(f"{API_BASE}/monitors/{monitor_id}/stop")
-        if response.status_code == 200:
-            print(f"✅ Stopped monitor {monitor_id}")
-            return True
-        else:
-            print(f"❌ Failed to stop monitor {monitor_id}: {response.status_code}")
-            return False
-    except Exception as e:
-        print(f"❌ Error stopping monitor {monitor_id}: {e}")
-        return False
+def prune_event_history(days: int):
+    sys.path.append(str(Path(__file__).parent))
+    from app.retention import prune_events
+    print(f"🧹 Pruned {prune_events(days)} events older than {days} days")
 
 def main():
+    parser = argparse.ArgumentParser(description="Stop all monitors")
+    parser.add_argument("--prune-events", type=int, metavar="DAYS",
+                        help="Also delete events older than DAYS (needs DATABASE_URL)")
+    args = parser.parse_args()
+    if args.prune_events:
+        prune_event_history(args.prune_events)
+
     print("🧹 Cleaning up active monitors...")
     print("=" * 40)
     
-    # Get all monitors
-    monitors = get_all_monitors()
-    
-    if not monitors:
-        print("✅ No monitors found")
+    result = stop_all_monitors()
+    if result is None:
         return
     
-    print(f"📊 Found {len(monitors)} monitors")
-    
-    # Stop all active monitors
-    active_monitors = [m for m in monitors if m['status'] == 'active']
-    
-    if not active_monitors:
+    if not result["stopped"]:
         print("✅ No active monitors to stop")
         return
     
-    print(f"🛑 Stopping {len(active_monitors)} active monitors...")
-    
-    for monitor in active_monitors:
-        stop_monitor(monitor['id'])
+    for monitor_id in result["monitor_ids"]:
+        print(f"✅ Stopped monitor {monitor_id}")
     
-    print("\n✅ Cleanup completed!")
+    print(f"\n✅ Cleanup completed! Stopped {result['stopped']} monitors.")
     print("Now you can start a fresh monitor from the dashboard.")
 
 if __name__ == "__main__":
@@ -0,0 +1,158 @@
+# config/logging_setup.py
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import multiprocessing
+import os
+import queue
+import sys
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_DIR = os.getenv("LOG_DIR", "logs")
+LOG_FILE = os.getenv("LOG_FILE", "visa-bot.jsonl")
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(20 * 1024 * 1024)))
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "5"))
+LOG_BUFFER_RECORDS = int(os.getenv("LOG_BUFFER_RECORDS", "200"))
+LOG_FLUSH_INTERVAL = float(os.getenv("LOG_FLUSH_INTERVAL", "2.0"))
+
+# Top-level keys every record carries when set, so log search can filter
+# on them (e.g. run_id) instead of us keeping one file per run.
+INDEXED_FIELDS = ("run_id", "event", "action", "flow", "applicant_id", "monitor_id", "booking_id")
+
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_listener = None
+_flusher = None
+_owner_pid = None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line."""
+    def __init__(self, service: str):
+        super().__init__()
+        self.service = service
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "service": self.service,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        extra = {}
+        for key, value in record.__dict__.items():
+            if key in _RESERVED or key.startswith("_"):
+                continue
+            if key in INDEXED_FIELDS:
+                entry[key] = value
+            else:
+                extra[key] = value
+        if extra:
+            entry["extra"] = extra
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class _StructuredQueueHandler(logging.handlers.QueueHandler):
+    """Keep the traceback out of ``msg`` so it lands in its own JSON key."""
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class _PeriodicFlusher(threading.Thread):
+    """Flush the buffered file sink so quiet periods still reach disk."""
+    def __init__(self, handler: logging.handlers.MemoryHandler, interval: float):
+        super().__init__(name="log-flusher", daemon=True)
+        self.handler = handler
+        self.interval = interval
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.handler.flush()
+
+
+def _build_sinks(service: str):
+    formatter = JsonFormatter(service)
+
+    console = logging.StreamHandler(sys.stdout)
+    console.setFormatter(formatter)
+
+    Path(LOG_DIR).mkdir(parents=True, exist_ok=True)
+    rotating = logging.handlers.RotatingFileHandler(
+        Path(LOG_DIR) / LOG_FILE,
+        maxBytes=LOG_MAX_BYTES,
+        backupCount=LOG_BACKUP_COUNT,
+        encoding="utf-8",
+    )
+    rotating.setFormatter(formatter)
+    buffered = logging.handlers.MemoryHandler(
+        capacity=LOG_BUFFER_RECORDS,
+        flushLevel=logging.ERROR,
+        target=rotating,
+    )
+    return console, buffered
+
+
+def setup_logging(service: str, multiprocess: bool = False):
+    """
+    Route all logging through a QueueHandler so callers (including code
+    running on an event loop) never block on I/O. A QueueListener thread
+    writes JSON lines to stdout and to one buffered, size-rotated file.
+
+    Use ``multiprocess=True`` in a parent that forks children (Celery
+    prefork): the queue is shared, and only the parent writes the file.
+    """
+    global _listener, _flusher, _owner_pid
+    if _listener is not None:
+        return _listener
+
+    log_queue = multiprocessing.Queue(-1) if multiprocess else queue.SimpleQueue()
+    console, buffered = _build_sinks(service)
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_StructuredQueueHandler(log_queue))
+    root.setLevel(LOG_LEVEL)
+
+    _listener = logging.handlers.QueueListener(log_queue, console, buffered, respect_handler_level=True)
+    _listener.start()
+
+    _flusher = _PeriodicFlusher(buffered, LOG_FLUSH_INTERVAL)
+    _flusher.start()
+
+    _owner_pid = os.getpid()
+    atexit.register(shutdown_logging)
+    return _listener
+
+
+def shutdown_logging():
+    """Drain the queue and flush the file sink."""
+    global _listener, _flusher
+    if os.getpid() != _owner_pid:
+        # Forked children share the parent's queue; only the parent owns the listener
+        return
+    if _flusher is not None:
+        _flusher.stopped.set()
+        _flusher = None
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.flush()
+        _listener = None
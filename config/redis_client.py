@@ -0,0 +1,31 @@
+# config/redis_client.py
+import logging
+
+from config.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+_client = None
+
+
+def get_redis():
+    """
+    Shared synchronous Redis client, or None when REDIS_URL isn't set or
+    the redis package isn't installed. Async callers should go through
+    asyncio.to_thread so the client isn't tied to one event loop.
+    """
+    global _client
+    if _client is not None:
+        return _client
+
+    url = get_settings().redis_url
+    if not url:
+        return None
+    try:
+        import redis
+    except ImportError:
+        logger.warning("REDIS_URL is set but the redis package is not installed")
+        return None
+
+    _client = redis.Redis.from_url(url, decode_responses=True, socket_timeout=2, socket_connect_timeout=2)
+    return _client
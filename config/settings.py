@@ -1,19 +1,81 @@
 # config/settings.py
 import os
-from dotenv import load_dotenv
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional
 
-load_dotenv()
 
-DATABASE_URL = os.getenv("DATABASE_URL")
-REDIS_URL = os.getenv("REDIS_URL")
-ENCRYPTION_KEY = os.getenv("ENCRYPTION_KEY").encode()
+def _optional_int(value: Optional[str]) -> Optional[int]:
+    return int(value) if value else None
 
-TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
-TELEGRAM_CHAT_ID = int(os.getenv("TELEGRAM_CHAT_ID"))
 
-GMAIL_CREDENTIALS_PATH = os.getenv("GMAIL_CREDENTIALS_PATH")
+@dataclass(frozen=True)
+class Settings:
+    """
+    Process settings, read from the environment (and .env) on first use.
+    Optional values are None when unset instead of failing at import time;
+    code that needs one checks it where it is used.
+    """
+    database_url: Optional[str] = None
+    redis_url: Optional[str] = None
+    encryption_key: Optional[bytes] = None
 
-S3_BUCKET = os.getenv("S3_BUCKET")
-AWS_REGION = os.getenv("AWS_REGION")
+    telegram_bot_token: Optional[str] = None
+    telegram_chat_id: Optional[int] = None
 
-VFS_TARGET_URL = os.getenv("VFS_TARGET_URL")
\ No newline at end of file
+    gmail_credentials_path: Optional[str] = None
+
+    s3_bucket: Optional[str] = None
+    aws_region: Optional[str] = None
+
+    vfs_target_url: Optional[str] = None
+
+    host_agent_token: Optional[str] = None
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        encryption_key = os.getenv("ENCRYPTION_KEY")
+        return cls(
+            database_url=os.getenv("DATABASE_URL"),
+            redis_url=os.getenv("REDIS_URL"),
+            encryption_key=encryption_key.encode() if encryption_key else None,
+            telegram_bot_token=os.getenv("TELEGRAM_BOT_TOKEN"),
+            telegram_chat_id=_optional_int(os.getenv("TELEGRAM_CHAT_ID")),
+            gmail_credentials_path=os.getenv("GMAIL_CREDENTIALS_PATH"),
+            s3_bucket=os.getenv("S3_BUCKET"),
+            aws_region=os.getenv("AWS_REGION"),
+            vfs_target_url=os.getenv("VFS_TARGET_URL"),
+            host_agent_token=os.getenv("HOST_AGENT_TOKEN"),
+        )
+
+
+@lru_cache(maxsize=None)
+def get_settings() -> Settings:
+    try:
+        from dotenv import load_dotenv
+        load_dotenv()
+    except ImportError:
+        pass
+    return Settings.from_env()
+
+
+# Old module-level names (e.g. `from config.settings import REDIS_URL`)
+# still work and resolve lazily through get_settings().
+_LEGACY_NAMES = {
+    "DATABASE_URL": "database_url",
+    "REDIS_URL": "redis_url",
+    "ENCRYPTION_KEY": "encryption_key",
+    "TELEGRAM_BOT_TOKEN": "telegram_bot_token",
+    "TELEGRAM_CHAT_ID": "telegram_chat_id",
+    "GMAIL_CREDENTIALS_PATH": "gmail_credentials_path",
+    "S3_BUCKET": "s3_bucket",
+    "AWS_REGION": "aws_region",
+    "VFS_TARGET_URL": "vfs_target_url",
+    "HOST_AGENT_TOKEN": "host_agent_token",
+}
+
+
+def __getattr__(name: str):
+    if name in _LEGACY_NAMES:
+        return getattr(get_settings(), _LEGACY_NAMES[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
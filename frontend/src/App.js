@@ -14,12 +14,15 @@ function App() {
   const wsRef = useRef(null);
   const reconnectTimeoutRef = useRef(null);
   const reconnectAttemptsRef = useRef(0);
+  const lastSeqRef = useRef(null); // ✅ Last event seq seen; sent on reconnect to replay missed events
   const maxReconnectAttempts = 5;
 
   // ✅ WebSocket connection with reconnection logic
   const connectWebSocket = () => {
     try {
-      wsRef.current = new WebSocket("ws://localhost:8000/ws/monitor-updates");
+      // ✅ batch=1: low-priority events arrive merged into one array frame
+      const resume = lastSeqRef.current !== null ? `&last_seq=${lastSeqRef.current}` : '';
+      wsRef.current = new WebSocket(`ws://localhost:8000/ws/monitor-updates?batch=1${resume}`);
       
       wsRef.current.onopen = () => {
         console.log('✅ WebSocket connected');
@@ -30,15 +33,35 @@ function App() {
         addLog('connection', '✅ Connected to monitoring system');
       };
 
+      const handleMessage = (data) => {
+        console.log("📡 WebSocket message:", data);
+        
+        if (data.event === 'connected') {
+          if (lastSeqRef.current === null) lastSeqRef.current = data.seq;
+          return;
+        }
+        if (data.event === 'resync') {
+          // ✅ Missed events are gone from the server buffer; reload state over REST
+          lastSeqRef.current = data.seq;
+          addLog(data.event, data.message, data.timestamp);
+          loadData();
+          return;
+        }
+        if (data.seq !== undefined) {
+          if (lastSeqRef.current !== null && data.seq <= lastSeqRef.current) return; // already seen
+          lastSeqRef.current = data.seq;
+        }
+        
+        // Don't add pong messages to logs
+        if (data.event !== 'pong') {
+          addLog(data.event, data.message, data.timestamp);
+        }
+      };
+
       wsRef.current.onmessage = (event) => {
         try {
-          const data = JSON.parse(event.data);
-          console.log("📡 WebSocket message:", data);
-          
-          // Don't add pong messages to logs
-          if (data.event !== 'pong') {
-            addLog(data.event, data.message, data.timestamp);
-          }
+          const frame = JSON.parse(event.data);
+          (Array.isArray(frame) ? frame : [frame]).forEach(handleMessage);
         } catch (error) {
           console.error("Error parsing WebSocket message:", error);
         }
@@ -366,6 +389,7 @@ const getEventStyle = (event) => {
   const baseStyle = { marginLeft: '8px' };
   switch (event) {
     case 'error':
+    case 'monitors_dead':
       return { ...baseStyle, color: '#ff6b6b' };
     case 'monitor_started':
     case 'booking_triggered':
@@ -376,9 +400,11 @@ const getEventStyle = (event) => {
       return { ...baseStyle, color: '#64ffda' };
     case 'disconnection':
     case 'captcha_detected':
+    case 'monitor_queued':
       return { ...baseStyle, color: '#ffd93d' };
     case 'slot_check':
     case 'no_slots':
+    case 'slots_removed':
       return { ...baseStyle, color: '#888' };
     default:
       return { ...baseStyle, color: '#cccccc' };
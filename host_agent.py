@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Host booking agent
+Runs on your local machine, subscribes to booking jobs from the API and
+opens the visible booking browser as soon as a booking is requested.
+
+Usage:
+    HOST_AGENT_TOKEN=... python host_agent.py
+"""
+
+import asyncio
+import json
+import os
+import sys
+from pathlib import Path
+
+import websockets
+from playwright.async_api import async_playwright
+
+sys.path.append(str(Path(__file__).parent))
+from workers.booking_flow import log_rewarm_result, open_booking_page, run_booking_page
+from workers.booking_standby import BookingStandby
+from config.settings import get_settings
+
+AGENT_URL = os.getenv("BOOKING_AGENT_URL", "ws://localhost:8000/ws/booking-agent")
+HOST_AGENT_TOKEN = get_settings().host_agent_token
+# websockets 14 renamed the handshake headers argument
+HEADERS_ARG = "additional_headers" if int(websockets.__version__.split(".")[0]) >= 14 else "extra_headers"
+PING_INTERVAL = 20
+MAX_RECONNECT_DELAY = 30
+
+
+async def send_status(ws, job: dict, status: str, message: str = None):
+    try:
+        await ws.send(json.dumps({
+            "type": "status",
+            "booking_id": job["booking_id"],
+            "run_id": job.get("run_id"),
+            "status": status,
+            "message": message,
+        }))
+    except websockets.exceptions.WebSocketException as e:
+        print(f"⚠️ Could not report '{status}' to the API: {e}")
+
+
+async def handle_job(ws, job: dict, standby: BookingStandby):
+    """Open the booking browser for one job and report progress back to the API"""
+    print(f"\n🚀 Booking job {job['booking_id']} for {job['applicant_id']}")
+    await send_status(ws, job, "accepted", "🖥️ Host agent is opening the booking browser")
+
+    async def on_status(status, message):
+        print(f"   {status}: {message}")
+        await send_status(ws, job, status, message)
+
+    args = (job["applicant_id"], job["run_id"], job.get("form_data"))
+    try:
+        warm = await standby.take()
+        if warm:
+            status = await run_booking_page(*warm, *args, on_status=on_status)
+        else:
+            async with async_playwright() as p:
+                browser, context, page = await open_booking_page(p, job["applicant_id"])
+                status = await run_booking_page(browser, context, page, *args, on_status=on_status)
+    except Exception as e:
+        print(f"❌ Booking job failed: {e}")
+        status = "failed"
+    finally:
+        # ✅ Get the next browser ready while waiting for the next job
+        standby._rewarm = asyncio.create_task(standby.start())
+        standby._rewarm.add_done_callback(log_rewarm_result)
+
+    await send_status(ws, job, "completed" if status == "submitted" else status)
+
+
+async def keepalive(ws):
+    while True:
+        await asyncio.sleep(PING_INTERVAL)
+        await ws.send("ping")
+
+
+async def main():
+    if not HOST_AGENT_TOKEN:
+        print("❌ Set HOST_AGENT_TOKEN to the same value the API uses")
+        sys.exit(1)
+
+    print("🖥️ Starting host booking agent")
+    print("=" * 50)
+
+    # ✅ Park a browser on the booking page before any job arrives
+    standby = BookingStandby()
+    await standby.start()
+
+    headers = {"Authorization": f"Bearer {HOST_AGENT_TOKEN}"}
+    delay = 1
+    jobs = set()
+    try:
+        while True:
+            try:
+                async with websockets.connect(AGENT_URL, **{HEADERS_ARG: headers}) as ws:
+                    print(f"✅ Connected to {AGENT_URL} - waiting for booking jobs")
+                    delay = 1
+                    pinger = asyncio.create_task(keepalive(ws))
+                    try:
+                        async for raw in ws:
+                            message = json.loads(raw)
+                            if message.get("type") == "booking_job":
+                                task = asyncio.create_task(handle_job(ws, message, standby))
+                                jobs.add(task)
+                                task.add_done_callback(jobs.discard)
+                    finally:
+                        pinger.cancel()
+            except (OSError, websockets.exceptions.WebSocketException) as e:
+                print(f"🔌 Connection lost ({e}); reconnecting in {delay}s")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, MAX_RECONNECT_DELAY)
+    finally:
+        await standby.close()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        print("\n👋 Host agent stopped")
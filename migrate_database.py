@@ -35,7 +35,7 @@ def migrate_database():
             """))
             
             if not result.fetchone():
-                conn.execute(text("ALTER TABLE monitors ADD COLUMN config TEXT;"))
+                conn.execute(text("ALTER TABLE monitors ADD COLUMN config JSONB;"))
                 print("✅ Added config column")
             
             # ✅ Add missing columns to bookings table
@@ -49,9 +49,62 @@ def migrate_database():
             """))
             
             if not result.fetchone():
-                conn.execute(text("ALTER TABLE bookings ADD COLUMN form_data TEXT;"))
+                conn.execute(text("ALTER TABLE bookings ADD COLUMN form_data JSONB;"))
                 print("✅ Added form_data column")
             
+            # ✅ Convert JSON text columns to JSONB and index them
+            print("📝 Converting JSON columns to JSONB...")
+            for table, column in (("monitors", "config"), ("bookings", "form_data")):
+                result = conn.execute(text("""
+                    SELECT data_type
+                    FROM information_schema.columns
+                    WHERE table_name=:table AND column_name=:column;
+                """), {"table": table, "column": column})
+                row = result.fetchone()
+                
+                if row and row[0] != "jsonb":
+                    conn.execute(text(
+                        f"ALTER TABLE {table} ALTER COLUMN {column} TYPE JSONB "
+                        f"USING NULLIF({column}, '')::jsonb;"
+                    ))
+                    print(f"✅ Converted {table}.{column} to JSONB")
+                
+                conn.execute(text(
+                    f"CREATE INDEX IF NOT EXISTS ix_{table}_{column} "
+                    f"ON {table} USING GIN ({column} jsonb_path_ops);"
+                ))
+            print("✅ GIN indexes in place")
+
+            # ✅ Slot release analytics: observation + hourly rollup tables, backfilled
+            # from the event history (which must exist first for the backfill to read)
+            print("📝 Creating slot analytics tables...")
+            for table in ("events", "slot_observations", "slot_rollups"):
+                Base.metadata.tables[table].create(bind=conn, checkfirst=True)
+            result = conn.execute(text("SELECT NOT EXISTS (SELECT 1 FROM slot_observations);"))
+            backfill = result.scalar()
+
+            if backfill:
+                # Earlier slots_found events become releases (removals weren't tracked before)
+                conn.execute(text("""
+                    INSERT INTO slot_observations (run_id, flow, kind, observed_at)
+                    SELECT e.run_id, m.flow, 'released', e.created_at
+                    FROM events e JOIN monitors m ON m.run_id = e.run_id
+                    WHERE e.event = 'slots_found' AND m.flow IS NOT NULL;
+                """))
+                conn.execute(text("""
+                    INSERT INTO slot_rollups
+                        (flow, bucket, weekday, hour, releases, removals, visible_seconds, visible_count)
+                    SELECT flow, date_trunc('hour', observed_at),
+                           (EXTRACT(ISODOW FROM date_trunc('hour', observed_at)) - 1)::int,
+                           EXTRACT(HOUR FROM date_trunc('hour', observed_at))::int,
+                           COUNT(*), 0, 0, 0
+                    FROM slot_observations
+                    GROUP BY flow, date_trunc('hour', observed_at)
+                    ON CONFLICT (flow, bucket) DO UPDATE SET releases = slot_rollups.releases + EXCLUDED.releases;
+                """))
+                print("✅ Backfilled slot rollups from event history")
+            print("✅ Slot analytics tables in place")
+
             conn.commit()
             print("✅ Database migration completed successfully!")
             
@@ -0,0 +1,165 @@
+# notifications/coalescer.py
+# Debounce/dedup stage between a monitor's alerts and the notifiers.
+import asyncio
+import logging
+import os
+import time
+from collections import Counter, deque
+from datetime import datetime
+from typing import Awaitable, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Detections within this window after an alert are merged into one trailing alert
+ALERT_COALESCE_WINDOW = int(os.getenv("ALERT_COALESCE_WINDOW", "300"))
+# An alert identical to one sent within this time is dropped
+ALERT_DEDUP_TTL = int(os.getenv("ALERT_DEDUP_TTL", "3600"))
+# Non-urgent alerts are collected and sent as one digest this often
+ALERT_DIGEST_INTERVAL = int(os.getenv("ALERT_DIGEST_INTERVAL", "900"))
+# Outbound alerts per run per rolling hour; beyond it they go into the digest
+ALERT_MAX_PER_HOUR = int(os.getenv("ALERT_MAX_PER_HOUR", "6"))
+DIGEST_MAX_ITEMS = 10
+
+
+def alert_key(alert: dict):
+    """Alerts with the same key say the same thing (same slot page content)"""
+    return alert.get("content_hash") or (alert.get("event"), alert.get("url"))
+
+
+class AlertCoalescer:
+    """
+    Per-run alert pipeline:
+
+    - the first urgent alert after a quiet period goes out immediately;
+    - further ones within ALERT_COALESCE_WINDOW are merged, and at the end
+      of the window one alert with the latest details and the detection
+      count is sent, unless it repeats one already sent;
+    - repeats of any alert sent within ALERT_DEDUP_TTL are dropped, so a
+      calendar flapping between two states alerts once per state;
+    - non-urgent alerts (``"urgent": False``) and alerts over
+      ALERT_MAX_PER_HOUR are sent together as a digest.
+
+    ``submit`` has the notify_callback signature monitor_slots expects;
+    call ``close`` when the monitor ends to flush what's held.
+    """
+    def __init__(self, run_id: str, send: Callable[[dict], Awaitable[None]],
+                 window: int = ALERT_COALESCE_WINDOW, dedup_ttl: int = ALERT_DEDUP_TTL,
+                 digest_interval: int = ALERT_DIGEST_INTERVAL, max_per_hour: int = ALERT_MAX_PER_HOUR):
+        self.run_id = run_id
+        self.send = send
+        self.window = window
+        self.dedup_ttl = dedup_ttl
+        self.digest_interval = digest_interval
+        self.max_per_hour = max_per_hour
+        self.pending: Optional[dict] = None
+        self.digest: list = []
+        self.digest_started: Optional[str] = None
+        self.recent = {}  # alert_key -> monotonic time it was last sent
+        self.sent_times = deque()
+        self.stats = Counter()
+        self._window_task = None
+        self._digest_task = None
+
+    async def submit(self, alert: dict):
+        self.stats["received"] += 1
+        if not alert.get("urgent", True):
+            self._add_to_digest(alert)
+            return
+        if self._window_task is not None:
+            self.pending = self._merge(self.pending, alert)
+            self.stats["merged"] += 1
+            return
+        if self._is_repeat(alert):
+            self.stats["deduplicated"] += 1
+            return
+        await self._deliver({**alert, "detections": 1})
+        self._window_task = asyncio.create_task(self._close_window())
+
+    def _merge(self, held: Optional[dict], alert: dict) -> dict:
+        if held is None:
+            return {**alert, "detections": 1, "first_detected_at": alert.get("timestamp")}
+        return {**alert, "detections": held["detections"] + 1, "first_detected_at": held["first_detected_at"]}
+
+    def _is_repeat(self, alert: dict) -> bool:
+        now = time.monotonic()
+        self.recent = {key: sent for key, sent in self.recent.items() if now - sent < self.dedup_ttl}
+        return alert_key(alert) in self.recent
+
+    async def _close_window(self):
+        await asyncio.sleep(self.window)
+        self._window_task = None
+        held, self.pending = self.pending, None
+        if held is None:
+            return
+        if self._is_repeat(held):
+            # Flapped back to something already sent
+            self.stats["deduplicated"] += held["detections"]
+            return
+        await self._deliver(held)
+        # Still bursting: keep coalescing from here
+        self._window_task = asyncio.create_task(self._close_window())
+
+    def _over_budget(self) -> bool:
+        now = time.monotonic()
+        while self.sent_times and now - self.sent_times[0] > 3600:
+            self.sent_times.popleft()
+        return len(self.sent_times) >= self.max_per_hour
+
+    async def _deliver(self, alert: dict):
+        if self._over_budget():
+            self.stats["capped"] += 1
+            self._add_to_digest({**alert, "capped": True})
+            return
+        self.sent_times.append(time.monotonic())
+        self.recent[alert_key(alert)] = time.monotonic()
+        self.stats["sent"] += 1
+        try:
+            await self.send(alert)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not hand off alert: {e}", extra={"run_id": self.run_id})
+
+    def _add_to_digest(self, alert: dict):
+        if not self.digest:
+            self.digest_started = datetime.utcnow().isoformat()
+        self.digest.append(alert)
+        if self._digest_task is None:
+            self._digest_task = asyncio.create_task(self._digest_after())
+
+    async def _digest_after(self):
+        await asyncio.sleep(self.digest_interval)
+        self._digest_task = None
+        await self._send_digest()
+
+    async def _send_digest(self):
+        if not self.digest:
+            return
+        items, self.digest = self.digest, []
+        digest = {
+            "event": "digest",
+            "run_id": self.run_id,
+            "count": len(items),
+            "events": dict(Counter(item.get("event", "alert") for item in items)),
+            "items": items[-DIGEST_MAX_ITEMS:],
+            "period_start": self.digest_started,
+            "period_end": datetime.utcnow().isoformat(),
+        }
+        self.stats["digests"] += 1
+        try:
+            await self.send(digest)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not hand off digest: {e}", extra={"run_id": self.run_id})
+
+    async def close(self):
+        """Send the held alert and digest now instead of waiting for their timers"""
+        for task in (self._window_task, self._digest_task):
+            if task is not None:
+                task.cancel()
+        self._window_task = self._digest_task = None
+        held, self.pending = self.pending, None
+        if held is not None and not self._is_repeat(held):
+            await self._deliver(held)
+        await self._send_digest()
+        if self._digest_task is not None:
+            self._digest_task.cancel()
+            self._digest_task = None
+        logger.info(f"🔕 Alerts for {self.run_id}: {dict(self.stats)}", extra={"run_id": self.run_id})
@@ -15,6 +15,20 @@ def send_alert_with_buttons(slot_data: dict):
         f"🆕 Slot available for Portugal visa!\n"
         f"📍 Flow: Mozambique → Portugal\n"
         f"🕒 Detected: {slot_data['timestamp']}\n"
-        f"🔗 [View Page]({slot_data['url']})"
     )
-    bot.send_message(TELEGRAM_CHAT_ID, message, reply_markup=markup, parse_mode='Markdown')
\ No newline at end of file
+    # ✅ Coalesced alerts carry how many detections they stand for
+    if slot_data.get("detections", 1) > 1:
+        message += f"🔁 {slot_data['detections']} changes since {slot_data.get('first_detected_at')}\n"
+    message += f"🔗 [View Page]({slot_data['url']})"
+    bot.send_message(TELEGRAM_CHAT_ID, message, reply_markup=markup, parse_mode='Markdown')
+
+def send_digest(digest: dict):
+    """One message summarizing the non-urgent (or over-budget) alerts of a period"""
+    counts = ", ".join(f"{event}: {count}" for event, count in digest["events"].items())
+    lines = [
+        f"🗞️ Monitor digest ({digest['count']} alerts)",
+        f"🕒 {digest['period_start']} → {digest['period_end']}",
+        f"📊 {counts}",
+    ]
+    lines += [f"• {item.get('timestamp')} {item.get('event', 'alert')}" for item in digest["items"]]
+    bot.send_message(TELEGRAM_CHAT_ID, "\n".join(lines))
@@ -0,0 +1,6 @@
+# tests/conftest.py
+import sys
+from pathlib import Path
+
+# Import the app packages the same way the scripts at the repo root do
+sys.path.append(str(Path(__file__).parent.parent))
@@ -0,0 +1,133 @@
+# tests/test_admission.py
+import pytest
+
+from workers import capacity
+
+MB = capacity.MB
+
+
+class FakeRedis:
+    """The hash/set subset cluster_capacity uses"""
+    def __init__(self, hashes: dict):
+        self.hashes = hashes
+        self.index = set(hashes)
+
+    def smembers(self, key):
+        return set(self.index)
+
+    def srem(self, key, *members):
+        self.index -= set(members)
+
+    def pipeline(self, transaction=True):
+        redis = self
+
+        class Pipeline:
+            def __init__(self):
+                self.keys = []
+
+            def hgetall(self, key):
+                self.keys.append(key)
+
+            def execute(self):
+                return [dict(redis.hashes.get(key, {})) for key in self.keys]
+
+        return Pipeline()
+
+
+def browsers(*rss_mb):
+    return {f"run_{n}": [{"pid": n, "rss": mb * MB}] for n, mb in enumerate(rss_mb)}
+
+
+def test_measure_uses_slots_without_a_memory_budget(monkeypatch):
+    monkeypatch.setattr(capacity, "MONITOR_SLOTS", 4)
+    monkeypatch.setattr(capacity, "MONITOR_MEMORY_BUDGET_MB", 0)
+    monkeypatch.setattr(capacity, "MONITOR_MEMORY_MB", 400)
+    monkeypatch.setattr(capacity, "chromium_by_run", lambda: browsers(300, 500))
+    measured = capacity.measure()
+    assert (measured["capacity"], measured["running"], measured["memory_used_mb"]) == (4, 2, 800)
+    assert measured["per_monitor_mb"] == 400
+
+
+def test_measure_limits_capacity_by_the_observed_footprint(monkeypatch):
+    monkeypatch.setattr(capacity, "MONITOR_SLOTS", 10)
+    monkeypatch.setattr(capacity, "MONITOR_MEMORY_BUDGET_MB", 2000)
+    monkeypatch.setattr(capacity, "MONITOR_MEMORY_MB", 400)
+    monkeypatch.setattr(capacity, "chromium_by_run", lambda: browsers(600, 600))
+    measured = capacity.measure()
+    assert measured["per_monitor_mb"] == 600
+    assert measured["capacity"] == 3
+
+
+def test_cluster_capacity_sums_live_workers_and_forgets_expired_ones(monkeypatch):
+    fields = {"capacity": "3", "running": "2", "memory_used_mb": "800", "memory_budget_mb": "0", "worker": "w"}
+    redis = FakeRedis({
+        capacity.capacity_key("a"): fields,
+        capacity.capacity_key("b"): {**fields, "capacity": "5", "running": "1"},
+    })
+    redis.index = {"a", "b", "gone"}
+    monkeypatch.setattr(capacity, "get_redis", lambda: redis)
+
+    total = capacity.cluster_capacity()
+    assert (total["capacity"], total["running"], total["memory_used_mb"]) == (8, 3, 1600)
+    assert [worker["worker"] for worker in total["workers"]] == ["w", "w"]
+    assert redis.index == {"a", "b"}
+
+
+def test_cluster_capacity_is_none_without_advertising_workers(monkeypatch):
+    monkeypatch.setattr(capacity, "get_redis", lambda: FakeRedis({}))
+    assert capacity.cluster_capacity() is None
+    monkeypatch.setattr(capacity, "get_redis", lambda: None)
+    assert capacity.cluster_capacity() is None
+
+
+@pytest.fixture
+def admission():
+    pytest.importorskip("sqlalchemy")
+    pytest.importorskip("psycopg2")
+    from app import admission
+    return admission
+
+
+def test_in_use_counts_browsers_still_running_after_a_stop(admission):
+    assert admission.in_use({"capacity": 10, "running": 3}, active=5) == 5
+    assert admission.in_use({"capacity": 10, "running": 7}, active=5) == 7
+
+
+def test_free_slots_never_negative(admission):
+    assert admission.free_slots({"capacity": 10, "running": 4}, active=6) == 4
+    assert admission.free_slots({"capacity": 4, "running": 6}, active=2) == 0
+
+
+@pytest.mark.parametrize("requested, free, queued, expected", [
+    (3, 5, 0, {"start": 3, "queue": 0, "rejected": False}),
+    (5, 2, 0, {"start": 2, "queue": 3, "rejected": False}),
+    (5, 0, 8, {"start": 0, "queue": 5, "rejected": True}),
+    (2, 0, 8, {"start": 0, "queue": 2, "rejected": False}),
+    (1, 0, 12, {"start": 0, "queue": 1, "rejected": True}),
+])
+def test_plan_splits_between_starting_queueing_and_rejecting(admission, requested, free, queued, expected):
+    assert admission.plan(requested, free, queued, queue_limit=10) == expected
+
+
+def test_cluster_capacity_fails_open_when_redis_is_down(monkeypatch):
+    class DownRedis(FakeRedis):
+        def smembers(self, key):
+            raise ConnectionError("Connection refused")
+
+    monkeypatch.setattr(capacity, "get_redis", lambda: DownRedis({}))
+    assert capacity.cluster_capacity() is None
+
+
+def test_cluster_capacity_fails_open_when_the_pipeline_fails(monkeypatch):
+    class FlakyRedis(FakeRedis):
+        def pipeline(self, transaction=True):
+            pipe = super().pipeline(transaction)
+
+            def execute():
+                raise TimeoutError("Timeout reading from socket")
+
+            pipe.execute = execute
+            return pipe
+
+    monkeypatch.setattr(capacity, "get_redis", lambda: FlakyRedis({capacity.capacity_key("a"): {"capacity": "1"}}))
+    assert capacity.cluster_capacity() is None
@@ -0,0 +1,85 @@
+# tests/test_autofill.py
+import asyncio
+
+import pytest
+
+pytest.importorskip("playwright")
+from automation import autofill
+from automation.autofill import FORM_FIELDS, fill_form
+
+
+class FakePage:
+    """Answers the in-page fill script with canned per-field results"""
+    def __init__(self, results: dict):
+        self.results = results
+        self.payload = None
+
+    async def wait_for_load_state(self, state):
+        pass
+
+    async def evaluate(self, script, payload):
+        self.payload = payload
+        return [{"field": item["field"], **self.results[item["field"]]} for item in payload]
+
+    async def screenshot(self, **kwargs):
+        return b""
+
+
+class FakeResolver:
+    def __init__(self):
+        self.recorded = []
+
+    async def prioritize(self, category, selectors):
+        return list(selectors)
+
+    async def record_result(self, category, selector=None):
+        self.recorded.append((category, selector))
+
+
+@pytest.fixture
+def resolver(monkeypatch):
+    resolver = FakeResolver()
+    monkeypatch.setattr(autofill, "get_resolver", lambda: resolver)
+    # Keep failure screenshots out of the working tree
+    monkeypatch.setattr(autofill.screenshots, "level", "off")
+    return resolver
+
+
+def test_report_and_hits_for_filled_fields(resolver):
+    page = FakePage({
+        "first_name": {"status": "filled", "selector": 'input[name*="first"]'},
+        "last_name": {"status": "filled", "selector": "label:Surname"},
+    })
+    report = asyncio.run(fill_form(page, {"first_name": "Ana", "last_name": "Silva"}))
+
+    assert report["first_name"]["status"] == "filled"
+    assert report["dob"] == {"status": "skipped"}
+    assert report["passport"] == {"status": "skipped"}
+    assert [item["field"] for item in page.payload] == ["first_name", "last_name"]
+    assert page.payload[1]["labels"] == FORM_FIELDS["last_name"]["labels"]
+    # A label-only match means none of the CSS selectors worked
+    assert resolver.recorded == [
+        ("form_fields.first_name", 'input[name*="first"]'),
+        ("form_fields.last_name", None),
+    ]
+
+
+def test_mismatch_and_not_found_are_recorded_as_misses(resolver):
+    page = FakePage({
+        "dob": {"status": "mismatch", "selector": 'input[type="date"]'},
+        "passport": {"status": "not_found"},
+    })
+    report = asyncio.run(fill_form(page, {"dob": "1990-01-01", "passport_number": "A123"}))
+
+    assert report["dob"]["status"] == "mismatch"
+    assert report["passport"]["status"] == "not_found"
+    assert page.payload[1]["value"] == "A123"
+    assert resolver.recorded == [("form_fields.dob", None), ("form_fields.passport", None)]
+
+
+def test_nothing_to_fill_skips_the_page_round_trip(resolver):
+    page = FakePage({})
+    report = asyncio.run(fill_form(page, {}))
+    assert set(report) == set(FORM_FIELDS)
+    assert page.payload is None
+    assert resolver.recorded == []
@@ -0,0 +1,116 @@
+# tests/test_circuit_breaker.py
+import asyncio
+import time
+from email.utils import formatdate
+
+import pytest
+
+from automation import circuit_breaker
+from automation.circuit_breaker import CircuitBreaker, MemoryBreakerStore, parse_retry_after
+
+
+@pytest.mark.parametrize("value, expected", [("120", 120.0), ("0", 0.0), (None, None), ("", None), ("soon", None)])
+def test_parse_retry_after_seconds(value, expected):
+    assert parse_retry_after(value) == expected
+
+
+def test_parse_retry_after_http_date():
+    assert 55 <= parse_retry_after(formatdate(time.time() + 60, usegmt=True)) <= 60
+    assert parse_retry_after(formatdate(time.time() - 60, usegmt=True)) == 0.0
+
+
+def open_for(store: MemoryBreakerStore, host: str = "vfs") -> float:
+    return float(store.get(host).get("open_until", 0)) - time.time()
+
+
+def expire(store: MemoryBreakerStore, host: str = "vfs"):
+    """Jump to the end of the cooldown"""
+    store._state[host]["open_until"] = time.time() - 1
+
+
+def test_opens_once_the_error_rate_passes_the_threshold(monkeypatch):
+    monkeypatch.setattr(circuit_breaker, "BREAKER_MIN_CHECKS", 4)
+    store = MemoryBreakerStore()
+    breaker = CircuitBreaker("vfs", store)
+
+    async def scenario():
+        await breaker.record_success()
+        await breaker.record_success()
+        opened = [await breaker.record_failure("timeout") for _ in range(2)]
+        return opened, await breaker.before_check()
+
+    opened, wait = asyncio.run(scenario())
+    assert opened == [False, True]
+    assert wait >= circuit_breaker.BREAKER_COOLDOWN - 1
+    assert store.get("vfs")["reason"].startswith("error rate 2/4")
+
+
+def test_trip_uses_retry_after_and_is_not_doubled_while_open():
+    store = MemoryBreakerStore()
+    first, second = CircuitBreaker("vfs", store), CircuitBreaker("vfs", store)
+
+    async def scenario():
+        return (
+            await first.record_failure("429", trip=True, retry_after=30),
+            await second.record_failure("429", trip=True, retry_after=30),
+        )
+
+    assert asyncio.run(scenario()) == (True, False)
+    assert store.get("vfs")["trips"] == 1
+    assert 29 <= open_for(store) <= 30
+
+
+def test_half_open_admits_a_single_probe_and_success_closes():
+    store = MemoryBreakerStore()
+    prober, waiter = CircuitBreaker("vfs", store), CircuitBreaker("vfs", store)
+
+    async def scenario():
+        await prober.record_failure("captcha", trip=True)
+        expire(store)
+        waits = (await prober.before_check(), await waiter.before_check())
+        await prober.record_success()
+        return waits, await waiter.before_check()
+
+    (probe_wait, other_wait), after = asyncio.run(scenario())
+    assert probe_wait == 0.0 and prober.probing is False
+    assert other_wait == circuit_breaker.PROBE_WAIT
+    assert after == 0.0
+    assert store.get("vfs") == {}
+
+
+def test_failed_probe_reopens_with_a_doubled_cooldown():
+    store = MemoryBreakerStore()
+    breaker = CircuitBreaker("vfs", store)
+
+    async def scenario():
+        await breaker.record_failure("503", trip=True, cooldown=100)
+        first = open_for(store)
+        expire(store)
+        assert await breaker.before_check() == 0.0
+        reopened = await breaker.record_failure("503", trip=True, cooldown=100)
+        return first, reopened
+
+    first, reopened = asyncio.run(scenario())
+    assert 99 <= first <= 100
+    assert reopened is True
+    assert 199 <= open_for(store) <= 200
+    assert store.get("vfs")["trips"] == 2
+    # The probe lock is released so the next cooldown can be probed again
+    assert store.acquire_probe("vfs")
+
+
+def test_cooldown_is_capped(monkeypatch):
+    monkeypatch.setattr(circuit_breaker, "BREAKER_MAX_COOLDOWN", 150)
+    store = MemoryBreakerStore()
+    breaker = CircuitBreaker("vfs", store)
+
+    async def scenario():
+        for _ in range(2):
+            await breaker.record_failure("503", trip=True, cooldown=100)
+            expire(store)
+            await breaker.before_check()
+        await breaker.record_failure("503", trip=True, cooldown=100)
+
+    asyncio.run(scenario())
+    assert store.get("vfs")["trips"] == 3
+    assert 149 <= open_for(store) <= 150
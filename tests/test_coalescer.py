@@ -0,0 +1,113 @@
+# tests/test_coalescer.py
+import asyncio
+
+from notifications.coalescer import AlertCoalescer
+
+WINDOW = 0.05
+
+
+def alert(content_hash: str, **fields) -> dict:
+    return {"event": "slots_found", "content_hash": content_hash, "timestamp": "10:00:00", **fields}
+
+
+def make_coalescer(**options):
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    options = {"window": WINDOW, "dedup_ttl": 60, "digest_interval": 60, "max_per_hour": 10, **options}
+    return AlertCoalescer("run_1", send, **options), sent
+
+
+def test_burst_is_sent_once_then_merged_into_one_trailing_alert():
+    async def scenario():
+        coalescer, sent = make_coalescer()
+        await coalescer.submit(alert("a"))
+        await coalescer.submit(alert("b", timestamp="10:00:01"))
+        await coalescer.submit(alert("c", timestamp="10:00:02"))
+        assert len(sent) == 1
+        await asyncio.sleep(WINDOW * 3)
+        await coalescer.close()
+        return coalescer, sent
+
+    coalescer, sent = asyncio.run(scenario())
+    assert [message["content_hash"] for message in sent] == ["a", "c"]
+    assert sent[0]["detections"] == 1
+    assert sent[1]["detections"] == 2
+    assert sent[1]["first_detected_at"] == "10:00:01"
+    assert coalescer.stats["merged"] == 2
+
+
+def test_flapping_between_two_states_alerts_once_per_state():
+    async def scenario():
+        coalescer, sent = make_coalescer()
+        for content_hash in ("a", "b", "a", "b", "a"):
+            await coalescer.submit(alert(content_hash))
+            await asyncio.sleep(WINDOW * 3)
+        await coalescer.close()
+        return coalescer, sent
+
+    coalescer, sent = asyncio.run(scenario())
+    assert [message["content_hash"] for message in sent] == ["a", "b"]
+    assert coalescer.stats["deduplicated"] == 3
+
+
+def test_trailing_alert_repeating_a_sent_one_is_dropped():
+    async def scenario():
+        coalescer, sent = make_coalescer()
+        await coalescer.submit(alert("a"))
+        await coalescer.submit(alert("b"))
+        await coalescer.submit(alert("a"))
+        await asyncio.sleep(WINDOW * 3)
+        await coalescer.close()
+        return sent
+
+    sent = asyncio.run(scenario())
+    assert [message["content_hash"] for message in sent] == ["a"]
+
+
+def test_alerts_over_the_hourly_cap_go_into_the_digest():
+    async def scenario():
+        coalescer, sent = make_coalescer(max_per_hour=2)
+        for content_hash in ("a", "b", "c", "d"):
+            await coalescer.submit(alert(content_hash))
+            await asyncio.sleep(WINDOW * 3)
+        await coalescer.close()
+        return coalescer, sent
+
+    coalescer, sent = asyncio.run(scenario())
+    assert [message.get("content_hash") for message in sent[:2]] == ["a", "b"]
+    digest = sent[2]
+    assert len(sent) == 3
+    assert digest["event"] == "digest"
+    assert digest["count"] == 2
+    assert all(item["capped"] for item in digest["items"])
+    assert coalescer.stats["capped"] == 2
+
+
+def test_non_urgent_alerts_are_only_sent_as_a_digest():
+    async def scenario():
+        coalescer, sent = make_coalescer()
+        await coalescer.submit({"event": "slots_removed", "urgent": False})
+        await coalescer.submit({"event": "slots_removed", "urgent": False})
+        assert sent == []
+        await coalescer.close()
+        return sent
+
+    sent = asyncio.run(scenario())
+    assert len(sent) == 1
+    assert sent[0]["event"] == "digest"
+    assert sent[0]["events"] == {"slots_removed": 2}
+
+
+def test_digest_is_sent_after_the_interval():
+    async def scenario():
+        coalescer, sent = make_coalescer(digest_interval=WINDOW)
+        await coalescer.submit({"event": "slots_removed", "urgent": False})
+        await asyncio.sleep(WINDOW * 3)
+        assert [message["event"] for message in sent] == ["digest"]
+        await coalescer.close()
+        return sent
+
+    assert len(asyncio.run(scenario())) == 1
@@ -0,0 +1,85 @@
+# tests/test_event_log.py
+import asyncio
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("psycopg2")
+from app import event_log as event_log_module
+from app.event_log import EventLog
+
+
+class Writer:
+    def __init__(self, failures: int = 0):
+        self.batches = []
+        self.failures = failures
+
+    def __call__(self, rows):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("database unavailable")
+        self.batches.append([row["event"] for row in rows])
+
+
+def test_events_are_written_in_one_batch_per_interval():
+    writer = Writer()
+
+    async def scenario():
+        log = EventLog(interval=0.02, writer=writer)
+        log.start()
+        for event in ("slot_check", "no_slots", "slots_found"):
+            log.add({"event": event, "run_id": "run_1", "flow": "visa"})
+        await asyncio.sleep(0.1)
+        await log.close()
+
+    asyncio.run(scenario())
+    assert writer.batches == [["slot_check", "no_slots", "slots_found"]]
+
+
+def test_a_full_batch_is_flushed_before_the_interval():
+    writer = Writer()
+
+    async def scenario():
+        log = EventLog(interval=60, batch=2, writer=writer)
+        log.start()
+        log.add({"event": "a"})
+        log.add({"event": "b"})
+        await asyncio.sleep(0.05)
+        written = list(writer.batches)
+        await log.close()
+        return written
+
+    assert asyncio.run(scenario()) == [["a", "b"]]
+
+
+def test_failed_batch_is_retried_ahead_of_newer_events_then_dropped():
+    writer = Writer(failures=1)
+
+    async def scenario():
+        log = EventLog(writer=writer)
+        log.add({"event": "a"})
+        assert await log.flush() == 0
+        log.add({"event": "b"})
+        return await log.flush()
+
+    assert asyncio.run(scenario()) == 2
+    assert writer.batches == [["a", "b"]]
+
+    writer = Writer(failures=event_log_module.EVENT_FLUSH_ATTEMPTS)
+
+    async def failing():
+        log = EventLog(writer=writer)
+        log.add({"event": "a"})
+        for _ in range(event_log_module.EVENT_FLUSH_ATTEMPTS):
+            await log.flush()
+        return log.pending
+
+    assert asyncio.run(failing()) == []
+
+
+def test_queue_is_bounded_while_the_database_is_down():
+    log = EventLog(limit=3, writer=Writer())
+    for n in range(5):
+        log.add({"event": f"e{n}"})
+    assert [row["event"] for row in log.pending] == ["e2", "e3", "e4"]
+    assert log.dropped == 2
@@ -0,0 +1,154 @@
+# tests/test_events.py
+import asyncio
+
+from app.events import EventBus, Subscriber, parse_filters
+
+
+def drain(subscriber) -> list:
+    messages = []
+    while not subscriber.queue.empty():
+        messages.append(subscriber.queue.get_nowait())
+    return messages
+
+
+def publish_all(bus: EventBus, *messages):
+    async def scenario():
+        for message in messages:
+            await bus.publish(message)
+    asyncio.run(scenario())
+
+
+def test_publish_assigns_increasing_seqs():
+    bus = EventBus()
+    publish_all(bus, {"event": "a"}, {"event": "b"})
+    assert [message["seq"] for message in bus.buffer] == [1, 2]
+
+
+def test_reconnect_replays_only_missed_events():
+    bus = EventBus()
+    publish_all(bus, *({"event": "slot_check", "n": n} for n in range(3)))
+    subscriber = asyncio.run(bus.subscribe(last_seq=1))
+    assert [message["seq"] for message in drain(subscriber)] == [2, 3]
+
+
+def test_up_to_date_client_gets_nothing():
+    bus = EventBus()
+    publish_all(bus, {"event": "slot_check"})
+    assert drain(asyncio.run(bus.subscribe(last_seq=1))) == []
+    assert drain(asyncio.run(bus.subscribe(last_seq=0))) != []
+
+
+def test_resync_when_missed_events_left_the_buffer():
+    bus = EventBus(maxlen=2)
+    publish_all(bus, *({"event": "slot_check"} for _ in range(4)))
+    messages = drain(asyncio.run(bus.subscribe(last_seq=1)))
+    assert [message["event"] for message in messages] == ["resync"]
+    assert messages[0]["seq"] == 4
+
+
+def test_resync_when_last_seq_is_ahead_after_a_restart():
+    bus = EventBus()
+    publish_all(bus, {"event": "slot_check"})
+    messages = drain(asyncio.run(bus.subscribe(last_seq=50)))
+    assert [message["event"] for message in messages] == ["resync"]
+
+
+def test_live_events_reach_subscribers_after_replay():
+    bus = EventBus()
+
+    async def scenario():
+        await bus.publish({"event": "a"})
+        subscriber = await bus.subscribe(last_seq=0)
+        await bus.publish({"event": "b"})
+        return subscriber
+
+    subscriber = asyncio.run(scenario())
+    assert [message["event"] for message in drain(subscriber)] == ["a", "b"]
+    bus.unsubscribe(subscriber)
+    assert bus.connection_count() == 0
+
+
+def test_parse_filters_accepts_lists_and_comma_separated_strings():
+    assert parse_filters({"run_ids": ["run_1", " "], "events": "slots_found, captcha_detected", "other": "x"}) == {
+        "run_id": {"run_1"},
+        "event": {"slots_found", "captcha_detected"},
+    }
+
+
+def test_subscribers_only_receive_matching_events():
+    bus = EventBus()
+
+    async def scenario():
+        run = await bus.subscribe(filters={"run_id": {"run_1"}})
+        slots = await bus.subscribe(filters={"run_id": {"run_1"}, "event": {"slots_found"}})
+        everything = await bus.subscribe()
+        await bus.publish({"event": "slot_check", "run_id": "run_1"})
+        await bus.publish({"event": "slots_found", "run_id": "run_2"})
+        await bus.publish({"event": "slots_found", "run_id": "run_1"})
+        # Summary events match through their plural field
+        await bus.publish({"event": "monitors_dead", "run_ids": ["run_1", "run_3"]})
+        return run, slots, everything
+
+    run, slots, everything = asyncio.run(scenario())
+    assert [message["seq"] for message in drain(run)] == [1, 3, 4]
+    assert [message["seq"] for message in drain(slots)] == [3]
+    assert [message["seq"] for message in drain(everything)] == [1, 2, 3, 4]
+
+
+def test_replay_respects_filters():
+    bus = EventBus()
+    publish_all(bus, {"event": "slot_check", "run_id": "run_1"}, {"event": "slot_check", "run_id": "run_2"})
+    subscriber = asyncio.run(bus.subscribe(last_seq=0, filters={"run_id": {"run_2"}}))
+    assert [message["seq"] for message in drain(subscriber)] == [2]
+
+
+def test_set_filters_moves_the_subscriber_in_the_index():
+    bus = EventBus()
+
+    async def scenario():
+        subscriber = await bus.subscribe(filters={"flow": {"visa"}})
+        bus.set_filters(subscriber, {"flow": {"passport"}})
+        await bus.publish({"event": "slot_check", "flow": "visa"})
+        await bus.publish({"event": "slot_check", "flow": "passport"})
+        return subscriber
+
+    subscriber = asyncio.run(scenario())
+    assert [message["flow"] for message in drain(subscriber)] == ["passport"]
+    bus.unsubscribe(subscriber)
+    assert not bus.index["flow"]
+
+
+def frames(window_ms: int, *messages) -> list:
+    async def scenario():
+        subscriber = Subscriber()
+        for message in messages:
+            subscriber.put(message)
+        result = []
+        while not subscriber.queue.empty() or subscriber._held is not None:
+            result.append(await subscriber.next_frame(window_ms))
+        return result
+    return asyncio.run(scenario())
+
+
+def test_without_a_window_every_message_is_its_own_frame():
+    assert frames(0, {"event": "slot_check"}, {"event": "slot_check"}) == [{"event": "slot_check"}] * 2
+
+
+def test_low_priority_messages_are_batched():
+    batched = frames(20, {"event": "slot_check", "n": 1}, {"event": "no_slots", "n": 2})
+    assert batched == [[{"event": "slot_check", "n": 1}, {"event": "no_slots", "n": 2}]]
+
+
+def test_priority_message_ends_the_batch_and_keeps_order():
+    batched = frames(
+        20,
+        {"event": "slot_check", "n": 1},
+        {"event": "slot_check", "n": 2},
+        {"event": "slots_found", "n": 3},
+        {"event": "slot_check", "n": 4},
+    )
+    assert batched == [
+        [{"event": "slot_check", "n": 1}, {"event": "slot_check", "n": 2}],
+        {"event": "slots_found", "n": 3},
+        {"event": "slot_check", "n": 4},
+    ]
@@ -0,0 +1,176 @@
+# tests/test_heartbeat.py
+import asyncio
+import time
+
+import pytest
+
+from automation import heartbeat
+from automation.heartbeat import MonitorHeartbeat, expired_runs, forget, read_heartbeats, request_stop
+
+
+class FakeRedis:
+    """The subset of redis-py the heartbeat registry uses, with TTLs"""
+    def __init__(self):
+        self.data = {}
+        self.expires = {}
+
+    def _live(self, key):
+        if key in self.expires and self.expires[key] <= time.time():
+            self.data.pop(key, None)
+            del self.expires[key]
+        return self.data.get(key)
+
+    def hgetall(self, key):
+        return dict(self._live(key) or {})
+
+    def hset(self, key, mapping):
+        self.data.setdefault(key, {}).update({field: str(value) for field, value in mapping.items()})
+
+    def expire(self, key, seconds):
+        self.expires[key] = time.time() + seconds
+
+    def exists(self, key):
+        return int(self._live(key) is not None)
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value
+        if ex:
+            self.expire(key, ex)
+
+    def sadd(self, key, *members):
+        self.data.setdefault(key, set()).update(members)
+
+    def smembers(self, key):
+        return set(self.data.get(key, set()))
+
+    def srem(self, key, *members):
+        self.data.get(key, set()).difference_update(members)
+
+    def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+            self.expires.pop(key, None)
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.calls = []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.calls.append((name, args, kwargs))
+
+    def execute(self):
+        return [getattr(self.client, name)(*args, **kwargs) for name, args, kwargs in self.calls]
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    client = FakeRedis()
+    monkeypatch.setattr(heartbeat, "get_redis", lambda: client)
+    return client
+
+
+def beating(*run_ids) -> list:
+    async def scenario():
+        beats = [MonitorHeartbeat(run_id) for run_id in run_ids]
+        for beat in beats:
+            beat.update(state="checking", checks=3, phases={"goto": 120}, captcha=True)
+            await beat.beat()
+        return beats
+    return asyncio.run(scenario())
+
+
+def test_read_heartbeats_decodes_fields_and_reports_missing_runs(redis):
+    beating("run_1")
+    heartbeats = read_heartbeats(["run_1", "run_2"])
+    assert heartbeats["run_2"] is None
+    live = heartbeats["run_1"]
+    assert (live["state"], live["checks"], live["captcha"]) == ("checking", 3, True)
+    assert live["phases"] == {"goto": 120}
+    assert live["beat_at"]
+
+
+def test_read_heartbeats_without_redis(monkeypatch):
+    monkeypatch.setattr(heartbeat, "get_redis", lambda: None)
+    assert read_heartbeats(["run_1"]) == {}
+    assert expired_runs() == []
+
+
+def test_expired_runs_are_indexed_runs_without_a_live_heartbeat(redis):
+    beating("run_1", "run_2", "run_3")
+    redis.expires[heartbeat.heartbeat_key("run_2")] = 0
+    redis.delete(heartbeat.heartbeat_key("run_3"))
+    assert expired_runs() == ["run_2", "run_3"]
+
+    forget(["run_2", "run_3"])
+    assert expired_runs() == []
+
+
+def test_stopped_monitor_is_reaped_right_away(redis):
+    async def scenario():
+        beat = MonitorHeartbeat("run_1")
+        await beat.beat()
+        await beat.stop()
+
+    asyncio.run(scenario())
+    assert read_heartbeats(["run_1"]) == {"run_1": None}
+    assert expired_runs() == ["run_1"]
+
+
+def test_stop_request_is_seen_on_the_next_beat_and_cleared_on_exit(redis):
+    async def scenario():
+        beat = MonitorHeartbeat("run_1")
+        await beat.beat()
+        assert not beat.stop_requested
+        request_stop(["run_1"])
+        assert redis.exists(heartbeat.stop_key("run_1"))
+        await beat.beat()
+        seen = beat.stop_requested
+        await beat.stop()
+        return seen
+
+    assert asyncio.run(scenario()) is True
+    assert not redis.exists(heartbeat.stop_key("run_1"))
+
+
+def test_request_stop_sets_a_ttl(redis):
+    request_stop(["run_1", "run_2"])
+    for run_id in ("run_1", "run_2"):
+        assert redis.expires[heartbeat.stop_key(run_id)] - time.time() > heartbeat.STOP_TTL - 5
+
+
+def test_sleep_wakes_early_on_a_stop_request(redis, monkeypatch):
+    monkeypatch.setattr(heartbeat, "HEARTBEAT_INTERVAL", 0.01)
+
+    async def scenario():
+        beat = MonitorHeartbeat("run_1")
+        beat.start()
+        request_stop(["run_1"])
+        started = time.monotonic()
+        await beat.sleep(30)
+        elapsed = time.monotonic() - started
+        await beat.stop()
+        return elapsed, beat.stop_requested
+
+    elapsed, stopped = asyncio.run(scenario())
+    assert stopped
+    assert elapsed < 5
+
+
+def test_sleep_runs_the_full_time_without_a_stop(monkeypatch):
+    monkeypatch.setattr(heartbeat, "get_redis", lambda: None)
+
+    async def scenario():
+        beat = MonitorHeartbeat("run_1")
+        beat.start()
+        started = time.monotonic()
+        await beat.sleep(0.05)
+        return time.monotonic() - started, beat.stop_requested
+
+    elapsed, stopped = asyncio.run(scenario())
+    assert elapsed >= 0.05
+    assert not stopped
@@ -0,0 +1,55 @@
+# tests/test_screenshots.py
+import asyncio
+
+from automation.screenshots import ScreenshotService
+
+
+class FakePage:
+    async def screenshot(self, **kwargs):
+        return b"\x89PNG" + b"0" * 100
+
+
+def make_service(tmp_path, **options) -> ScreenshotService:
+    return ScreenshotService(**{"level": "debug", "image_format": "png", "directory": str(tmp_path), **options})
+
+
+def test_concurrent_captures_share_one_capped_ring(tmp_path):
+    service = make_service(tmp_path, max_files=3)
+
+    async def scenario():
+        await asyncio.gather(*(service.capture(FakePage(), f"shot{n}", run_id="run_1") for n in range(8)))
+        await service.flush()
+
+    asyncio.run(scenario())
+    assert list(service._rings) == ["run_1"]
+    assert len(service.files("run_1")) == 3
+    assert len(list((tmp_path / "run_1").iterdir())) == 3
+
+
+def test_flush_with_a_run_id_forgets_its_ring_but_keeps_files(tmp_path):
+    service = make_service(tmp_path)
+
+    async def scenario():
+        await service.capture(FakePage(), "a", run_id="run_1")
+        await service.capture(FakePage(), "b", run_id="run_2")
+        await service.flush("run_1")
+
+    asyncio.run(scenario())
+    assert list(service._rings) == ["run_2"]
+    assert "run_1" not in service._counters
+    assert len(service.files("run_1")) == 1
+
+
+def test_level_gates_captures(tmp_path):
+    service = make_service(tmp_path, level="on_error")
+
+    async def scenario():
+        skipped = await service.capture(FakePage(), "ok", run_id="run_1")
+        written = await service.capture(FakePage(), "boom", run_id="run_1", error=True)
+        await service.flush("run_1")
+        return skipped, written
+
+    skipped, written = asyncio.run(scenario())
+    assert skipped is None
+    assert written is not None
+    assert len(service.files("run_1")) == 1
@@ -0,0 +1,123 @@
+# tests/test_slot_analytics.py
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("psycopg2")
+from sqlalchemy.dialects import postgresql
+
+from app.slot_analytics import bump_rollup, hour_bucket, record_observation, release_heatmap, release_trend
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def all(self):
+        return self.rows
+
+
+class FakeSession:
+    """Records statements; answers every non-insert with ``rows``"""
+    def __init__(self, rows=()):
+        self.rows = list(rows)
+        self.statements = []
+        self.added = []
+
+    def execute(self, stmt):
+        self.statements.append(stmt)
+        return FakeResult([] if getattr(stmt, "is_insert", False) else self.rows)
+
+    def add(self, obj):
+        self.added.append(obj)
+
+    def rollups(self) -> list:
+        """(bucket, counts) of each rollup upsert, in order"""
+        bumps = []
+        for stmt in self.statements:
+            if not getattr(stmt, "is_insert", False):
+                continue
+            params = stmt.compile(dialect=postgresql.dialect()).params
+            counts = {column: params[column] for column in ("releases", "removals", "visible_seconds", "visible_count")}
+            bumps.append((params["bucket"], {column: value for column, value in counts.items() if value}))
+        return bumps
+
+
+def test_hour_bucket_truncates_to_the_hour():
+    assert hour_bucket(datetime(2026, 10, 14, 9, 59, 59, 999)) == datetime(2026, 10, 14, 9)
+
+
+def test_bump_rollup_is_an_additive_upsert():
+    db = FakeSession()
+    bump_rollup(db, "visa", datetime(2026, 10, 14, 9, 30), releases=1)
+    compiled = db.statements[0].compile(dialect=postgresql.dialect())
+    sql = str(compiled)
+    assert "ON CONFLICT (flow, bucket) DO UPDATE" in sql
+    assert "slot_rollups.releases + excluded.releases" in sql
+    assert compiled.params["weekday"] == 2
+    assert compiled.params["hour"] == 9
+
+
+def test_release_is_stored_and_counted_in_its_hour():
+    db = FakeSession()
+    record_observation(db, "slots_found", "run_1", "visa", observed_at=datetime(2026, 10, 14, 9, 30))
+    assert [(obs.kind, obs.run_id) for obs in db.added] == [("released", "run_1")]
+    assert db.rollups() == [(datetime(2026, 10, 14, 9), {"releases": 1})]
+
+
+def test_removal_credits_visible_time_to_the_hour_each_release_started():
+    closed = [
+        SimpleNamespace(observed_at=datetime(2026, 10, 14, 8, 50), visible_seconds=600),
+        SimpleNamespace(observed_at=datetime(2026, 10, 14, 9, 58), visible_seconds=120),
+    ]
+    db = FakeSession(closed)
+    record_observation(db, "slots_removed", "run_1", "visa", observed_at=datetime(2026, 10, 14, 10, 0))
+
+    removal = db.added[0]
+    assert (removal.kind, removal.visible_seconds) == ("removed", 600)
+    assert db.rollups() == [
+        (datetime(2026, 10, 14, 10), {"removals": 1}),
+        (datetime(2026, 10, 14, 8), {"visible_seconds": 600, "visible_count": 1}),
+        (datetime(2026, 10, 14, 9), {"visible_seconds": 120, "visible_count": 1}),
+    ]
+
+
+def test_removal_without_open_releases_has_no_visible_time():
+    db = FakeSession([])
+    record_observation(db, "slots_removed", "run_1", "visa", observed_at=datetime(2026, 10, 14, 10, 0))
+    assert db.added[0].visible_seconds is None
+    assert db.rollups() == [(datetime(2026, 10, 14, 10), {"removals": 1})]
+
+
+@pytest.mark.parametrize("event, flow", [("slot_check", "visa"), ("slots_found", None)])
+def test_other_events_and_unknown_flows_are_ignored(event, flow):
+    db = FakeSession()
+    record_observation(db, event, "run_1", flow)
+    assert db.statements == [] and db.added == []
+
+
+def test_heatmap_grid_and_average_visible_time():
+    db = FakeSession([
+        SimpleNamespace(weekday=0, hour=9, releases=4, visible_seconds=900, visible_count=3),
+        SimpleNamespace(weekday=6, hour=23, releases=1, visible_seconds=0, visible_count=0),
+    ])
+    heatmap = release_heatmap(db, "visa", days=30)
+    assert heatmap["releases"][0][9] == 4
+    assert heatmap["releases"][6][23] == 1
+    assert heatmap["avg_visible_seconds"][0][9] == 300
+    assert heatmap["avg_visible_seconds"][6][23] is None
+    assert heatmap["total_releases"] == 5
+
+
+def test_trend_points():
+    db = FakeSession([
+        SimpleNamespace(period=datetime(2026, 10, 12), releases=7, removals=5, visible_seconds=1000, visible_count=4),
+        SimpleNamespace(period=datetime(2026, 10, 19), releases=2, removals=0, visible_seconds=0, visible_count=0),
+    ])
+    points = release_trend(db, "visa", interval="week")["points"]
+    assert points == [
+        {"period": "2026-10-12T00:00:00", "releases": 7, "removals": 5, "avg_visible_seconds": 250},
+        {"period": "2026-10-19T00:00:00", "releases": 2, "removals": 0, "avg_visible_seconds": None},
+    ]
@@ -0,0 +1,94 @@
+# tests/test_snapshot.py
+import time
+from email.utils import formatdate
+
+import pytest
+
+pytest.importorskip("fastapi")
+from fastapi import Request
+
+from app.snapshot import SnapshotCache, cache_key, conditional_response
+
+
+def make_request(path: str = "/monitors/", query: str = "", **headers) -> Request:
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "path": path,
+        "query_string": query.encode(),
+        "headers": [(name.replace("_", "-").lower().encode(), value.encode()) for name, value in headers.items()],
+    })
+
+
+class Builder:
+    def __init__(self, body):
+        self.body = body
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.body
+
+
+def test_served_from_memory_until_invalidated():
+    cache = SnapshotCache(max_age=60)
+    build = Builder([{"id": 1}])
+    first = cache.get("k", build)
+    assert cache.get("k", build) is first
+    assert build.calls == 1
+
+    cache.invalidate()
+    build.body = [{"id": 2}]
+    second = cache.get("k", build)
+    assert build.calls == 2
+    assert second.body == b'[{"id":2}]'
+    assert second.etag != first.etag
+
+
+def test_rebuild_with_same_content_keeps_etag_and_last_modified():
+    cache = SnapshotCache(max_age=60)
+    build = Builder({"active_count": 3})
+    first = cache.get("k", build)
+    cache.invalidate()
+    second = cache.get("k", build)
+    assert second is not first
+    assert (second.etag, second.last_modified) == (first.etag, first.last_modified)
+
+
+def test_entries_expire_after_max_age():
+    cache = SnapshotCache(max_age=0)
+    build = Builder([])
+    cache.get("k", build)
+    cache.get("k", build)
+    assert build.calls == 2
+
+
+def test_conditional_response_200_then_304_on_matching_etag():
+    snapshot = SnapshotCache().get("k", Builder([1, 2]))
+
+    response = conditional_response(make_request(), snapshot)
+    assert response.status_code == 200
+    assert response.body == b"[1,2]"
+    assert response.headers["etag"] == snapshot.etag
+    assert response.headers["cache-control"] == "no-cache"
+    assert response.headers["x-snapshot-time"]
+
+    response = conditional_response(make_request(if_none_match=f'"other", W/{snapshot.etag}'), snapshot)
+    assert response.status_code == 304
+    assert response.body == b""
+
+    assert conditional_response(make_request(if_none_match='"other"'), snapshot).status_code == 200
+
+
+def test_conditional_response_if_modified_since():
+    snapshot = SnapshotCache().get("k", Builder([]))
+    later = formatdate(time.time() + 60, usegmt=True)
+    earlier = formatdate(time.time() - 60, usegmt=True)
+    assert conditional_response(make_request(if_modified_since=later), snapshot).status_code == 304
+    assert conditional_response(make_request(if_modified_since=earlier), snapshot).status_code == 200
+    assert conditional_response(make_request(if_modified_since="garbage"), snapshot).status_code == 200
+
+
+def test_cache_key_includes_the_query():
+    assert cache_key(make_request(query="status=active")) == "/monitors/?status=active"
+    assert cache_key(make_request(query="status=active")) != cache_key(make_request())
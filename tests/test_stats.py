@@ -0,0 +1,96 @@
+# tests/test_stats.py
+from datetime import datetime, timedelta
+
+from app.stats import DashboardStats, MemoryStatsStore, latency_bucket
+
+# A Wednesday
+NOW = datetime(2026, 10, 14, 9, 30)
+
+
+def make_stats() -> DashboardStats:
+    return DashboardStats(store=MemoryStatsStore())
+
+
+def test_latency_bucket():
+    assert latency_bucket(100) == "250"
+    assert latency_bucket(250) == "250"
+    assert latency_bucket(251) == "500"
+    assert latency_bucket(120000) == "inf"
+
+
+def test_checks_captchas_and_slots_are_counted():
+    stats = make_stats()
+    for _ in range(4):
+        stats.record_event({"event": "slot_check"}, now=NOW)
+    stats.record_event({"event": "captcha_detected", "duration_ms": 800}, now=NOW)
+    stats.record_event({"event": "slots_found", "flow": "visa", "duration_ms": 1500}, now=NOW)
+    stats.record_event({"event": "no_slots", "duration_ms": 200}, now=NOW)
+
+    snapshot = stats.snapshot(["visa", "passport"], now=NOW)
+    assert snapshot["totals"] == {"checks": 4, "captchas": 1, "slots_found": 1}
+    assert snapshot["checks_per_minute"][-1]["checks"] == 4
+    assert len(snapshot["checks_per_minute"]) == 60
+    assert snapshot["captcha_rate"] == {"last_hour": 0.25, "all_time": 0.25}
+
+    latency = snapshot["latency"]
+    assert latency["count"] == 3
+    assert latency["mean_ms"] == 833.3
+    assert {bucket["le"]: bucket["count"] for bucket in latency["buckets"] if bucket["count"]} == {
+        250: 1, 1000: 1, 2000: 1,
+    }
+
+    visa = snapshot["slots_by_flow"]["visa"]
+    assert visa["total"] == 1
+    assert visa["by_hour"][9] == 1
+    assert visa["by_weekday"][2] == 1
+    assert snapshot["slots_by_flow"]["passport"]["total"] == 0
+
+
+def test_minutes_outside_the_last_hour_drop_out_of_the_chart():
+    stats = make_stats()
+    stats.record_event({"event": "slot_check"}, now=NOW - timedelta(minutes=90))
+    snapshot = stats.snapshot([], now=NOW)
+    assert sum(row["checks"] for row in snapshot["checks_per_minute"]) == 0
+    assert snapshot["captcha_rate"]["last_hour"] is None
+    assert snapshot["totals"]["checks"] == 1
+
+
+def test_only_terminal_booking_statuses_are_counted():
+    stats = make_stats()
+    for status in ("queued", "browser_open", "form_filled", "submitted", "failed", "timeout", "submitted"):
+        stats.record_booking(status)
+    assert stats.snapshot([], now=NOW)["bookings"] == {"submitted": 2, "failed": 1, "timeout": 1}
+
+
+def test_memory_store_expires_keys_by_ttl():
+    store = MemoryStatsStore()
+    store.increment([("short", "n", 1, 60), ("forever", "n", 1, None)])
+    store._expires["short"] = 0
+    store.increment([("forever", "n", 1, None)])
+    assert store.read(["short", "forever", "missing"]) == [{}, {"n": 2}, {}]
+
+
+def test_store_failures_do_not_raise():
+    class Broken:
+        def increment(self, updates):
+            raise ConnectionError("down")
+
+        def read(self, keys):
+            raise ConnectionError("down")
+
+    stats = DashboardStats(store=Broken())
+    stats.record_event({"event": "slot_check"}, now=NOW)
+    assert stats.snapshot([], now=NOW)["totals"]["checks"] == 0
+
+
+def test_flows_are_tracked_from_events():
+    stats = make_stats()
+    stats.record_event({"event": "slot_check", "flow": "visa"}, now=NOW)
+    stats.record_event({"event": "slots_found"}, now=NOW)
+    stats.record_event({"event": "no_slots"}, now=NOW)
+    assert stats.flows() == ["unknown", "visa"]
+
+    snapshot = stats.snapshot(now=NOW)
+    assert set(snapshot["slots_by_flow"]) == {"unknown", "visa"}
+    assert snapshot["slots_by_flow"]["unknown"]["total"] == 1
+    assert snapshot["slots_by_flow"]["visa"]["total"] == 0
@@ -1,15 +1,32 @@
 # workers/booking_flow.py
 import asyncio
 import logging
+import os
 from datetime import datetime
 from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeout
+from automation.autofill import fill_form
+from automation.screenshots import screenshots
+from automation.selector_cache import get_resolver
+from automation import recording
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 VFS_URL = "https://visa.vfsglobal.com/moz/en/prt/apply"
 
+BROWSER_ARGS = [
+    "--no-sandbox",
+    "--disable-dev-shm-usage",
+    "--disable-web-security",
+    "--disable-features=VizDisplayCompositor",
+    "--disable-blink-features=AutomationControlled",
+    "--start-maximized"  # Start maximized for better visibility
+]
+
+CONTEXT_OPTIONS = {
+    "viewport": {"width": 1366, "height": 768},
+    "user_agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+}
+
 # Enhanced selectors for booking flow
 BOOKING_SELECTORS = {
     'apply_visa': [
@@ -30,15 +47,12 @@ BOOKING_SELECTORS = {
         '#captcha-container',
         '.captcha',
         'iframe[src*="recaptcha"]'
-    ],
-    'form_fields': {
-        'first_name': ['input[name*="first"]', 'input[id*="first"]', 'input[placeholder*="First"]'],
-        'last_name': ['input[name*="last"]', 'input[id*="last"]', 'input[placeholder*="Last"]'],
-        'dob': ['input[name*="dob"]', 'input[id*="dob"]', 'input[type="date"]'],
-        'passport': ['input[name*="passport"]', 'input[id*="passport"]', 'input[placeholder*="Passport"]']
-    }
+    ]
 }
 
+def running_in_docker() -> bool:
+    return os.path.exists('/.dockerenv')
+
 async def detect_captcha(page):
     """Check if CAPTCHA is present on the page"""
     for selector in BOOKING_SELECTORS['captcha']:
@@ -66,50 +80,21 @@ async def wait_for_captcha_resolution(page, timeout=300000):
 
 async def navigate_to_booking_form(page):
     """Navigate through the booking flow"""
+    resolver = get_resolver()
     try:
         # Step 1: Click "Apply for a visa"
-        for selector in BOOKING_SELECTORS['apply_visa']:
-            try:
-                await page.click(selector, timeout=5000)
-                await page.wait_for_timeout(2000)
-                break
-            except:
-                continue
+        if await resolver.click(page, "apply_visa", BOOKING_SELECTORS['apply_visa']):
+            await page.wait_for_load_state("domcontentloaded")
         
         # Step 2: Click "Book an appointment"
-        for selector in BOOKING_SELECTORS['book_appointment']:
-            try:
-                await page.click(selector, timeout=5000)
-                await page.wait_for_timeout(3000)
-                break
-            except:
-                continue
+        if await resolver.click(page, "book_appointment", BOOKING_SELECTORS['book_appointment']):
+            await page.wait_for_load_state("domcontentloaded")
                 
         return True
     except Exception as e:
         logger.warning(f"Navigation warning: {e}")
         return False
 
-async def autofill_form(page, applicant_data):
-    """Auto-fill the booking form"""
-    logger.info("📝 Starting form auto-fill...")
-    
-    for field_name, selectors in BOOKING_SELECTORS['form_fields'].items():
-        value = applicant_data.get(field_name)
-        if not value:
-            continue
-            
-        for selector in selectors:
-            try:
-                element = await page.query_selector(selector)
-                if element:
-                    await element.fill(value)
-                    logger.info(f"✅ Filled {field_name}: {value}")
-                    break
-            except Exception as e:
-                logger.warning(f"Failed to fill {field_name}: {e}")
-                continue
-
 async def launch_browser_on_host(applicant_id: str, run_id: str, form_data: dict = None):
     """Notify user to run booking script on host machine"""
     logger.info("🐳 Running in Docker - cannot launch browser directly")
@@ -126,6 +111,7 @@ async def launch_browser_on_host(applicant_id: str, run_id: str, form_data: dict
     print("🚀 BOOKING SESSION READY!")
     print("="*80)
     print("Since you're running in Docker, please run the booking script on your host machine:")
+    print("(Tip: keep `python host_agent.py` running and bookings open automatically)")
     print()
     print("1. Open a new terminal/command prompt")
     print("2. Navigate to your project directory")
@@ -145,126 +131,180 @@ async def launch_browser_on_host(applicant_id: str, run_id: str, form_data: dict
     
     logger.info("✅ Booking instructions provided to user")
 
-async def launch_booking_session(applicant_id: str, run_id: str, form_data: dict = None):
-    """Launch visible browser for booking with CAPTCHA handling"""
-    logger.info(f"🌐 Launching booking session for {applicant_id}")
-    
-    # Check if we're running in Docker
-    import os
-    is_docker = os.path.exists('/.dockerenv')
-    
-    if is_docker:
-        logger.info("🐳 Running in Docker - launching browser on host machine")
-        # Launch browser on host machine instead of in container
-        await launch_browser_on_host(applicant_id, run_id, form_data)
-        return
-    
-    async with async_playwright() as p:
-        # Launch browser in VISIBLE mode for CAPTCHA solving (when not in Docker)
-        browser = await p.chromium.launch(
-            headless=False,  # ✅ Make browser visible
-            args=[
-                "--no-sandbox",
-                "--disable-dev-shm-usage",
-                "--disable-web-security",
-                "--disable-features=VizDisplayCompositor",
-                "--disable-blink-features=AutomationControlled",
-                "--start-maximized"  # Start maximized for better visibility
-            ]
-        )
-        
-        logger.info("✅ Browser launched successfully (visible mode)")
-        
-        context = await browser.new_context(
-            viewport={"width": 1366, "height": 768},
-            user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
-        )
-        page = await context.new_page()
+async def open_booking_page(p, applicant_id: str = None):
+    """Cold path: launch a visible browser and click through to the booking form."""
+    from workers.booking_standby import load_storage_state
 
-        try:
-            # Navigate to VFS website
-            logger.info("🌐 Navigating to VFS website...")
-            await page.goto(VFS_URL, wait_until="networkidle", timeout=60000)
-            await page.wait_for_timeout(3000)
+    # Launch browser in VISIBLE mode for CAPTCHA solving (when not in Docker); replays run headless
+    headless = recording.replaying()
+    browser = await p.chromium.launch(headless=headless, args=BROWSER_ARGS)
+    logger.info(f"✅ Browser launched successfully ({'headless replay' if headless else 'visible mode'})")
 
-            # Navigate through booking flow
-            await navigate_to_booking_form(page)
-            
-            # Check for CAPTCHA and wait for resolution
-            if await detect_captcha(page):
-                logger.info("⚠️ CAPTCHA detected! Please solve it in the browser window.")
-                print("\n" + "="*60)
-                print("🚨 CAPTCHA DETECTED!")
-                print("👉 Please solve the CAPTCHA in the browser window")
-                print("👉 Complete any facial verification if required")
-                print("👉 The system will continue automatically after resolution")
-                print("="*60 + "\n")
-                
-                # Wait for CAPTCHA resolution
-                if await wait_for_captcha_resolution(page, timeout=300000):  # 5 minutes
-                    logger.info("✅ CAPTCHA resolved, continuing...")
-                else:
-                    logger.warning("⚠️ CAPTCHA resolution timeout")
-                    print("⚠️ CAPTCHA resolution timeout. Please try again.")
-                    return
+    context = await browser.new_context(
+        storage_state=load_storage_state(applicant_id),
+        **CONTEXT_OPTIONS,
+        **recording.context_options("booking")
+    )
+    await recording.prepare_context(context, "booking")
+    page = await context.new_page()
 
-            # Use provided form data or defaults
-            applicant_data = form_data or {
-                "first_name": "John",
-                "last_name": "Doe", 
-                "dob": "1990-01-01",
-                "passport": "A12345678"
-            }
-            
-            await autofill_form(page, applicant_data)
-            
+    # Navigate to VFS website
+    logger.info("🌐 Navigating to VFS website...")
+    await page.goto(VFS_URL, wait_until="networkidle", timeout=60000)
+    await page.wait_for_timeout(3000)
+
+    # Navigate through booking flow
+    await navigate_to_booking_form(page)
+    await recording.snapshot_dom(page, "booking", "form")
+    return browser, context, page
+
+async def run_booking_page(browser, context, page, applicant_id: str, run_id: str, form_data: dict = None,
+                           on_status=None):
+    """
+    Drive an open booking page: CAPTCHA hand-off, autofill, wait for submission.
+    ``on_status(status, message)`` is awaited at each step; returns the final status.
+    """
+    from workers.booking_standby import save_storage_state
+
+    async def notify(status: str, message: str = None):
+        if on_status is not None:
+            try:
+                await on_status(status, message)
+            except Exception as e:
+                logger.warning(f"⚠️ Could not report booking status: {e}")
+
+    status = "failed"
+    try:
+        await notify("browser_open", "🖥️ Booking browser is open")
+
+        # Check for CAPTCHA and wait for resolution
+        if await detect_captcha(page):
+            logger.info("⚠️ CAPTCHA detected! Please solve it in the browser window.")
+            await notify("captcha_detected", "⚠️ CAPTCHA detected - solve it in the browser window")
             print("\n" + "="*60)
-            print("✅ BOOKING SESSION READY!")
-            print("👉 Review the form data in the browser")
-            print("👉 Click 'Submit' or 'Book Appointment' when ready")
-            print("👉 The system will capture the confirmation PDF")
+            print("🚨 CAPTCHA DETECTED!")
+            print("👉 Please solve the CAPTCHA in the browser window")
+            print("👉 Complete any facial verification if required")
+            print("👉 The system will continue automatically after resolution")
             print("="*60 + "\n")
             
-            # Wait for user to submit the form
-            logger.info("⏳ Waiting for form submission...")
+            # Wait for CAPTCHA resolution
+            if await wait_for_captcha_resolution(page, timeout=300000):  # 5 minutes
+                logger.info("✅ CAPTCHA resolved, continuing...")
+            else:
+                logger.warning("⚠️ CAPTCHA resolution timeout")
+                print("⚠️ CAPTCHA resolution timeout. Please try again.")
+                status = "timeout"
+                return status
+
+        # Use provided form data or defaults
+        applicant_data = form_data or {
+            "first_name": "John",
+            "last_name": "Doe", 
+            "dob": "1990-01-01",
+            "passport": "A12345678"
+        }
+        
+        report = await fill_form(page, applicant_data, run_id=run_id)
+        filled = [field for field, result in report.items() if result["status"] == "filled"]
+        logger.info(f"📝 Auto-filled {len(filled)}/{len(report)} fields", extra={"run_id": run_id, "data": report})
+        await notify("form_filled", f"📝 Auto-filled {len(filled)}/{len(report)} fields - review and submit")
+        
+        print("\n" + "="*60)
+        print("✅ BOOKING SESSION READY!")
+        print("👉 Review the form data in the browser")
+        print("👉 Click 'Submit' or 'Book Appointment' when ready")
+        print("👉 The system will capture the confirmation PDF")
+        print("="*60 + "\n")
+        
+        # Wait for user to submit the form
+        logger.info("⏳ Waiting for form submission...")
+        
+        # Wait for either success page or PDF download
+        try:
+            await page.wait_for_function(
+                "() => window.location.href.includes('success') || window.location.href.includes('confirmation') || document.querySelector('a[href*=\".pdf\"]')",
+                timeout=3600000  # 1 hour timeout
+            )
+            logger.info("✅ Form submitted successfully!")
+            status = "submitted"
             
-            # Wait for either success page or PDF download
+            # Try to capture PDF if available
             try:
-                await page.wait_for_function(
-                    "() => window.location.href.includes('success') || window.location.href.includes('confirmation') || document.querySelector('a[href*=\".pdf\"]')",
-                    timeout=3600000  # 1 hour timeout
-                )
-                logger.info("✅ Form submitted successfully!")
-                
-                # Try to capture PDF if available
-                try:
-                    pdf_link = await page.query_selector('a[href*=".pdf"]')
-                    if pdf_link:
-                        await pdf_link.click()
-                        logger.info("📄 PDF downloaded")
-                except:
-                    logger.info("📄 No PDF link found")
-                    
-            except PlaywrightTimeout:
-                logger.info("⏰ Session timeout reached")
+                pdf_link = await page.query_selector('a[href*=".pdf"]')
+                if pdf_link:
+                    await pdf_link.click()
+                    logger.info("📄 PDF downloaded")
+            except:
+                logger.info("📄 No PDF link found")
                 
-        except Exception as e:
-            logger.error(f"❌ Booking session error: {e}")
-            print(f"❌ Error: {e}")
+        except PlaywrightTimeout:
+            logger.info("⏰ Session timeout reached")
+            status = "timeout"
             
+    except Exception as e:
+        logger.error(f"❌ Booking session error: {e}")
+        print(f"❌ Error: {e}")
+        await screenshots.capture(page, "booking_error", run_id=run_id, error=True)
+
+    finally:
+        # Keep browser open for a bit to show results
+        await page.wait_for_timeout(5000)
+        await save_storage_state(context, applicant_id)
+        await screenshots.flush(run_id)
+        # Closing the context first writes the HAR when recording
+        await context.close()
+        await browser.close()
+        logger.info("🔚 Booking session completed")
+
+    return status
+
+def log_rewarm_result(task: asyncio.Task):
+    if task.cancelled():
+        return
+    error = task.exception()
+    if error is not None:
+        logger.warning(f"⚠️ Could not re-warm booking standby: {error}")
+
+async def launch_booking_session(applicant_id: str, run_id: str, form_data: dict = None, standby=None):
+    """Launch visible browser for booking with CAPTCHA handling"""
+    logger.info(f"🌐 Launching booking session for {applicant_id}")
+
+    if running_in_docker():
+        logger.info("🐳 Running in Docker - launching browser on host machine")
+        # Launch browser on host machine instead of in container
+        await launch_browser_on_host(applicant_id, run_id, form_data)
+        return
+
+    # ✅ Use the pre-warmed context if one is parked on the booking page
+    warm = await standby.take() if standby is not None else None
+    if warm:
+        logger.info("♨️ Using warm booking context")
+        try:
+            await run_booking_page(*warm, applicant_id, run_id, form_data)
         finally:
-            # Keep browser open for a bit to show results
-            await page.wait_for_timeout(5000)
-            await browser.close()
-            logger.info("🔚 Booking session completed")
+            # Re-warm for the next booking; keep the task referenced so it isn't collected mid-launch
+            standby._rewarm = asyncio.create_task(standby.start())
+            standby._rewarm.add_done_callback(log_rewarm_result)
+        return
+
+    async with async_playwright() as p:
+        browser, context, page = await open_booking_page(p, applicant_id)
+        await run_booking_page(browser, context, page, applicant_id, run_id, form_data)
 
 def launch_booking_session_sync(applicant_id: str, run_id: str, form_data: dict = None):
-    print(f"🚀 Starting booking session for applicant: {applicant_id}, run_id: {run_id}")
+    from workers.booking_standby import get_standby_runner
+
+    log_fields = {"run_id": run_id, "applicant_id": applicant_id}
+    logger.info(f"🚀 Starting booking session for applicant: {applicant_id}, run_id: {run_id}", extra=log_fields)
     try:
-        asyncio.run(launch_booking_session(applicant_id, run_id, form_data))
-        print(f"✅ Booking session completed successfully for {applicant_id}")
+        runner = get_standby_runner()
+        if runner is not None:
+            # The warm browser lives on the runner's loop, so the session must run there too
+            runner.run(launch_booking_session(applicant_id, run_id, form_data, runner.standby))
+        else:
+            asyncio.run(launch_booking_session(applicant_id, run_id, form_data))
+        logger.info(f"✅ Booking session completed successfully for {applicant_id}", extra=log_fields)
     except Exception as e:
-        print(f"❌ Booking failed for {applicant_id}: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"❌ Booking failed for {applicant_id}: {e}", extra=log_fields)
         raise
\ No newline at end of file
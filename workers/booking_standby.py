@@ -0,0 +1,191 @@
+# workers/booking_standby.py
+import asyncio
+import logging
+import os
+import shutil
+import threading
+from pathlib import Path
+from playwright.async_api import async_playwright
+
+from workers.booking_flow import (
+    VFS_URL,
+    BROWSER_ARGS,
+    CONTEXT_OPTIONS,
+    navigate_to_booking_form,
+    running_in_docker,
+)
+
+logger = logging.getLogger(__name__)
+
+BOOKING_WARM_STANDBY = os.getenv("BOOKING_WARM_STANDBY", "false").lower() == "true"
+STORAGE_STATE_DIR = os.getenv("BOOKING_STORAGE_STATE_DIR", "creds/storage_state")
+STANDBY_REFRESH_INTERVAL = int(os.getenv("BOOKING_STANDBY_REFRESH_INTERVAL", "600"))
+
+LATEST_STATE = "latest"
+
+
+def storage_state_path(applicant_id: str = None) -> Path:
+    """Where cookies/localStorage from earlier sessions are kept."""
+    return Path(STORAGE_STATE_DIR) / f"{applicant_id or LATEST_STATE}.json"
+
+
+def load_storage_state(applicant_id: str = None):
+    """Return the saved storage_state path for Playwright, or None if there isn't one."""
+    for path in (storage_state_path(applicant_id), storage_state_path()):
+        if path.exists():
+            return str(path)
+    return None
+
+
+async def save_storage_state(context, applicant_id: str = None):
+    """Persist cookies/localStorage so the next session starts logged in."""
+    try:
+        path = storage_state_path(applicant_id)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        await context.storage_state(path=str(path))
+        if applicant_id:
+            await asyncio.to_thread(shutil.copyfile, path, storage_state_path())
+        logger.info(f"💾 Saved browser storage state: {path}")
+    except Exception as e:
+        logger.warning(f"⚠️ Could not save storage state: {e}")
+
+
+class BookingStandby:
+    """
+    A visible browser that is already launched and parked on the booking
+    entry page, so a booking only has to bring it to the front and fill
+    the form. The user still solves CAPTCHA / verification themselves.
+    """
+    def __init__(self, headless: bool = False):
+        self.headless = headless
+        self.ready = False
+        self._playwright = None
+        self._browser = None
+        self._context = None
+        self._page = None
+        self._refresh_task = None
+        self._rewarm = None  # start() scheduled after a booking took the warm context
+        self._lock = asyncio.Lock()
+
+    async def start(self):
+        """Launch and park a booking context. Safe to call again after take()."""
+        async with self._lock:
+            if self.ready:
+                return
+            try:
+                if self._playwright is None:
+                    self._playwright = await async_playwright().start()
+                self._browser = await self._playwright.chromium.launch(headless=self.headless, args=BROWSER_ARGS)
+                self._context = await self._browser.new_context(
+                    storage_state=load_storage_state(),
+                    **CONTEXT_OPTIONS
+                )
+                self._page = await self._context.new_page()
+                await self._park()
+                self.ready = True
+                self._refresh_task = asyncio.create_task(self._keep_warm())
+                logger.info("♨️ Booking standby is warm")
+            except Exception as e:
+                logger.error(f"❌ Booking standby failed to start: {e}")
+                await self._discard()
+
+    async def _park(self):
+        await self._page.goto(VFS_URL, wait_until="domcontentloaded", timeout=60000)
+        await navigate_to_booking_form(self._page)
+
+    async def _keep_warm(self):
+        """Reload periodically so the parked session doesn't expire."""
+        while True:
+            await asyncio.sleep(STANDBY_REFRESH_INTERVAL)
+            async with self._lock:
+                if not self.ready:
+                    return
+                try:
+                    await self._park()
+                    await save_storage_state(self._context)
+                except Exception as e:
+                    logger.warning(f"⚠️ Standby refresh failed, relaunching: {e}")
+                    await self._discard()
+            if not self.ready:
+                await self.start()
+                return
+
+    async def take(self):
+        """
+        Hand the warm (browser, context, page) to a booking session.
+        Returns None if nothing is warm. The caller owns and closes them.
+        """
+        async with self._lock:
+            if not self.ready:
+                return None
+            self.ready = False
+            if self._refresh_task:
+                self._refresh_task.cancel()
+                self._refresh_task = None
+            handed = (self._browser, self._context, self._page)
+            self._browser = self._context = self._page = None
+        await handed[2].bring_to_front()
+        return handed
+
+    async def _discard(self):
+        self.ready = False
+        if self._browser:
+            try:
+                await self._browser.close()
+            except Exception:
+                pass
+        self._browser = self._context = self._page = None
+
+    async def close(self):
+        async with self._lock:
+            for task in (self._refresh_task, self._rewarm):
+                if task:
+                    task.cancel()
+            await self._discard()
+            if self._playwright:
+                await self._playwright.stop()
+                self._playwright = None
+
+
+class StandbyRunner:
+    """
+    Keeps a BookingStandby alive on its own event loop thread, so it
+    survives between Celery tasks that would otherwise each call
+    asyncio.run() with a fresh loop.
+    """
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.standby = None
+        self._thread = threading.Thread(target=self.loop.run_forever, name="booking-standby", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        self.standby = self.run(self._create())
+        asyncio.run_coroutine_threadsafe(self.standby.start(), self.loop)
+
+    async def _create(self):
+        return BookingStandby()
+
+    def run(self, coro):
+        """Run a coroutine on the standby loop and wait for its result."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+
+_runner = None
+
+
+def start_standby_runner():
+    """Start the warm standby for this process if enabled and possible."""
+    global _runner
+    if _runner is not None or not BOOKING_WARM_STANDBY:
+        return _runner
+    if running_in_docker():
+        logger.info("🐳 Warm booking standby needs a display; skipped in Docker")
+        return None
+    _runner = StandbyRunner()
+    _runner.start()
+    return _runner
+
+
+def get_standby_runner():
+    return _runner
@@ -0,0 +1,122 @@
+# workers/capacity.py
+# Monitor workers advertise how many monitors they can hold; the API admits
+# new monitors against the total (see app/admission.py).
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Optional
+
+from automation.process_memory import chromium_by_run
+from config.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+# Browser slots on this worker; 0 means it doesn't run monitors and doesn't advertise
+MONITOR_SLOTS = int(os.getenv("MONITOR_SLOTS", "0"))
+# Optional memory budget for this worker's browsers; 0 = slots only
+MONITOR_MEMORY_BUDGET_MB = int(os.getenv("MONITOR_MEMORY_BUDGET_MB", "0"))
+# Expected footprint of one monitor's Chromium; the observed average is used once it's larger
+MONITOR_MEMORY_MB = int(os.getenv("MONITOR_MEMORY_MB", "400"))
+CAPACITY_INTERVAL = int(os.getenv("CAPACITY_INTERVAL", "15"))
+CAPACITY_TTL = int(os.getenv("CAPACITY_TTL", "60"))
+CAPACITY_KEY_PREFIX = "capacity:"
+CAPACITY_INDEX = "capacity_workers"
+MB = 1024 * 1024
+
+INT_FIELDS = {"slots", "capacity", "running", "memory_used_mb", "memory_budget_mb", "per_monitor_mb"}
+
+
+def capacity_key(worker: str) -> str:
+    return f"{CAPACITY_KEY_PREFIX}{worker}"
+
+
+def measure() -> dict:
+    """This worker's capacity, from its slots and, if set, its memory budget"""
+    browsers = chromium_by_run()
+    running = len(browsers)
+    used_mb = sum(proc["rss"] for processes in browsers.values() for proc in processes) // MB
+    per_monitor_mb = max(MONITOR_MEMORY_MB, used_mb // running if running else 0)
+    capacity = MONITOR_SLOTS
+    if MONITOR_MEMORY_BUDGET_MB:
+        capacity = min(capacity, MONITOR_MEMORY_BUDGET_MB // per_monitor_mb)
+    return {
+        "slots": MONITOR_SLOTS,
+        "capacity": capacity,
+        "running": running,
+        "memory_used_mb": used_mb,
+        "memory_budget_mb": MONITOR_MEMORY_BUDGET_MB,
+        "per_monitor_mb": per_monitor_mb,
+    }
+
+
+def advertise(worker: str):
+    client = get_redis()
+    if client is None:
+        return
+    fields = {**measure(), "worker": worker, "updated_at": datetime.utcnow().isoformat()}
+    pipe = client.pipeline(transaction=False)
+    pipe.hset(capacity_key(worker), mapping=fields)
+    pipe.expire(capacity_key(worker), CAPACITY_TTL)
+    pipe.sadd(CAPACITY_INDEX, worker)
+    pipe.execute()
+
+
+def start_advertising(worker: str) -> Optional[threading.Thread]:
+    """Refresh this worker's capacity every CAPACITY_INTERVAL seconds from a daemon thread"""
+    if MONITOR_SLOTS <= 0 or get_redis() is None:
+        return None
+
+    def run():
+        while True:
+            try:
+                advertise(worker)
+            except Exception as e:
+                logger.warning(f"⚠️ Could not advertise capacity: {e}")
+            time.sleep(CAPACITY_INTERVAL)
+
+    thread = threading.Thread(target=run, name="capacity-advertiser", daemon=True)
+    thread.start()
+    logger.info(f"📦 Advertising {MONITOR_SLOTS} monitor slots as {worker}"
+                + (f" ({MONITOR_MEMORY_BUDGET_MB} MB budget)" if MONITOR_MEMORY_BUDGET_MB else ""))
+    return thread
+
+
+def cluster_capacity() -> Optional[dict]:
+    """
+    Capacity summed over workers whose advertisement hasn't expired, in one
+    pipelined read. None when no worker advertises (or Redis is missing or
+    unreachable), in which case admission control is off.
+    """
+    client = get_redis()
+    if client is None:
+        return None
+    try:
+        workers = sorted(client.smembers(CAPACITY_INDEX))
+        if not workers:
+            return None
+        pipe = client.pipeline(transaction=False)
+        for worker in workers:
+            pipe.hgetall(capacity_key(worker))
+        live, gone = [], []
+        for worker, fields in zip(workers, pipe.execute()):
+            if not fields:
+                gone.append(worker)
+                continue
+            live.append({field: int(value) if field in INT_FIELDS else value for field, value in fields.items()})
+        if gone:
+            client.srem(CAPACITY_INDEX, *gone)
+    except Exception as e:
+        # ✅ Fail open like "no advertising workers": a Redis outage must not block monitor creation
+        logger.warning(f"⚠️ Could not read cluster capacity, admission control off: {e}")
+        return None
+    if not live:
+        return None
+    return {
+        "capacity": sum(worker["capacity"] for worker in live),
+        "running": sum(worker["running"] for worker in live),
+        "memory_used_mb": sum(worker["memory_used_mb"] for worker in live),
+        "memory_budget_mb": sum(worker["memory_budget_mb"] for worker in live),
+        "workers": live,
+    }
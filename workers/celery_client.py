@@ -0,0 +1,40 @@
+# workers/celery_client.py
+# Producer-only Celery app for the API. Tasks are sent by name, so the API
+# never imports workers.tasks (and with it Playwright and the monitor code).
+from functools import lru_cache
+
+from config.settings import get_settings
+from workers.celery_config import START_MONITOR, TRIGGER_BOOKING
+
+
+@lru_cache(maxsize=None)
+def get_celery():
+    from celery import Celery
+
+    client = Celery("tasks", broker=get_settings().redis_url)
+    client.config_from_object("workers.celery_config")
+    return client
+
+
+def enqueue(task_name: str, *args, **kwargs):
+    """Send a task by name; routing to its queue comes from celery_config."""
+    return get_celery().send_task(task_name, args=args, kwargs=kwargs)
+
+
+def enqueue_start_monitor(run_id: str):
+    return enqueue(START_MONITOR, run_id)
+
+
+def enqueue_trigger_booking(applicant_id: str, run_id: str, form_data: dict = None):
+    return enqueue(TRIGGER_BOOKING, applicant_id, run_id, form_data)
+
+
+def enqueue_many(task_name: str, arg_list):
+    """Publish one task per args tuple over a single broker connection"""
+    client = get_celery()
+    with client.producer_or_acquire() as producer:
+        return [client.send_task(task_name, args=args, producer=producer) for args in arg_list]
+
+
+def enqueue_start_monitors(run_ids):
+    return enqueue_many(START_MONITOR, [(run_id,) for run_id in run_ids])
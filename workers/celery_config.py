@@ -0,0 +1,33 @@
+# workers/celery_config.py
+# Queue and routing config shared by the worker app (workers.tasks) and the
+# thin client the API uses to enqueue by name (workers.celery_client).
+from kombu import Queue
+
+# ✅ Separate lanes so a booking never waits behind a long-running monitor.
+# Each queue is consumed by its own worker pool (see docker-compose.yml).
+MONITOR_QUEUE = "monitors"
+BOOKING_QUEUE = "bookings"
+NOTIFICATION_QUEUE = "notifications"
+
+START_MONITOR = "workers.tasks.start_monitor"
+TRIGGER_BOOKING = "workers.tasks.trigger_booking"
+SEND_SLOT_ALERT = "workers.tasks.send_slot_alert"
+
+task_queues = (
+    Queue(MONITOR_QUEUE),
+    Queue(BOOKING_QUEUE),
+    Queue(NOTIFICATION_QUEUE),
+)
+task_default_queue = NOTIFICATION_QUEUE
+task_routes = {
+    START_MONITOR: {"queue": MONITOR_QUEUE},
+    TRIGGER_BOOKING: {"queue": BOOKING_QUEUE},
+    SEND_SLOT_ALERT: {"queue": NOTIFICATION_QUEUE},
+}
+
+# Don't let a worker reserve tasks it can't start yet
+worker_prefetch_multiplier = 1
+
+# Late-acked booking sessions may run for up to an hour; keep Redis from
+# redelivering them to another worker while they're still in progress.
+broker_transport_options = {"visibility_timeout": 2 * 60 * 60}
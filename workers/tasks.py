@@ -1,6 +1,8 @@
 # workers/tasks.py
-from celery import Celery
-from config.settings import REDIS_URL
+import logging
+from celery import Celery, signals
+from config.settings import get_settings
+from config.logging_setup import setup_logging
 
 # Add project root to path
 import sys
@@ -11,37 +13,99 @@ sys.path.append(str(Path(__file__).parent.parent))
 from automation.slot_monitor import monitor_slots
 import asyncio
 from automation.utils import take_screenshot, log_action
+from automation import diagnostics
+from notifications.coalescer import AlertCoalescer
 
-celery_app = Celery('tasks', broker=REDIS_URL)
+celery_app = Celery('tasks', broker=get_settings().redis_url)
+celery_app.config_from_object("workers.celery_config")
+logger = logging.getLogger(__name__)
 
-# The missing task
-@celery_app.task
+@signals.setup_logging.connect
+def configure_logging(**kwargs):
+    # Replaces Celery's own logging setup; the prefork children inherit the
+    # queue handler and the main process writes the shared log file.
+    setup_logging("worker", multiprocess=True)
+
+@signals.worker_process_init.connect
+def warm_booking_standby(**kwargs):
+    # Only the booking worker sets BOOKING_WARM_STANDBY; elsewhere this is a no-op
+    from workers.booking_standby import start_standby_runner
+    start_standby_runner()
+
+@signals.worker_process_init.connect
+def start_diagnostics(**kwargs):
+    # Each pool process traces its own allocations and writes its own snapshots
+    diagnostics.start()
+    diagnostics.start_periodic_snapshots("worker")
+
+@signals.worker_ready.connect
+def advertise_capacity(sender=None, **kwargs):
+    # Main process only; its Chromium scan covers every pool process's browsers.
+    # A no-op unless MONITOR_SLOTS is set (only the monitor worker sets it).
+    from workers.capacity import start_advertising
+    start_advertising(getattr(sender, "hostname", None) or "worker")
+
+# ✅ `celery -A workers.tasks inspect memory_report` (DIAGNOSTICS_ENABLED=1).
+# Runs in the worker's main process: Python stats are that process's, while the
+# Chromium breakdown covers every pool process's browsers, since they descend from it.
+if diagnostics.DIAGNOSTICS_ENABLED:
+    from celery.worker.control import inspect_command
+
+    @inspect_command(args=[("limit", int)], signature="[limit=20]")
+    def memory_report(state, limit=20):
+        return diagnostics.memory_report(limit)
+
+    @inspect_command()
+    def memory_snapshot(state):
+        return {"path": str(diagnostics.write_snapshot("worker-main"))}
+
+# Monitors run until stopped, so they're acked on receipt: a late ack would
+# hold the message for the monitor's whole lifetime and redeliver it.
+@celery_app.task(acks_late=False)
 def start_monitor(run_id: str):
     """
     Wrapper task to start monitoring for appointment slots.
     Called by FastAPI when POST /monitors/ is hit.
     """
-    print(f"[start_monitor] Starting monitor for run_id={run_id}")
+    logger.info(f"[start_monitor] Starting monitor for run_id={run_id}", extra={"run_id": run_id})
     try:
         # Run async monitor in sync context
-        asyncio.run(monitor_slots(run_id, notify_via_api))
+        asyncio.run(run_monitor(run_id))
     except Exception as e:
-        print(f"[start_monitor] Failed: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"[start_monitor] Failed: {e}", extra={"run_id": run_id})
         raise
 
-# Dummy notification callback (will connect to Telegram later)
+async def run_monitor(run_id: str):
+    # ✅ Alerts pass through the per-run debounce/dedup stage before the notifiers
+    alerts = AlertCoalescer(run_id, notify_via_api)
+    try:
+        await monitor_slots(run_id, alerts.submit)
+    finally:
+        await alerts.close()
+
 async def notify_via_api(alert: dict):
-    print("🔔 SLOT ALERT: ", alert)
-    # Later: call Telegram bot or POST to webhook
+    """Hand the alert to the notifications queue without blocking the monitor loop."""
+    logger.info(f"🔔 SLOT ALERT: {alert}", extra={"event": "slot_alert", "run_id": alert.get("run_id")})
+    await asyncio.to_thread(send_slot_alert.delay, alert)
+
+@celery_app.task(acks_late=True, autoretry_for=(Exception,), max_retries=3, retry_backoff=True)
+def send_slot_alert(alert: dict):
+    """Deliver a slot alert to the configured notifiers."""
+    if not get_settings().telegram_bot_token:
+        logger.info("🔕 No notifier configured, alert dropped", extra={"run_id": alert.get("run_id")})
+        return
+    from notifications.telegram_bot import send_alert_with_buttons, send_digest
+    if alert.get("event") == "digest":
+        send_digest(alert)
+    else:
+        send_alert_with_buttons(alert)
 
-# Enhanced booking task with form data
-@celery_app.task
+# Booking sessions are acked late so a worker crash hands them to another worker
+@celery_app.task(acks_late=True, reject_on_worker_lost=True)
 def trigger_booking(applicant_id: str, run_id: str, form_data: dict = None):
     try:
         from workers.booking_flow import launch_booking_session_sync
         launch_booking_session_sync(applicant_id, run_id, form_data)
     except Exception as e:
-        print(f"Booking failed: {e}")
+        logger.exception(f"Booking failed: {e}", extra={"run_id": run_id, "applicant_id": applicant_id})
         raise
\ No newline at end of file